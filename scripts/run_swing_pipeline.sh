@@ -87,8 +87,10 @@ echo "========================================"
 # -----------------------------
 # Build command once
 # -----------------------------
+# fetch, NSE classification, scans, filters, analysis & backup run as a
+# dependency graph, stages whose inputs are unchanged are skipped
 CMD=(
-  python3 -m src.jobs.scanner
+  python3 -m src.jobs.pipeline
   --run_mode "${RUN_MODE}"
   --end_date "${END_DATE}"
   --adr_cutoff "${ADR_CUTOFF}"
@@ -103,19 +105,4 @@ fi
 # Execute
 # -----------------------------
 time "${CMD[@]}"
-echo "SCAN COMPLETED"
-
-# -----------------------------
-# Post-run step for run_mode=1
-# -----------------------------
-if [[ "${RUN_MODE}" == "1" ]]; then
-  echo "RUN_MODE=1 detected → running NSE analysis script"
-
-  time python3 -m src.jobs.nse_analysis \
-    --end_date "${END_DATE}" 
-
-  rclone sync /home/parthgandhi/TradeBot/storage/data/IND/ChartsMaze gdrive:Backup/SwingTrade/ChartsMaze/RS --progress
-  
-  echo "NSE analysis completed"
-fi
-
+echo "PIPELINE COMPLETED"
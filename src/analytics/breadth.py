@@ -0,0 +1,141 @@
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.pipeline.cache import drop_table, last_table_date
+from src.pipeline.metrics import collect
+from src.scans.swing_scan import basic_scan_expr, prep_scan_frame
+from src.store.adjustments import read_adjusted
+from src.utils import bars_to_calendar_days
+
+logger = logging.getLogger(__name__)
+
+
+def breadth(data: pl.LazyFrame, conf: dict) -> pl.LazyFrame:
+    """
+    Daily breadth of the universe in one group by over the indicator frame:
+    advances & declines, % above SMA 50 & 200, new highs & lows over the
+    window and the number of symbols passing the Basic Scan
+    """
+    n = conf["breadth"]["new_high_window"]
+
+    res = prep_scan_frame(
+        data=data, lookback_min_gains_dict=conf["lookback_min_return_pct"]
+    ).with_columns(
+        pl.col("close")
+        .shift(1)
+        .over(partition_by="symbol", order_by="timestamp", descending=False)
+        .alias("prev_close"),
+        # new high / low only once the symbol has a full window
+        (
+            pl.col("high")
+            >= pl.col("high")
+            .rolling_max(window_size=n)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+        ).alias("new_high"),
+        (
+            pl.col("low")
+            <= pl.col("low")
+            .rolling_min(window_size=n)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+        ).alias("new_low"),
+        basic_scan_expr(conf=conf).alias("basic_scan_flag"),
+    )
+
+    return (
+        res.group_by("timestamp")
+        .agg(
+            pl.len().alias("n_symbols"),
+            (pl.col("close") > pl.col("prev_close")).sum().alias("advances"),
+            (pl.col("close") < pl.col("prev_close")).sum().alias("declines"),
+            (pl.col("close") == pl.col("prev_close")).sum().alias("unchanged"),
+            *[
+                (pl.col("close") >= pl.col(f"close_sma_{i}"))
+                .mean()
+                .mul(100)
+                .round(2)
+                # mean skips the symbols without enough bars for the SMA
+                .alias(f"pct_above_sma_{i}")
+                for i in [50, 200]
+            ],
+            pl.col("new_high").sum().alias(f"new_highs_{n}"),
+            pl.col("new_low").sum().alias(f"new_lows_{n}"),
+            pl.col("basic_scan_flag").sum().alias("basic_scan_count"),
+        )
+        .with_columns(
+            (pl.col("advances") - pl.col("declines")).alias("net_advances"),
+        )
+        .sort("timestamp")
+    )
+
+
+def update_breadth(
+    db_path: Path,
+    ohlcv_table_id: str,
+    breadth_table_id: str,
+    conf: dict,
+    rebuild: bool = False,
+) -> int:
+    """
+    Append breadth for every date after the last stored one, reading only
+    the bars the longest indicator window needs before it
+    """
+    conn = f"sqlite:///{db_path}"
+
+    last_date = (
+        None if rebuild else last_table_date(conn=conn, table_id=breadth_table_id)
+    )
+    if rebuild:
+        drop_table(conn=conn, table_id=breadth_table_id)
+
+    query = f"""
+            select *
+            from {ohlcv_table_id}
+            """
+    if last_date is not None:
+        max_bars = max(
+            [200, conf["breadth"]["new_high_window"]]
+            + list(conf["lookback_min_return_pct"])
+        )
+        lookback_start = last_date - timedelta(days=bars_to_calendar_days(max_bars))
+        query += f"where timestamp >= '{lookback_start}'"
+
+    res = breadth(
+        data=read_adjusted(
+            query=query, conn=conn, ohlcv_table_id=ohlcv_table_id
+        ).lazy(),
+        conf=conf,
+    )
+    if last_date is not None:
+        res = res.filter(pl.col("timestamp") > last_date)
+    res = collect(res)
+
+    if res.is_empty():
+        logger.info(f"Breadth up to date till {last_date}")
+        return 0
+
+    res.with_columns(pl.col("timestamp").cast(pl.String())).write_database(
+        table_name=breadth_table_id, connection=conn, if_table_exists="append"
+    )
+    logger.info(f"Breadth: {res.shape[0]} dates added after {last_date}")
+
+    return res.shape[0]
+
+
+def read_breadth(
+    db_path: Path,
+    breadth_table_id: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> pl.DataFrame:
+    query = f"""
+            select *
+            from {breadth_table_id}
+            where timestamp between '{start_date or "0000-00-00"}' and '{end_date or "9999-99-99"}'
+            order by timestamp
+            """
+    return pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}").with_columns(
+        pl.col("timestamp").str.to_date()
+    )
@@ -0,0 +1,195 @@
+import logging
+from datetime import date, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.config.brokers.nse import NSEConfig
+from src.config.exchange import Exchange
+from src.config.market import Market
+from src.config.storage_layout import StorageLayout
+from src.pipeline.cache import drop_table, last_table_date
+from src.pipeline.metrics import collect
+from src.scans.swing_scan import basic_scan_expr, prep_scan_frame
+from src.store.adjustments import read_adjusted
+from src.utils import bars_to_calendar_days
+
+logger = logging.getLogger(__name__)
+
+
+def read_classification(levels: list[str]) -> pl.DataFrame:
+    """
+    Latest NSE classification of every symbol, a symbol missing from the
+    last fetch keeps the one it had before
+    """
+    db_path = StorageLayout.db_path(market=Market.INDIA, exchange=Exchange.NSE)
+    query = f"""
+            select timestamp, symbol, {", ".join(levels)}
+            from {NSEConfig.CLASSIFICATION_TABLE_ID}
+            """
+    return (
+        pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}")
+        .sort("timestamp")
+        .group_by("symbol")
+        .last()
+        .drop("timestamp")
+    )
+
+
+def sector_strength(
+    data: pl.LazyFrame,
+    classification: pl.LazyFrame,
+    rs_ratings: pl.LazyFrame,
+    conf: dict,
+) -> pl.LazyFrame:
+    """
+    Daily strength of every group at each classification level: median
+    returns, % of members above SMA 50 & 200, Basic Scan hits & average RS
+    rating. Long format, one row per timestamp, level & group.
+    """
+    sectors_conf = conf["sectors"]
+
+    members = (
+        prep_scan_frame(
+            data=data, lookback_min_gains_dict=conf["lookback_min_return_pct"]
+        )
+        .with_columns(
+            [
+                (
+                    pl.col("close")
+                    / pl.col("close")
+                    .shift(n)
+                    .over(partition_by="symbol", order_by="timestamp", descending=False)
+                    - 1
+                )
+                .mul(100)
+                .alias(f"rtr_pct_{n}")
+                for n in sectors_conf["return_windows"]
+            ]
+            + [basic_scan_expr(conf=conf).alias("basic_scan_flag")]
+        )
+        .join(classification.lazy(), on="symbol", how="inner")
+        .join(rs_ratings.lazy(), on=["timestamp", "symbol"], how="left")
+    )
+
+    aggs = [
+        pl.len().alias("n_members"),
+        *[
+            pl.col(f"rtr_pct_{n}").median().round(2).alias(f"median_rtr_pct_{n}")
+            for n in sectors_conf["return_windows"]
+        ],
+        *[
+            (pl.col("close") >= pl.col(f"close_sma_{i}"))
+            .mean()
+            .mul(100)
+            .round(2)
+            .alias(f"pct_above_sma_{i}")
+            for i in [50, 200]
+        ],
+        pl.col("basic_scan_flag").sum().alias("scan_hits"),
+        pl.col("rs_rating").mean().round(2).alias("avg_rs_rating"),
+    ]
+
+    return pl.concat(
+        [
+            members.group_by("timestamp", pl.col(level).alias("group"))
+            .agg(aggs)
+            .with_columns(pl.lit(level).alias("level"))
+            for level in sectors_conf["levels"]
+        ]
+    ).select("timestamp", "level", "group", pl.exclude("timestamp", "level", "group"))
+
+
+def update_sector_strength(
+    db_path: Path,
+    ohlcv_table_id: str,
+    rs_table_id: str,
+    sectors_table_id: str,
+    conf: dict,
+    rebuild: bool = False,
+) -> int:
+    """
+    Append group strength for every date after the last stored one, reading
+    only the bars the longest window needs before it
+    """
+    conn = f"sqlite:///{db_path}"
+    sectors_conf = conf["sectors"]
+
+    last_date = (
+        None if rebuild else last_table_date(conn=conn, table_id=sectors_table_id)
+    )
+    if rebuild:
+        drop_table(conn=conn, table_id=sectors_table_id)
+
+    ohlcv_query = f"""
+            select *
+            from {ohlcv_table_id}
+            """
+    rs_query = f"""
+            select timestamp, symbol, rs_rating
+            from {rs_table_id}
+            """
+    if last_date is not None:
+        max_bars = max(
+            [200]
+            + sectors_conf["return_windows"]
+            + list(conf["lookback_min_return_pct"])
+        )
+        lookback_start = last_date - timedelta(days=bars_to_calendar_days(max_bars))
+        ohlcv_query += f"where timestamp >= '{lookback_start}'"
+        rs_query += f"where timestamp > '{last_date}'"
+
+    res = sector_strength(
+        data=read_adjusted(
+            query=ohlcv_query, conn=conn, ohlcv_table_id=ohlcv_table_id
+        ).lazy(),
+        classification=read_classification(levels=sectors_conf["levels"]),
+        rs_ratings=pl.read_database_uri(query=rs_query, uri=conn).with_columns(
+            pl.col("timestamp").str.to_date()
+        ),
+        conf=conf,
+    )
+    if last_date is not None:
+        res = res.filter(pl.col("timestamp") > last_date)
+    res = collect(res.sort("timestamp", "level", "group"))
+
+    if res.is_empty():
+        logger.info(f"Sector strength up to date till {last_date}")
+        return 0
+
+    res.with_columns(pl.col("timestamp").cast(pl.String())).write_database(
+        table_name=sectors_table_id, connection=conn, if_table_exists="append"
+    )
+    logger.info(
+        f"Sector strength: {res.shape[0]} rows for {res.get_column('timestamp').n_unique()} dates after {last_date}"
+    )
+
+    return res.shape[0]
+
+
+def leading_groups(
+    db_path: Path,
+    sectors_table_id: str,
+    level: str,
+    as_of: date | None = None,
+    by: str = "median_rtr_pct_63",
+    top: int = 10,
+) -> pl.DataFrame:
+    """
+    Groups of a level ranked by one strength column on a day, latest by default
+    """
+    conn = f"sqlite:///{db_path}"
+    if as_of is None:
+        as_of = last_table_date(conn=conn, table_id=sectors_table_id)
+
+    query = f"""
+            select *
+            from {sectors_table_id}
+            where level = '{level}' and timestamp = '{as_of}'
+            """
+    return (
+        pl.read_database_uri(query=query, uri=conn)
+        .sort(by, descending=True, nulls_last=True)
+        .head(top)
+        .with_row_index("rank", offset=1)
+    )
@@ -0,0 +1,418 @@
+import json
+import logging
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from src.benchmarks.suite import TABLE_ID, write_ohlcv_db
+from src.benchmarks.synthetic import synthetic_ohlcv
+from src.config.benchmarks import GOLDEN_CONF, GOLDEN_OUTPUTS, SYNTHETIC_CONF
+from src.config.exchange import Exchange
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.market import Market
+from src.config.scans import filter_conf, scans_conf
+from src.config.storage_layout import StorageLayout
+from src.pipeline.cache import hash_code
+from src.scans import filter_scan, swing_scan
+from src.scans.filter_scan import (adr_filter, basic_filter, pullback_filter,
+                                   sma_200_filter)
+from src.scans.sharded import run_sharded_filters
+from src.scans.streaming import stream_prep_scan_data
+from src.scans.swing_scan import add_basic_indicators, prep_scan_frame
+
+logger = logging.getLogger(__name__)
+
+_GOLDEN_DIR = StorageLayout.BENCHMARKS / "golden"
+
+
+def _golden_dir(name: str) -> Path:
+    return _GOLDEN_DIR / name
+
+
+def _read_db(db_path: Path, query: str) -> pl.DataFrame:
+    return pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}")
+
+
+## Engines, each returns the golden outputs it produces
+
+
+def reference_outputs(
+    data: pl.DataFrame, end_date: datetime, adr_cutoff: float, market: Market
+) -> dict[str, pl.DataFrame]:
+    """
+    Outputs of today's in memory scan path
+    """
+    symbol_list = data.get_column("symbol").unique().sort().to_list()
+
+    return {
+        "indicators": add_basic_indicators(data=data).collect(),
+        "scan_frame": prep_scan_frame(
+            data=data,
+            lookback_min_gains_dict=scans_conf[market]["lookback_min_return_pct"],
+        ).collect(),
+        "basic_filter": pl.DataFrame(
+            {
+                "symbol": basic_filter(
+                    data=data.lazy(),
+                    symbol_list=symbol_list,
+                    scan_date=end_date,
+                    conf=scans_conf[market],
+                )
+            },
+            schema={"symbol": pl.String()},
+        ),
+        "adr": adr_filter(data=data, adr_cutoff=adr_cutoff, end_date=end_date),
+        "sma_200": sma_200_filter(data=data, end_date=end_date),
+        "pullback": pullback_filter(
+            data=data.lazy(), end_date=end_date, conf=filter_conf[market]["pullback"]
+        ),
+    }
+
+
+def _reference_engine(inputs: dict, work_dir: Path) -> dict[str, pl.DataFrame]:
+    return reference_outputs(
+        data=inputs["data"],
+        end_date=inputs["end_date"],
+        adr_cutoff=inputs["adr_cutoff"],
+        market=inputs["market"],
+    )
+
+
+def _sharded_engine(inputs: dict, work_dir: Path) -> dict[str, pl.DataFrame]:
+    res = run_sharded_filters(
+        data=inputs["data"],
+        work_dir=work_dir,
+        end_date=inputs["end_date"],
+        adr_cutoff=inputs["adr_cutoff"],
+        filters_conf=filter_conf[inputs["market"]],
+        n_shards=GOLDEN_CONF["n_shards"],
+        max_workers=GOLDEN_CONF["max_workers"],
+    )
+    return {name: res[name] for name in ["adr", "sma_200", "pullback"]}
+
+
+def _streaming_engine(inputs: dict, work_dir: Path) -> dict[str, pl.DataFrame]:
+    conf = scans_conf[inputs["market"]]
+    scan_frame = stream_prep_scan_data(
+        conn=f"sqlite:///{inputs['db_path']}",
+        table_id=TABLE_ID,
+        lookback_min_gains_dict=conf["lookback_min_return_pct"],
+        work_dir=work_dir,
+        conf=conf["streaming"],
+        max_workers=GOLDEN_CONF["max_workers"],
+    ).collect()
+    return {"scan_frame": scan_frame}
+
+
+# New engines (incremental, panel, ...) register here to be diffed
+ENGINES: dict[str, Callable[[dict, Path], dict[str, pl.DataFrame]]] = {
+    "reference": _reference_engine,
+    "sharded": _sharded_engine,
+    "streaming": _streaming_engine,
+}
+
+
+## Freezing
+
+
+def _freeze(
+    name: str,
+    data: pl.DataFrame,
+    end_date: datetime,
+    adr_cutoff: float,
+    market: Market,
+    source: dict,
+    force: bool,
+) -> Path:
+    out = _golden_dir(name)
+    if out.exists():
+        if not force:
+            raise FileExistsError(f"Golden set {name} exists, freeze with force")
+        shutil.rmtree(out)
+    (out / "outputs").mkdir(parents=True)
+
+    # inputs go through the DB & back, as the scanner reads them
+    write_ohlcv_db(data=data, db_path=out / "data.db")
+    data = _read_db(db_path=out / "data.db", query=f"select * from {TABLE_ID}")
+    data.write_parquet(out / "input.parquet")
+
+    outputs = reference_outputs(
+        data=data, end_date=end_date, adr_cutoff=adr_cutoff, market=market
+    )
+    for output, df in outputs.items():
+        df.write_parquet(out / "outputs" / f"{output}.parquet")
+
+    (out / "manifest.json").write_text(
+        json.dumps(
+            {
+                "frozen_at": datetime.now().isoformat(timespec="seconds"),
+                "source": source,
+                "market": market.value,
+                "end_date": end_date.strftime("%Y-%m-%d"),
+                "adr_cutoff": adr_cutoff,
+                "n_rows": data.shape[0],
+                "code": hash_code(swing_scan, filter_scan),
+                "outputs": {output: df.shape[0] for output, df in outputs.items()},
+            },
+            indent=2,
+        )
+    )
+    logger.info(f"Golden set {name} frozen: {out}")
+
+    return out
+
+
+def freeze_synthetic(n_symbols: int, adr_cutoff: float, force: bool = False) -> Path:
+    return _freeze(
+        name=f"synthetic_{n_symbols}",
+        data=synthetic_ohlcv(n_symbols=n_symbols),
+        end_date=datetime.strptime(SYNTHETIC_CONF["end_date"], "%Y-%m-%d"),
+        adr_cutoff=adr_cutoff,
+        market=Market.INDIA_EQUITIES,
+        source={"synthetic": {"n_symbols": n_symbols, **SYNTHETIC_CONF}},
+        force=force,
+    )
+
+
+def freeze_recorded(
+    market: Market,
+    exchange: Exchange,
+    end_date: str,
+    adr_cutoff: float,
+    force: bool = False,
+) -> Path:
+    """
+    Freeze the scan window of the stored OHLCV up to end_date, the inputs are
+    copied so later fetches do not move the reference
+    """
+    conf = scans_conf[market]
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    lookback = end - timedelta(
+        days=conf["months_lookback"] * 30 + conf["data_lookback_days"]
+    )
+    table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+    query = f"""
+            select *
+            from {table_id}
+            where timestamp >= '{lookback:%Y-%m-%d}'
+                and timestamp < '{end + timedelta(days=1):%Y-%m-%d}'
+            """
+    data = _read_db(
+        db_path=StorageLayout.db_path(market=market, exchange=exchange), query=query
+    )
+
+    return _freeze(
+        name=f"{exchange.value}_{end_date}",
+        data=data,
+        end_date=end,
+        adr_cutoff=adr_cutoff,
+        market=market,
+        source={"market": market.value, "exchange": exchange.value, "table": table_id},
+        force=force,
+    )
+
+
+def list_golden() -> pl.DataFrame:
+    return pl.DataFrame(
+        [
+            {"name": path.parent.name, **json.loads(path.read_text())}
+            for path in sorted(_GOLDEN_DIR.glob("*/manifest.json"))
+        ],
+        infer_schema_length=None,
+    ).select("name", "frozen_at", "market", "end_date", "n_rows", "code")
+
+
+## Diffing
+
+
+def _issue(
+    output: str,
+    column: str,
+    issue: str,
+    n_rows: int | None = None,
+    max_abs_diff: float | None = None,
+    examples: pl.DataFrame | None = None,
+) -> dict:
+    return {
+        "output": output,
+        "column": column,
+        "issue": issue,
+        "n_rows": n_rows,
+        "max_abs_diff": max_abs_diff,
+        "examples": None
+        if examples is None
+        # list columns can be long, the start is enough to find the rows
+        else str(examples.head(GOLDEN_CONF["examples"]).rows())[:300],
+    }
+
+
+def _same_expr(column: str, dtype: pl.DataType, conf: dict) -> pl.Expr:
+    ref, cand = pl.col(column), pl.col(f"{column}_cand")
+    if not dtype.is_float():
+        return ref.eq_missing(cand)
+
+    close = (ref - cand).abs() <= conf["abs_tol"] + conf["rel_tol"] * ref.abs()
+    return (
+        (ref.is_null() & cand.is_null())
+        | (ref.is_nan() & cand.is_nan()).fill_null(False)
+        | close.fill_null(False)
+    )
+
+
+def _rank_issues(
+    output: str, ref: pl.DataFrame, cand: pl.DataFrame, keys: list[str], rank_by
+) -> list[dict]:
+    """
+    A candidate rank is right if it falls in the reference ranks of the rows
+    tied with it on rank_by, ties may be broken either way
+    """
+    if rank_by is None:
+        tie_range = ref.select(
+            *keys, pl.col("rank").alias("lo"), pl.col("rank").alias("hi")
+        )
+    else:
+        tie_range = ref.join(
+            ref.group_by(rank_by).agg(
+                pl.col("rank").min().alias("lo"), pl.col("rank").max().alias("hi")
+            ),
+            on=rank_by,
+            how="left",
+            nulls_equal=True,
+        ).select(*keys, "lo", "hi")
+
+    wrong = (
+        tie_range.join(cand.select(*keys, "rank"), on=keys, how="inner")
+        .filter(~pl.col("rank").is_between(pl.col("lo"), pl.col("hi")))
+        .sort("lo")
+    )
+    if wrong.is_empty():
+        return []
+    return [_issue(output, "rank", "rank order", n_rows=wrong.height, examples=wrong)]
+
+
+def diff_frames(
+    output: str, ref: pl.DataFrame, cand: pl.DataFrame, conf: dict = GOLDEN_CONF
+) -> list[dict]:
+    """
+    Column by column differences of a candidate output from the reference,
+    empty when they are equivalent
+    """
+    spec = GOLDEN_OUTPUTS[output]
+    keys = spec["keys"]
+    issues = []
+
+    for column in ref.columns:
+        if column not in cand.columns:
+            issues.append(_issue(output, column, "missing column"))
+    for column in cand.columns:
+        if column not in ref.columns:
+            issues.append(_issue(output, column, "extra column"))
+
+    common = [c for c in ref.columns if c in cand.columns]
+    for column in common:
+        if ref.schema[column] != cand.schema[column]:
+            issues.append(
+                _issue(
+                    output,
+                    column,
+                    f"dtype {ref.schema[column]} != {cand.schema[column]}",
+                )
+            )
+    # values still compared, in the reference dtype
+    cand = cand.select(pl.col(c).cast(ref.schema[c], strict=False) for c in common)
+
+    for how, left, right in [("missing", ref, cand), ("extra", cand, ref)]:
+        rows = left.join(right, on=keys, how="anti", nulls_equal=True)
+        if not rows.is_empty():
+            issues.append(
+                _issue(
+                    output,
+                    ", ".join(keys),
+                    f"{how} rows",
+                    n_rows=rows.height,
+                    examples=rows.select(keys).sort(keys),
+                )
+            )
+
+    joined = ref.select(common).join(
+        cand, on=keys, how="inner", suffix="_cand", nulls_equal=True
+    )
+    for column in common:
+        if column in keys or column == "rank":
+            continue
+
+        dtype = ref.schema[column]
+        wrong = joined.filter(~_same_expr(column=column, dtype=dtype, conf=conf))
+        if wrong.is_empty():
+            continue
+
+        max_abs_diff = None
+        if dtype.is_numeric():
+            max_abs_diff = wrong.select(
+                (pl.col(column) - pl.col(f"{column}_cand")).abs().max()
+            ).item()
+        issues.append(
+            _issue(
+                output,
+                column,
+                "values",
+                n_rows=wrong.height,
+                max_abs_diff=max_abs_diff,
+                examples=wrong.select(*keys, column, f"{column}_cand").sort(keys),
+            )
+        )
+
+    if "rank" in common:
+        issues += _rank_issues(
+            output=output, ref=ref, cand=cand, keys=keys, rank_by=spec["rank_by"]
+        )
+
+    return issues
+
+
+def diff_engine(name: str, engine: str) -> pl.DataFrame:
+    """
+    Run an engine on a golden set's inputs & diff what it produces
+    """
+    golden_dir = _golden_dir(name)
+    manifest = json.loads((golden_dir / "manifest.json").read_text())
+    if manifest["code"] != hash_code(swing_scan, filter_scan):
+        logger.info(f"Scan code changed since {name} was frozen")
+
+    inputs = {
+        "data": pl.read_parquet(golden_dir / "input.parquet"),
+        "db_path": golden_dir / "data.db",
+        "end_date": datetime.strptime(manifest["end_date"], "%Y-%m-%d"),
+        "adr_cutoff": manifest["adr_cutoff"],
+        "market": Market(manifest["market"]),
+    }
+    work_dir = golden_dir / "work" / engine
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+
+    outputs = ENGINES[engine](inputs, work_dir)
+
+    issues = []
+    for output, cand in outputs.items():
+        ref = pl.read_parquet(golden_dir / "outputs" / f"{output}.parquet")
+        issues += diff_frames(output=output, ref=ref, cand=cand)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(
+        f"{engine} on {name}: {len(outputs)} outputs compared, {len(issues)} differences"
+    )
+
+    return pl.DataFrame(
+        issues,
+        schema={
+            "output": pl.String(),
+            "column": pl.String(),
+            "issue": pl.String(),
+            "n_rows": pl.Int64(),
+            "max_abs_diff": pl.Float64(),
+            "examples": pl.String(),
+        },
+    ).with_columns(pl.lit(engine).alias("engine"))
@@ -0,0 +1,61 @@
+import json
+import logging
+import subprocess
+import sys
+
+import polars as pl
+
+from src.config.benchmarks import HEAVY_MODULES
+
+logger = logging.getLogger(__name__)
+
+# run in a fresh interpreter, nothing imported before the module
+_SNIPPET = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({
+    "import_s": time.perf_counter() - start,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def time_import(module: str, repeat: int) -> dict:
+    """
+    Cold import time of a module, the fastest of repeat fresh interpreters
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET, module, *HEAVY_MODULES],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    times = [run["import_s"] for run in runs]
+    return {
+        "case": f"import {module}",
+        "n_symbols": 0,
+        "n_rows": 0,
+        "min_s": round(min(times), 4),
+        "mean_s": round(sum(times) / len(times), 4),
+        "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+        "case_rss_mb": None,
+        "heavy_modules": ", ".join(runs[0]["loaded"]),
+    }
+
+
+def run_import_suite(modules: list[str], repeat: int) -> pl.DataFrame:
+    res = []
+    for module in modules:
+        row = time_import(module=module, repeat=repeat)
+        logger.info(
+            f"import {module}: {row['min_s']}s, heavy modules: {row['heavy_modules'] or 'none'}"
+        )
+        res.append(row)
+
+    return pl.DataFrame(res, infer_schema_length=None)
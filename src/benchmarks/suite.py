@@ -0,0 +1,348 @@
+import gc
+import json
+import logging
+import os
+import platform
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from src.benchmarks.synthetic import synthetic_benchmark, synthetic_ohlcv
+from src.config.benchmarks import SYNTHETIC_CONF
+from src.config.storage_layout import StorageLayout
+from src.pipeline.cache import hash_config
+from src.pipeline.metrics import peak_rss_mb
+from src.scans.filter_scan import (adr_filter, basic_filter,
+                                   inside_bars_filter, pullback_filter,
+                                   sma_200_filter, vcp_filter)
+from src.scans.rs_line import rs_line_filter
+from src.scans.sharded import process_pool
+from src.scans.swing_scan import (basic_scan, find_stocks, high_adr_scan,
+                                  prep_scan_data, prep_scan_frame)
+
+logger = logging.getLogger(__name__)
+
+TABLE_ID = "equity_ohlcv_daily"
+_BASELINE_PATH = StorageLayout.BENCHMARKS / "baseline.json"
+
+
+def _end_date() -> datetime:
+    return datetime.strptime(SYNTHETIC_CONF["end_date"], "%Y-%m-%d")
+
+
+def _prepped(data: pl.DataFrame, conf: dict) -> pl.DataFrame:
+    return prep_scan_frame(
+        data=data,
+        lookback_min_gains_dict=conf["scans_conf"]["lookback_min_return_pct"],
+    ).collect()
+
+
+## Cases, each does its untimed setup and returns the call to time
+
+
+def _prep_scan_data(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    # DB read included, as the scanner runs it
+    return lambda: prep_scan_data(
+        conn=f"sqlite:///{data_dir / 'data.db'}",
+        table_id=TABLE_ID,
+        lookback_min_gains_dict=conf["scans_conf"]["lookback_min_return_pct"],
+    ).collect()
+
+
+def _prep_scan_frame(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: _prepped(data=data, conf=conf)
+
+
+def _basic_scan(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    prepped = _prepped(data=data, conf=conf)
+    return lambda: basic_scan(data=prepped.lazy(), conf=conf["scans_conf"]).collect()
+
+
+def _high_adr_scan(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    prepped = _prepped(data=data, conf=conf)
+    return lambda: high_adr_scan(
+        data=prepped.lazy(), adr_cutoff=conf["adr_cutoff"], conf=conf["scans_conf"]
+    ).collect()
+
+
+def _find_stocks(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    basic_scan_df = basic_scan(
+        data=_prepped(data=data, conf=conf).lazy(), conf=conf["scans_conf"]
+    )
+    end_date = _end_date()
+    start_date = end_date - timedelta(days=conf["scans_conf"]["months_lookback"] * 30)
+    return lambda: find_stocks(
+        data=basic_scan_df, start_date=start_date, end_date=end_date
+    )
+
+
+def _basic_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    symbol_list = data.get_column("symbol").unique().to_list()
+    return lambda: basic_filter(
+        data=data.lazy(),
+        symbol_list=symbol_list,
+        scan_date=_end_date(),
+        conf=conf["scans_conf"],
+    )
+
+
+def _sma_200_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: sma_200_filter(data=data, end_date=_end_date())
+
+
+def _adr_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: adr_filter(
+        data=data.lazy(), adr_cutoff=conf["adr_cutoff"], end_date=_end_date()
+    )
+
+
+def _pullback_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: pullback_filter(
+        data=data.lazy(), end_date=_end_date(), conf=conf["filter_conf"]["pullback"]
+    )
+
+
+def _vcp_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: vcp_filter(
+        data=data.lazy(), end_date=_end_date(), conf=conf["filter_conf"]["vcp"]
+    )
+
+
+def _inside_bars_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    return lambda: inside_bars_filter(
+        data=data.lazy(), end_date=_end_date(), conf=conf["filter_conf"]["inside_bars"]
+    )
+
+
+def _rs_line_filter(data: pl.DataFrame, data_dir: Path, conf: dict) -> Callable:
+    benchmark = synthetic_benchmark()
+    return lambda: rs_line_filter(
+        data=data,
+        benchmark=benchmark,
+        end_date=_end_date().date(),
+        conf=conf["filter_conf"]["rs_line"],
+    )
+
+
+CASES = {
+    "prep_scan_data": _prep_scan_data,
+    "prep_scan_frame": _prep_scan_frame,
+    "basic_scan": _basic_scan,
+    "high_adr_scan": _high_adr_scan,
+    "find_stocks": _find_stocks,
+    "basic_filter": _basic_filter,
+    "sma_200_filter": _sma_200_filter,
+    "adr_filter": _adr_filter,
+    "pullback_filter": _pullback_filter,
+    "vcp_filter": _vcp_filter,
+    "inside_bars_filter": _inside_bars_filter,
+    "rs_line_filter": _rs_line_filter,
+}
+
+
+## Running
+
+
+def dataset_dir(n_symbols: int) -> Path:
+    """
+    Synthetic universe as Parquet & SQLite, generated once per conf & size
+    """
+    key = hash_config({"n_symbols": n_symbols, **SYNTHETIC_CONF})[:12]
+    out = StorageLayout.BENCHMARKS / "data" / f"{n_symbols}_{key}"
+    if (out / "data.db").exists():
+        return out
+
+    out.mkdir(parents=True, exist_ok=True)
+    data = synthetic_ohlcv(n_symbols=n_symbols)
+    data.write_parquet(out / "ohlcv.parquet")
+
+    # written last, its presence marks a complete dataset
+    write_ohlcv_db(data=data, db_path=out / "data.db")
+
+    return out
+
+
+def write_ohlcv_db(data: pl.DataFrame, db_path: Path) -> None:
+    """
+    OHLCV frame as the equity table of a SQLite DB, as the brokers store it
+    """
+    logger.info(f"Writing {data.shape[0]} rows to {db_path}")
+    tmp_path = db_path.with_suffix(".tmp.db")
+    tmp_path.unlink(missing_ok=True)
+    data.write_database(
+        table_name=TABLE_ID,
+        connection=f"sqlite:///{tmp_path}",
+        if_table_exists="replace",
+    )
+    tmp_path.rename(db_path)
+
+
+def _reset_peak_rss() -> None:
+    # Linux only, elsewhere the peak includes the setup
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _rss_mb(field: str) -> float | None:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return peak_rss_mb() if field == "VmHWM" else None
+
+
+def _run_case(case: str, n_symbols: int, data_dir: Path, conf: dict) -> dict:
+    """
+    Time one case in a fresh process, so its peak memory is its own
+    """
+    data = pl.read_parquet(data_dir / "ohlcv.parquet")
+    func = CASES[case](data=data, data_dir=data_dir, conf=conf)
+
+    gc.collect()
+    _reset_peak_rss()
+    setup_mb = _rss_mb("VmRSS")
+
+    times = []
+    for _ in range(conf["repeat"]):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    peak_mb = _rss_mb("VmHWM")
+
+    return {
+        "case": case,
+        "n_symbols": n_symbols,
+        "n_rows": data.shape[0],
+        "min_s": round(min(times), 4),
+        "mean_s": round(sum(times) / len(times), 4),
+        "peak_rss_mb": peak_mb,
+        # above the data & setup held in memory
+        "case_rss_mb": None
+        if setup_mb is None or peak_mb is None
+        else round(peak_mb - setup_mb, 1),
+    }
+
+
+def run_suite(scales: list[int], cases: list[str], conf: dict) -> pl.DataFrame:
+    """
+    Every case at every scale, one spawned process each
+    """
+    res = []
+    for n_symbols in scales:
+        data_dir = dataset_dir(n_symbols=n_symbols)
+        for case in cases:
+            with process_pool(max_workers=1) as executor:
+                row = executor.submit(
+                    _run_case, case, n_symbols, data_dir, conf
+                ).result()
+            logger.info(
+                f"{case} @ {n_symbols}: {row['min_s']}s, peak {row['peak_rss_mb']} MB"
+            )
+            res.append(row)
+
+    return pl.DataFrame(res, infer_schema_length=None)
+
+
+## Baselines
+
+
+def _machine() -> dict:
+    return {
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+    }
+
+
+def save_run(res: pl.DataFrame) -> Path:
+    out = StorageLayout.BENCHMARKS / "runs" / f"{datetime.now():%Y%m%dT%H%M%S}.parquet"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    res.write_parquet(out)
+    return out
+
+
+def save_baseline(res: pl.DataFrame) -> None:
+    """
+    Merge the results into the baseline, replacing the cases measured again
+    """
+    baseline = read_baseline()
+    if baseline is not None:
+        res = pl.concat(
+            [baseline.join(res, on=["case", "n_symbols"], how="anti"), res],
+            how="diagonal_relaxed",
+        )
+
+    _BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _BASELINE_PATH.write_text(
+        json.dumps(
+            {
+                "saved_at": datetime.now().isoformat(timespec="seconds"),
+                "machine": _machine(),
+                "results": res.sort("case", "n_symbols").to_dicts(),
+            },
+            indent=2,
+        )
+    )
+    logger.info(f"Baseline saved: {_BASELINE_PATH}")
+
+
+def read_baseline() -> pl.DataFrame | None:
+    if not _BASELINE_PATH.exists():
+        return None
+
+    baseline = json.loads(_BASELINE_PATH.read_text())
+    if baseline["machine"] != _machine():
+        logger.warning(
+            f"Baseline from another machine, ratios are indicative: {baseline['machine']}"
+        )
+    return pl.DataFrame(baseline["results"], infer_schema_length=None)
+
+
+def compare(res: pl.DataFrame, regression_ratio: float) -> pl.DataFrame:
+    """
+    Time & memory of each case over its baseline, regressed when either ratio
+    is above regression_ratio
+    """
+    baseline = read_baseline()
+    if baseline is None:
+        logger.warning("No baseline saved, nothing to compare against")
+        return res.with_columns(
+            pl.lit(None, dtype=pl.Float64()).alias("time_ratio"),
+            pl.lit(None, dtype=pl.Float64()).alias("rss_ratio"),
+            pl.lit(False).alias("regressed"),
+        )
+
+    return (
+        res.join(
+            baseline.select(
+                "case",
+                "n_symbols",
+                pl.col("min_s").alias("baseline_s"),
+                pl.col("peak_rss_mb").alias("baseline_rss_mb"),
+            ),
+            on=["case", "n_symbols"],
+            how="left",
+        )
+        .with_columns(
+            (pl.col("min_s") / pl.col("baseline_s")).round(2).alias("time_ratio"),
+            (pl.col("peak_rss_mb") / pl.col("baseline_rss_mb"))
+            .round(2)
+            .alias("rss_ratio"),
+        )
+        .with_columns(
+            (
+                (pl.col("time_ratio") > regression_ratio)
+                | (pl.col("rss_ratio") > regression_ratio)
+            )
+            .fill_null(False)
+            .alias("regressed")
+        )
+    )
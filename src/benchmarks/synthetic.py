@@ -0,0 +1,220 @@
+import logging
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import polars as pl
+
+from src.config.benchmarks import INTRADAY_SESSION, SYNTHETIC_CONF
+
+logger = logging.getLogger(__name__)
+
+# symbols drawn per random stream
+_BLOCK_SYMBOLS = 1_000
+_TIME_ZONE = "Asia/Calcutta"
+
+
+def _bar_minutes(frequency: str) -> int | None:
+    """
+    Minutes per bar of a Kite frequency, None for daily bars
+    """
+    if frequency == "day":
+        return None
+    if frequency == "minute":
+        return 1
+    if frequency.endswith("minute") and frequency[: -len("minute")].isdigit():
+        return int(frequency[: -len("minute")])
+    raise ValueError(f"Unsupported frequency: {frequency}")
+
+
+def trading_calendar(
+    n_days: int, end_date: str, holiday_pct: float, seed: int
+) -> list[date]:
+    """
+    Last n_days weekdays up to end_date, less a random share of holidays.
+    end_date itself is always a trading day.
+    """
+    rng = np.random.default_rng([seed, 0])
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    days = []
+    current = end
+    while len(days) < n_days:
+        if current.weekday() < 5 and (
+            current == end or rng.random() * 100 >= holiday_pct
+        ):
+            days.append(current)
+        current -= timedelta(days=1)
+
+    return days[::-1]
+
+
+def _timestamps(days: list[date], frequency: str) -> pl.Series:
+    minutes = _bar_minutes(frequency)
+    day_starts = pl.Series("timestamp", days, dtype=pl.Date()).cast(pl.Datetime("us"))
+
+    if minutes is None:
+        return day_starts.dt.replace_time_zone(_TIME_ZONE)
+
+    open_h, open_m = map(int, INTRADAY_SESSION["open"].split(":"))
+    close_h, close_m = map(int, INTRADAY_SESSION["close"].split(":"))
+    offsets = np.arange(open_h * 60 + open_m, close_h * 60 + close_m, minutes)
+
+    return (
+        pl.DataFrame({"day": day_starts})
+        .join(pl.DataFrame({"offset": offsets}), how="cross")
+        .select(
+            (pl.col("day") + pl.duration(minutes=pl.col("offset")))
+            .dt.replace_time_zone(_TIME_ZONE)
+            .alias("timestamp")
+        )
+        .to_series()
+    )
+
+
+def _available(n_symbols: int, n_bars: int, conf: dict, rng) -> np.ndarray:
+    """
+    Bars each symbol traded: late listings, delistings & one suspension
+    """
+    mask = np.ones((n_symbols, n_bars), dtype=bool)
+
+    late = rng.random(n_symbols) * 100 < conf["late_listing_pct"]
+    starts = rng.integers(1, max(2, n_bars // 2), n_symbols)
+    delisted = rng.random(n_symbols) * 100 < conf["delisted_pct"]
+    ends = rng.integers(n_bars // 2, n_bars, n_symbols)
+    suspended = rng.random(n_symbols) * 100 < conf["suspension_pct"]
+    susp_starts = rng.integers(0, n_bars, n_symbols)
+    susp_lengths = rng.integers(1, conf["max_suspension_bars"] + 1, n_symbols)
+
+    bars = np.arange(n_bars)
+    mask &= ~(late[:, None] & (bars[None, :] < starts[:, None]))
+    mask &= ~(delisted[:, None] & (bars[None, :] >= ends[:, None]))
+    mask &= ~(
+        suspended[:, None]
+        & (bars[None, :] >= susp_starts[:, None])
+        & (bars[None, :] < (susp_starts + susp_lengths)[:, None])
+    )
+    # the last bar is the scan date, keep it for every listed symbol
+    mask[~delisted, -1] = True
+
+    return mask
+
+
+def _block(
+    first_symbol: int,
+    timestamps: pl.Series,
+    bars_per_day: int,
+    conf: dict,
+    rng,
+) -> pl.DataFrame:
+    n_symbols = _BLOCK_SYMBOLS
+    n_bars = len(timestamps)
+
+    # per symbol drift & volatility, a spread of quiet and high ADR names
+    daily_vol = np.exp(rng.normal(np.log(0.022), 0.45, n_symbols))
+    vol = daily_vol / np.sqrt(bars_per_day)
+    drift = rng.normal(0.0004, 0.0015, n_symbols) / bars_per_day
+
+    rtr = rng.standard_t(df=4, size=(n_symbols, n_bars)) * vol[:, None] / np.sqrt(2)
+    rtr += drift[:, None]
+
+    # overnight gaps, the open jumps away from the previous close
+    gaps = np.where(
+        rng.random((n_symbols, n_bars)) * 100 < conf["gap_prob_pct"],
+        rng.normal(0, 4, (n_symbols, n_bars)) * vol[:, None],
+        rng.normal(0, 0.3, (n_symbols, n_bars)) * vol[:, None],
+    )
+    gaps[:, np.arange(n_bars) % bars_per_day != 0] = 0
+
+    base = np.exp(rng.uniform(np.log(20), np.log(3_000), n_symbols))
+    close = base[:, None] * np.exp(np.cumsum(rtr + gaps, axis=1))
+    open_ = close * np.exp(-rtr)
+
+    wick = np.abs(rng.normal(0, 0.5, (2, n_symbols, n_bars))) * vol[None, :, None]
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+
+    volume_scale = np.exp(rng.normal(np.log(200_000), 1.2, n_symbols)) / bars_per_day
+    volume = (
+        volume_scale[:, None]
+        * np.exp(rng.normal(0, 0.4, (n_symbols, n_bars)))
+        * (1 + 10 * np.abs(rtr))
+    ).astype(np.int64)
+
+    mask = _available(n_symbols=n_symbols, n_bars=n_bars, conf=conf, rng=rng)
+    symbols = np.repeat(
+        np.array(
+            [f"SYN{i:05d}" for i in range(first_symbol, first_symbol + n_symbols)]
+        ),
+        n_bars,
+    )
+
+    return pl.DataFrame(
+        {
+            "symbol": symbols,
+            "timestamp": timestamps.gather(np.tile(np.arange(n_bars), n_symbols)),
+            "open": open_.ravel().round(2),
+            "high": high.ravel().round(2),
+            "low": low.ravel().round(2),
+            "close": close.ravel().round(2),
+            "volume": volume.ravel(),
+        }
+    ).filter(pl.Series(mask.ravel()))
+
+
+def synthetic_ohlcv(n_symbols: int, conf: dict = SYNTHETIC_CONF) -> pl.DataFrame:
+    """
+    Deterministic OHLCV universe in the equity table layout, a smaller
+    universe is the first symbols of a larger one. Gaps as in real data:
+    exchange holidays, late listings, delistings, suspensions & overnight
+    price gaps.
+    """
+    days = trading_calendar(
+        n_days=conf["n_days"],
+        end_date=conf["end_date"],
+        holiday_pct=conf["holiday_pct"],
+        seed=conf["seed"],
+    )
+    timestamps = _timestamps(days=days, frequency=conf["frequency"])
+    bars_per_day = len(timestamps) // len(days)
+
+    blocks = []
+    for first_symbol in range(0, n_symbols, _BLOCK_SYMBOLS):
+        rng = np.random.default_rng([conf["seed"], 1, first_symbol])
+        blocks.append(
+            _block(
+                first_symbol=first_symbol,
+                timestamps=timestamps,
+                bars_per_day=bars_per_day,
+                conf=conf,
+                rng=rng,
+            )
+        )
+
+    # whole blocks are drawn, the random streams do not depend on n_symbols
+    res = pl.concat(blocks).filter(pl.col("symbol") < f"SYN{n_symbols:05d}")
+    logger.info(
+        f"Synthetic OHLCV: {n_symbols} symbols, {len(days)} days, {res.shape[0]} rows"
+    )
+
+    return res
+
+
+def synthetic_benchmark(conf: dict = SYNTHETIC_CONF) -> pl.DataFrame:
+    """
+    Index for the RS line on the same calendar, in the read_benchmark layout
+    """
+    days = trading_calendar(
+        n_days=conf["n_days"],
+        end_date=conf["end_date"],
+        holiday_pct=conf["holiday_pct"],
+        seed=conf["seed"],
+    )
+    rng = np.random.default_rng([conf["seed"], 2])
+    close = 20_000 * np.exp(np.cumsum(rng.normal(0.0003, 0.009, len(days))))
+
+    return pl.DataFrame(
+        {
+            "timestamp": pl.Series(days, dtype=pl.Date()),
+            "benchmark_close": close.round(2),
+        }
+    )
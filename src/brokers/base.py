@@ -1,5 +1,9 @@
 import logging
 from abc import ABC, abstractmethod
+from datetime import date
+from typing import Callable
+
+import polars as pl
 
 from src.config.exchange import Exchange
 from src.config.market import Market
@@ -13,6 +17,16 @@ class BaseBroker(ABC):
     Brokers fetch data, they do NOT own storage.
     """
 
+    # timed in every subclass, a decorator on the abstract method is lost
+    # when the subclass overrides it
+    _TIMED_METHODS = ("login", "fetch_instruments", "fetch_ohlcv")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls._TIMED_METHODS:
+            if name in cls.__dict__:
+                setattr(cls, name, timeit(cls.__dict__[name]))
+
     def __init__(
         self,
         market: Market,
@@ -45,7 +59,6 @@ class BaseBroker(ABC):
             market=self._market, exchange=self._exchange
         )
 
-    @timeit
     @abstractmethod
     def login(self) -> object:
         """
@@ -54,7 +67,6 @@ class BaseBroker(ABC):
         """
         pass
 
-    @timeit
     @abstractmethod
     def fetch_instruments(self) -> None:
         """
@@ -65,7 +77,6 @@ class BaseBroker(ABC):
         """
         pass
 
-    @timeit
     @abstractmethod
     def fetch_ohlcv(
         self,
@@ -78,6 +89,29 @@ class BaseBroker(ABC):
         """
         pass
 
+    def fetch_ohlcv_stream(
+        self, priority: list[str], on_symbol: Callable[[str], None]
+    ) -> None:
+        """
+        Fetch OHLCV bars as fetch_ohlcv, symbols in priority first, calling
+        on_symbol once each symbol's bars are written. Fetchers that do not
+        go symbol by symbol fetch as usual & call nothing.
+        """
+        self.fetch_ohlcv()
+
+    def fetch_ranges(self, ranges: pl.DataFrame, insert_table_name: str) -> None:
+        """
+        Fetch OHLCV bars of only the given ranges, a symbol, start_date &
+        end_date per row, to backfill gaps
+        """
+        raise NotImplementedError(f"{self._config.NAME} has no range fetch")
+
+    def bars_available(self, day: date) -> bool:
+        """
+        Whether the end of day bars of day can be fetched yet
+        """
+        raise NotImplementedError(f"{self._config.NAME} has no availability probe")
+
     @abstractmethod
     def __call__(
         self,
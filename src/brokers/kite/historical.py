@@ -1,12 +1,14 @@
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta
-from typing import Literal, Union
+from datetime import date, datetime, timedelta
+from typing import Callable, Literal, Union
 
 import polars as pl
 from kiteconnect import KiteConnect
 from ratelimit import limits, sleep_and_retry
 
+from src.pipeline.metrics import api_call, bind_stage
+
 
 class KiteHistorical:
     """
@@ -68,7 +70,8 @@ class KiteHistorical:
         current_start = start_date
         date_ranges = []
 
-        while current_start < end_date:
+        # <=, a one day incremental fetch starts & ends on the same day
+        while current_start <= end_date:
             current_end = min(current_start + timedelta(days=max_days), end_date)
             date_ranges.append((current_start, current_end))
             current_start = current_end + timedelta(seconds=1)
@@ -77,6 +80,7 @@ class KiteHistorical:
 
     @sleep_and_retry
     @limits(calls=3, period=1)
+    @api_call("kite.historical_data")
     def _get_historical_data(
         self,
         instrument_token: str,
@@ -127,6 +131,24 @@ class KiteHistorical:
         )
         return data
 
+    def day_bar(self, instrument_token: str, day: date) -> dict | None:
+        """
+        Daily candle of the instrument for day, None when there is none yet,
+        rate limited with the fetches. Kite serves the candle of the current
+        day while it trades, so a candle alone does not mean the day is final.
+        """
+        candles = self._get_historical_data(
+            instrument_token=instrument_token,
+            from_date=day,
+            to_date=day,
+            interval="day",
+            continuous=False,
+            oi=False,
+        )
+        return next(
+            (candle for candle in candles if candle["date"].date() == day), None
+        )
+
     def _get_data(
         self,
         date_ranges: list[tuple[datetime, datetime]],
@@ -155,7 +177,7 @@ class KiteHistorical:
         with ThreadPoolExecutor(max_workers=self._historical_api_limit) as executor:
             for start_date, end_date in date_ranges:
                 future = executor.submit(
-                    self._get_historical_data,
+                    bind_stage(self._get_historical_data),
                     instrument_token,
                     start_date,
                     end_date,
@@ -250,6 +272,8 @@ class KiteHistorical:
         db_conn: str,
         insert_table_name: str,
         failed_table_name: str,
+        priority: list[str] | None = None,
+        on_symbol: Callable[[str], None] | None = None,
     ) -> None:
         """
         Fetches historical data for all instruments listed in the provided CSV file and writes the data to a database table.
@@ -260,17 +284,26 @@ class KiteHistorical:
         end_date (str): End date for fetching historical data. YYYY-MM-DD HH:MM:SS
         frequency (Literal["minute", "3minute", "5minute", "10minute", "15minute", "30minute", "60minute", "day"]): Frequency of the historical data.
         table_name (str): Name of the table where the data will be stored.
+        priority (list[str] | None): Symbols fetched first, in this order, the rest after by symbol.
+        on_symbol (Callable[[str], None] | None): Called with each symbol once its data is written.
         """
 
         self._table_name = insert_table_name
         self._conn = db_conn
 
+        symbol_tokens = pl.scan_parquet(source=self._file_location).select(
+            "symbol", "instrument_token"
+        )
+        if priority:
+            symbol_tokens = symbol_tokens.join(
+                pl.LazyFrame({"symbol": priority}).with_row_index("priority"),
+                on="symbol",
+                how="left",
+            ).sort("priority", "symbol", nulls_last=True)
+        else:
+            symbol_tokens = symbol_tokens.sort("symbol")
         symbol_tokens = (
-            pl.scan_parquet(source=self._file_location)
-            .select("symbol", "instrument_token")
-            .sort("symbol")
-            .collect()
-            .rows()
+            symbol_tokens.select("symbol", "instrument_token").collect().rows()
         )
 
         self.logger.info(f"""Number of Tokens are {len(symbol_tokens)}""")
@@ -284,7 +317,97 @@ class KiteHistorical:
 
         self.logger.info(f"""Total Number of Date Ranges are {len(date_ranges)}""")
 
-        for symbol, token in symbol_tokens:
+        self._fetch_symbols(
+            symbol_ranges=[
+                (symbol, token, date_ranges) for symbol, token in symbol_tokens
+            ],
+            frequency=frequency,
+            oi_flag=oi_flag,
+            continuous_flag=continuous_flag,
+            db_conn=db_conn,
+            failed_table_name=failed_table_name,
+            on_symbol=on_symbol,
+        )
+
+    def get_ranges_data(
+        self,
+        ranges: pl.DataFrame,
+        frequency: str,
+        oi_flag: bool,
+        continuous_flag: bool,
+        db_conn: str,
+        insert_table_name: str,
+        failed_table_name: str,
+    ) -> None:
+        """
+        Fetches only the given date ranges of each symbol, to backfill gaps.
+
+        Parameters:
+        ranges (pl.DataFrame): symbol, start_date & end_date of each range, each within the interval's limit.
+        Others as get_historical_data.
+        """
+
+        self._table_name = insert_table_name
+        self._conn = db_conn
+
+        tokens = dict(
+            pl.scan_parquet(source=self._file_location)
+            .select("symbol", "instrument_token")
+            .collect()
+            .rows()
+        )
+        missing = set(ranges.get_column("symbol")) - set(tokens)
+        if missing:
+            self.logger.warning(f"""No instrument token for {sorted(missing)}""")
+
+        symbol_ranges = [
+            (
+                symbol,
+                tokens[symbol],
+                [
+                    (
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.min.time()),
+                    )
+                    for start_date, end_date in symbol_df.select(
+                        "start_date", "end_date"
+                    ).rows()
+                ],
+            )
+            for (symbol,), symbol_df in ranges.partition_by(
+                "symbol", as_dict=True, maintain_order=True
+            ).items()
+            if symbol in tokens
+        ]
+
+        self.logger.info(
+            f"""Backfilling {ranges.shape[0]} date ranges of {len(symbol_ranges)} symbols"""
+        )
+
+        self._fetch_symbols(
+            symbol_ranges=symbol_ranges,
+            frequency=frequency,
+            oi_flag=oi_flag,
+            continuous_flag=continuous_flag,
+            db_conn=db_conn,
+            failed_table_name=failed_table_name,
+        )
+
+    def _fetch_symbols(
+        self,
+        symbol_ranges: list[tuple[str, str, list[tuple[datetime, datetime]]]],
+        frequency: str,
+        oi_flag: bool,
+        continuous_flag: bool,
+        db_conn: str,
+        failed_table_name: str,
+        on_symbol: Callable[[str], None] | None = None,
+    ) -> None:
+        """
+        Fetches each symbol's date ranges, logging the failed ones to the failed table.
+        on_symbol is called after each symbol, its data written.
+        """
+        for symbol, token, date_ranges in symbol_ranges:
             param_map = self._get_data(
                 date_ranges=date_ranges,
                 instrument_token=token,
@@ -305,3 +428,6 @@ class KiteHistorical:
                     if_table_exists="append",
                 )
                 self.logger.info(f"""Failed List added for {symbol}""")
+
+            if on_symbol is not None:
+                on_symbol(symbol)
@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable
 
 import polars as pl
 
@@ -9,6 +11,9 @@ from src.brokers.kite.login import KiteLogin
 
 
 class Kite(BaseBroker):
+    # probe candle of the last poll, the day is final once two reads agree
+    _probe_candle: dict | None = None
+
     def login(self) -> None:
         self._client = KiteLogin(credentials_path=self._config.CREDENTIALS_PATH)()
 
@@ -18,7 +23,11 @@ class Kite(BaseBroker):
         self.logger.info(f"Symbols in Instruments List {ins_df.shape[0]}")
         ins_df.write_parquet(self._download_path / "instruments.parquet")
 
-    def fetch_ohlcv(self):
+    def fetch_ohlcv(
+        self,
+        priority: list[str] | None = None,
+        on_symbol: Callable[[str], None] | None = None,
+    ):
         df = (
             pl.scan_parquet(self._download_path / "instruments.parquet")
             .remove(pl.col("segment") == "INDICES")
@@ -38,9 +47,56 @@ class Kite(BaseBroker):
         save_path = self._download_path / "symbols_fecthed.parquet"
         df.write_parquet(save_path)
 
+        self._fetch_historical(
+            file_location=save_path,
+            insert_table_name=self._tables_name["equity_ohlcv_daily"],
+            failed_table_name=self._tables_name["equity_ohlcv_failed"],
+            priority=priority,
+            on_symbol=on_symbol,
+        )
+
+    def fetch_ohlcv_stream(
+        self, priority: list[str], on_symbol: Callable[[str], None]
+    ) -> None:
+        self.fetch_ohlcv(priority=priority, on_symbol=on_symbol)
+
+    def fetch_indices_ohlcv(self):
+        """
+        Index bars through the same fetcher, into the indices tables
+        """
+        if "indices_ohlcv_daily" not in self._tables_name:
+            self.logger.info(f"No indices tables for {self._exchange}")
+            return
+
+        df = pl.scan_parquet(self._download_path / "instruments.parquet").filter(
+            pl.col("segment") == "INDICES"
+        )
+        if self._config.INDICES is not None:
+            df = df.filter(pl.col("symbol").is_in(self._config.INDICES))
+        df = df.collect()
+
+        self.logger.info(f"Index data will be fecthed for {df.shape[0]} indices")
+
+        save_path = self._download_path / "indices_fecthed.parquet"
+        df.write_parquet(save_path)
+
+        self._fetch_historical(
+            file_location=save_path,
+            insert_table_name=self._tables_name["indices_ohlcv_daily"],
+            failed_table_name=self._tables_name["indices_ohlcv_failed"],
+        )
+
+    def _fetch_historical(
+        self,
+        file_location: Path,
+        insert_table_name: str,
+        failed_table_name: str,
+        priority: list[str] | None = None,
+        on_symbol: Callable[[str], None] | None = None,
+    ):
         kite_hist = KiteHistorical(
             kite=self._client,
-            file_location=save_path,
+            file_location=file_location,
             config=self._config,
         )
 
@@ -51,7 +107,7 @@ class Kite(BaseBroker):
             "%Y-%m-%d 00:00:00"
         )
 
-        self.logger.info("Starting Data Fetching...")
+        self.logger.info(f"Starting Data Fetching into {insert_table_name}...")
 
         kite_hist.get_historical_data(
             start_date=start_date,
@@ -60,11 +116,56 @@ class Kite(BaseBroker):
             oi_flag=False,
             continuous_flag=False,
             db_conn=f"sqlite:///{self._db_path}",
+            failed_table_name=failed_table_name,
+            insert_table_name=insert_table_name,
+            priority=priority,
+            on_symbol=on_symbol,
+        )
+
+    def fetch_ranges(self, ranges: pl.DataFrame, insert_table_name: str) -> None:
+        kite_hist = KiteHistorical(
+            kite=self._client,
+            file_location=self._download_path / "instruments.parquet",
+            config=self._config,
+        )
+        kite_hist.get_ranges_data(
+            ranges=ranges,
+            frequency=self._frequency,
+            oi_flag=False,
+            continuous_flag=False,
+            db_conn=f"sqlite:///{self._db_path}",
+            insert_table_name=insert_table_name,
             failed_table_name=self._tables_name["equity_ohlcv_failed"],
-            insert_table_name=self._tables_name["equity_ohlcv_daily"],
         )
 
+    def bars_available(self, day: date) -> bool:
+        """
+        Whether the probe index has its final bar for day, needs the
+        instruments. Kite serves the day candle intraday & it keeps moving
+        until the closing price is set after the close, so the bar counts as
+        final only when it reads the same on two polls in a row.
+        """
+        instruments_path = self._download_path / "instruments.parquet"
+        token = (
+            pl.scan_parquet(instruments_path)
+            .filter(pl.col("symbol") == self._config.PROBE_SYMBOL)
+            .select("instrument_token")
+            .collect()
+            .item(0, 0)
+        )
+        kite_hist = KiteHistorical(
+            kite=self._client, file_location=instruments_path, config=self._config
+        )
+        candle = kite_hist.day_bar(instrument_token=token, day=day)
+
+        final = candle is not None and candle == self._probe_candle
+        self._probe_candle = candle
+        if candle is not None and not final:
+            self.logger.info(f"Probe bar for {day} read, waiting for it to settle")
+        return final
+
     def __call__(self):
         self.login()
         self.fetch_instruments()
+        self.fetch_indices_ohlcv()
         self.fetch_ohlcv()
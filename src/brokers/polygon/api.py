@@ -1,4 +1,6 @@
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 
 import polars as pl
@@ -6,12 +8,18 @@ from massive import RESTClient
 from ratelimit import limits, sleep_and_retry
 
 from src.config.brokers.polygon import PolygonConfig
+from src.pipeline.metrics import api_call
 
 logger = logging.getLogger(__name__)
 
 CALLS = PolygonConfig.API_RATE_LIMIT_SECONDS["calls"]
 PERIOD = PolygonConfig.API_RATE_LIMIT_SECONDS["period"]
 
+# grouped daily aggs cover every exchange, exchanges fetched together inside
+# shared_grouped_daily_aggs share them
+_grouped_daily_aggs_cache: dict[tuple, pl.DataFrame | None] | None = None
+_grouped_daily_aggs_locks: dict[tuple, threading.Lock] = {}
+
 
 def get_ticker_types(client: RESTClient, asset_class: str, locale: str) -> pl.DataFrame:
     """ """
@@ -97,6 +105,7 @@ def date_range(
 
 @sleep_and_retry
 @limits(calls=CALLS, period=PERIOD)
+@api_call("polygon.grouped_daily_aggs")
 def get_grouped_daily_aggs(
     client: RESTClient,
     date: str,
@@ -130,6 +139,44 @@ def get_grouped_daily_aggs(
     return df
 
 
+@contextmanager
+def shared_grouped_daily_aggs():
+    """
+    Share grouped daily aggs between the fetches inside the block, dropped
+    on leaving it. A nested block uses the outer one's.
+    """
+    global _grouped_daily_aggs_cache
+    if _grouped_daily_aggs_cache is not None:
+        yield
+        return
+
+    _grouped_daily_aggs_cache = {}
+    try:
+        yield
+    finally:
+        _grouped_daily_aggs_cache = None
+        _grouped_daily_aggs_locks.clear()
+
+
+def get_cached_grouped_daily_aggs(client: RESTClient, date: str, **kwargs):
+    """
+    Grouped daily aggs for a date & request arguments, fetched once inside
+    shared_grouped_daily_aggs whichever exchange asks first, else every time
+    """
+    cache = _grouped_daily_aggs_cache
+    if cache is None:
+        return get_grouped_daily_aggs(client=client, date=date, **kwargs)
+
+    key = (date, *sorted(kwargs.items()))
+    with _grouped_daily_aggs_locks.setdefault(key, threading.Lock()):
+        if key not in cache:
+            cache[key] = get_grouped_daily_aggs(client=client, date=date, **kwargs)
+        else:
+            logger.debug(f"Using cached grouped aggs for DATE: {date}")
+
+    return cache[key]
+
+
 def get_date_range_grouped_daily_aggs(
     client: RESTClient, start_date: str, end_date: str, **kwargs
 ) -> pl.DataFrame:
@@ -139,7 +186,7 @@ def get_date_range_grouped_daily_aggs(
     )
 
     for d in date_ranges_list:
-        df = get_grouped_daily_aggs(client=client, date=d, **kwargs)
+        df = get_cached_grouped_daily_aggs(client=client, date=d, **kwargs)
 
         if (df is None) or (df.is_empty()):
             continue
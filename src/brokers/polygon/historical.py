@@ -3,7 +3,8 @@ import logging
 import polars as pl
 from massive import RESTClient
 
-from src.brokers.polygon.api import get_date_range_grouped_daily_aggs
+from src.brokers.polygon.api import (date_range, get_cached_grouped_daily_aggs,
+                                     get_date_range_grouped_daily_aggs)
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +16,24 @@ def polygon_historical(
     end_date: str,
     db_conn: str,
     insert_table_name: str,
+    index_symbols: list[str] | None = None,
+    index_table_name: str | None = None,
 ):
+    """
+    Grouped daily aggs of the date range, kept for the symbols of
+    file_location. index_symbols, ETFs not in the instruments, are taken
+    from the same requests into index_table_name.
+    """
     data = get_date_range_grouped_daily_aggs(
         client=client, start_date=start_date, end_date=end_date
     )
 
+    if index_symbols and index_table_name is not None:
+        data.filter(pl.col("symbol").is_in(index_symbols)).write_database(
+            table_name=index_table_name, connection=db_conn, if_table_exists="append"
+        )
+        logger.info(f"# Index symbols inserted into {index_table_name}")
+
     logger.info(
         f"# Fetched Data for {data.select(pl.col('symbol').unique()).shape[0]} symbols"
     )
@@ -32,6 +46,53 @@ def polygon_historical(
         f"# Symbols after filtering: {data.select(pl.col('symbol').unique()).shape[0]}"
     )
 
-    data.write_database(table_name=insert_table_name, connection=db_conn)
+    # appended, an incremental fetch adds to the bars held
+    data.write_database(
+        table_name=insert_table_name, connection=db_conn, if_table_exists="append"
+    )
 
     logger.info("Data Inserted Successfully")
+
+
+def polygon_backfill(
+    client: RESTClient,
+    ranges: pl.DataFrame,
+    db_conn: str,
+    insert_table_name: str,
+):
+    """
+    Grouped daily aggs of each weekday in the ranges, one request per date
+    whatever the number of symbols, kept for the symbols of the ranges
+    """
+    dates = sorted(
+        {
+            d
+            for start_date, end_date in ranges.select("start_date", "end_date").rows()
+            for d in date_range(
+                start_date=f"{start_date:%Y-%m-%d}", end_date=f"{end_date:%Y-%m-%d}"
+            )
+        }
+    )
+    logger.info(f"# Backfilling {len(dates)} dates for {ranges.shape[0]} ranges")
+
+    data = []
+    for d in dates:
+        df = get_cached_grouped_daily_aggs(client=client, date=d)
+        if df is not None:
+            data.append(df)
+    if not data:
+        logger.info("No Data Found for the ranges")
+        return
+
+    data = (
+        pl.concat(data, how="vertical_relaxed")
+        .with_columns(pl.col("timestamp").dt.date().alias("date"))
+        .join(ranges, on="symbol")
+        .filter(pl.col("date").is_between(pl.col("start_date"), pl.col("end_date")))
+        .drop("date", "start_date", "end_date")
+    )
+    data.write_database(
+        table_name=insert_table_name, connection=db_conn, if_table_exists="append"
+    )
+
+    logger.info(f"Backfilled {data.shape[0]} rows")
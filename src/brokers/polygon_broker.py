@@ -1,26 +1,42 @@
 import time
+from datetime import date
 
 import polars as pl
 
 from src.brokers.base import BaseBroker
-from src.brokers.polygon.historical import polygon_historical
+from src.brokers.polygon.api import get_grouped_daily_aggs
+from src.brokers.polygon.historical import polygon_backfill, polygon_historical
 from src.brokers.polygon.instruments import fetch_instruments
 from src.brokers.polygon.login import polygon_login
 
+# the instruments calls count against the same per minute limit & are not
+# rate limited, shared by every exchange fetched in the process
+_instruments_fetched_at: float | None = None
+
 
 class Polygon(BaseBroker):
     def login(self) -> None:
         self._client = polygon_login(credentials_path=self._config.CREDENTIALS_PATH)
 
     def fetch_instruments(self):
+        global _instruments_fetched_at
         ins_df = fetch_instruments(
             client=self._client, type="CS", market="stocks", exchange=self._exchange
         )
 
         self.logger.info(f"Symbols in Instruments List {ins_df.shape[0]}")
         ins_df.write_parquet(self._download_path / "instruments.parquet")
+        _instruments_fetched_at = time.monotonic()
 
     def fetch_ohlcv(self):
+        if _instruments_fetched_at is not None:
+            wait = self._config.API_RATE_LIMIT_SECONDS["period"] - (
+                time.monotonic() - _instruments_fetched_at
+            )
+            if wait > 0:
+                self.logger.info(f"Waiting {wait:.0f}s for the instruments calls")
+                time.sleep(wait)
+
         df = (
             pl.scan_parquet(self._download_path / "instruments.parquet")
             .select("symbol")
@@ -41,10 +57,25 @@ class Polygon(BaseBroker):
             end_date=self._end_date,
             db_conn=f"sqlite:///{self._db_path}",
             insert_table_name=self._tables_name["equity_ohlcv_daily"],
+            index_symbols=self._config.INDICES,
+            index_table_name=self._tables_name.get("indices_ohlcv_daily"),
+        )
+
+    def fetch_ranges(self, ranges: pl.DataFrame, insert_table_name: str) -> None:
+        polygon_backfill(
+            client=self._client,
+            ranges=ranges,
+            db_conn=f"sqlite:///{self._db_path}",
+            insert_table_name=insert_table_name,
+        )
+
+    def bars_available(self, day: date) -> bool:
+        return (
+            get_grouped_daily_aggs(client=self._client, date=day.strftime("%Y-%m-%d"))
+            is not None
         )
 
     def __call__(self):
         self.login()
         self.fetch_instruments()
-        time.sleep(60)
         self.fetch_ohlcv()
@@ -0,0 +1,21 @@
+import importlib
+import logging
+from functools import cache
+
+from src.brokers.base import BaseBroker
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def load_broker(path: str) -> type[BaseBroker]:
+    """
+    Broker class from its "module:Class" import path. Run modes name brokers
+    by path so their SDKs (kiteconnect, selenium, massive) are only imported
+    by the runs that fetch.
+    """
+    module_name, class_name = path.split(":")
+    broker = getattr(importlib.import_module(module_name), class_name)
+    logger.debug(f"Loaded broker {path}")
+
+    return broker
@@ -0,0 +1,7 @@
+ADJUSTMENT_CONF = {
+    # calendar days of stored bars fetched again by an incremental fetch, a
+    # split since shows as every overlapping bar moved by the same ratio
+    "overlap_days": 7,
+    "min_jump_pct": 2.0,  # smaller moves are revisions, replaced as fetched
+    "max_spread_pct": 0.5,  # ratios of one action agree within this
+}
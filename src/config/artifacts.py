@@ -0,0 +1,77 @@
+import polars as pl
+import polars.selectors as cs
+
+ARTIFACT_SUFFIX = ".arrow"
+
+_OHLCV_COLS = ["symbol", "timestamp", "open", "high", "low", "close", "volume"]
+
+_INDICATOR_COLS = [
+    "close_sma_50",
+    "close_sma_200",
+    "close_ema_9",
+    "close_ema_21",
+    "volume_sma_20",
+    "volume_sma_50",
+    "adr_pct_20",
+    "rvol_pct",
+    "clean_score_pct_50",
+]
+
+_SCAN_COLS = cs.by_name(_OHLCV_COLS + _INDICATOR_COLS, require_all=False) | (
+    cs.starts_with("pct_gain_prev_")
+)
+
+_FILTER_COLS = cs.by_name(["rank"] + _OHLCV_COLS + _INDICATOR_COLS, require_all=False)
+
+# Only the columns read downstream or by hand, no _prev_ or helper columns
+ARTIFACT_COLUMNS = {
+    "basic_scan": _SCAN_COLS,
+    "adr_scan": _SCAN_COLS,
+    "basic_stocks": cs.by_name("scan_date", "symbol"),
+    "adr_stocks": cs.by_name("scan_date", "symbol"),
+    "basic_filter": cs.by_name(_OHLCV_COLS, require_all=False),
+    "sma_200_filter": _FILTER_COLS,
+    "adr_filter": _FILTER_COLS,
+    "pullback_filter": _FILTER_COLS
+    | cs.by_name(
+        "near_ema_9", "near_ema_21", "near_sma_50", "mid_down_streak", "flag_dates"
+    ),
+    "vcp_filter": _FILTER_COLS
+    | cs.by_name(
+        "52_week_high",
+        "pivot_high",
+        "pivot_low",
+        "pivot_width",
+        "vol_dry_up_days",
+        require_all=False,
+    )
+    | cs.starts_with("contraction_depth_"),
+    "inside_bars_filter": _FILTER_COLS
+    | cs.by_name(
+        "contraction_length",
+        "mother_high",
+        "mother_low",
+        "mother_range_pct",
+        "contraction_depth_pct",
+    ),
+    "rs_line": cs.by_name("timestamp", "symbol", "close", "benchmark_close", "rs_line")
+    | cs.starts_with("rs_line_high_", "rs_new_high"),
+}
+
+# Explicit dtypes, applied to whichever of these columns an artifact has
+ARTIFACT_DTYPES = {
+    "rank": pl.UInt32(),
+    "symbol": pl.String(),
+    "timestamp": pl.Date(),
+    "scan_date": pl.Date(),
+    "open": pl.Float64(),
+    "high": pl.Float64(),
+    "low": pl.Float64(),
+    "close": pl.Float64(),
+    "volume": pl.Int64(),
+    "volume_sma_20": pl.Int64(),
+    "volume_sma_50": pl.Int64(),
+    "mid_down_streak": pl.Int32(),
+    "contraction_length": pl.Int32(),
+    "vol_dry_up_days": pl.Int32(),
+}
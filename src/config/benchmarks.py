@@ -0,0 +1,55 @@
+from src.config.market import Market
+from src.config.scans import filter_conf, scans_conf
+
+# Universe sizes to time, in symbols
+BENCHMARK_SCALES = [500, 5_000, 20_000]
+
+SYNTHETIC_CONF = {
+    "n_days": 400,  # trading days, the 252 bar filters need a full year
+    "frequency": "day",
+    "end_date": "2025-11-28",
+    "seed": 7,
+    "holiday_pct": 4,  # weekdays closed for every symbol
+    "late_listing_pct": 10,  # symbols listed after the first day
+    "delisted_pct": 2,  # symbols that stop trading before the last day
+    "suspension_pct": 5,  # symbols with one run of missing bars
+    "max_suspension_bars": 15,
+    "gap_prob_pct": 1,  # bars opening away from the previous close
+}
+
+# Kite intraday bars of the NSE session
+INTRADAY_SESSION = {"open": "09:15", "close": "15:30"}
+
+BENCHMARK_CONF = {
+    "repeat": 3,  # timed runs per case, the fastest is kept
+    "regression_ratio": 1.2,  # slower or bigger than baseline by this is flagged
+    "adr_cutoff": 1.5,
+    "scans_conf": scans_conf[Market.INDIA_EQUITIES],
+    "filter_conf": filter_conf[Market.INDIA_EQUITIES],
+}
+
+# Reference outputs a faster engine must reproduce. Rows match on keys, the
+# rank of rows tied on rank_by may come in any order.
+GOLDEN_OUTPUTS = {
+    "indicators": {"keys": ["symbol", "timestamp"], "rank_by": None},
+    "scan_frame": {"keys": ["symbol", "timestamp"], "rank_by": None},
+    "basic_filter": {"keys": ["symbol"], "rank_by": None},
+    "adr": {"keys": ["symbol"], "rank_by": ["adr_pct_20", "rvol_pct"]},
+    "sma_200": {"keys": ["symbol"], "rank_by": ["adr_pct_20", "rvol_pct"]},
+    "pullback": {"keys": ["symbol"], "rank_by": ["adr_pct_20", "rvol_pct"]},
+}
+
+GOLDEN_CONF = {
+    # floats within abs_tol + rel_tol * |reference|, tight enough that a
+    # different .round() shows
+    "abs_tol": 1e-9,
+    "rel_tol": 1e-9,
+    "n_shards": 4,
+    "max_workers": 2,
+    "examples": 3,  # mismatching keys shown per column
+}
+
+# Entrypoints whose import time is tracked, & the third party modules a
+# scan only run should not load
+IMPORT_BENCHMARK_MODULES = ["src.jobs.scanner", "src.jobs.nse_analysis"]
+HEAVY_MODULES = ["kiteconnect", "selenium", "massive", "sqlalchemy", "pandas"]
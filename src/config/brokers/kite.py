@@ -13,6 +13,18 @@ class KiteConfig:
 
     LOOKBACK_DAYS_LIMIT = None
 
+    # Index symbols to fetch, None for every index in the instruments list
+    INDICES = [
+        "NIFTY 50",
+        "NIFTY 500",
+        "NIFTY MIDCAP 150",
+        "NIFTY SMLCAP 250",
+        "NIFTY MICROCAP250",
+    ]
+
+    # Its daily bar marks a day's bars as fetchable
+    PROBE_SYMBOL = "NIFTY 50"
+
     HISTORICAL_DATA_LIMIT_DAYS = {
         "minute": 30,
         "3minute": 90,
@@ -11,6 +11,9 @@ class PolygonConfig:
 
     CREDENTIALS_PATH = Path("/home/parthgandhi/.conf/credentials/polygon.ini")
 
+    # ETFs standing in for the indices, the instruments are common stock only
+    INDICES = ["SPY"]
+
     LOOKBACK_DAYS_LIMIT = 365 * 2
 
     API_RATE_LIMIT_SECONDS = {
@@ -3,6 +3,8 @@ from src.config.exchange import Exchange
 _common_tables = {
     "equity_ohlcv_daily": "equity_ohlcv_daily",
     "equity_ohlcv_failed": "equity_ohlcv_failed",
+    "equity_rs_rating_daily": "equity_rs_rating_daily",
+    "equity_breadth_daily": "equity_breadth_daily",
 }
 
 EXCHG_TABLES = {
@@ -11,8 +13,10 @@ EXCHG_TABLES = {
         **{
             "indices_ohlcv_daily": "indices_ohlcv_daily",
             "indices_ohlcv_failed": "indices_ohlcv_failed",
+            "sector_strength_daily": "sector_strength_daily",
         },
     },
-    Exchange.NYSE: {**_common_tables},
-    Exchange.NASDAQ: {**_common_tables},
+    # benchmark ETFs, fetched with the equities
+    Exchange.NYSE: {**_common_tables, "indices_ohlcv_daily": "indices_ohlcv_daily"},
+    Exchange.NASDAQ: {**_common_tables, "indices_ohlcv_daily": "indices_ohlcv_daily"},
 }
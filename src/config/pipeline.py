@@ -0,0 +1,27 @@
+from src.config.data_source import DataSource
+from src.config.market import Market
+from src.config.storage_layout import StorageLayout
+
+PIPELINE_CONF = {
+    "max_workers": 3,  # stages run at once, fetches are I/O bound
+    "rs_cutoff": 70,
+    # run modes followed by the NSE classification, analysis & backup
+    "nse_run_modes": ["1"],
+    "classification_run_mode": "2",
+    "backup": {
+        "source": StorageLayout.data_dir(
+            market=Market.INDIA, exchange=DataSource.CMAZE
+        ),
+        "remote": "gdrive:Backup/SwingTrade/ChartsMaze/RS",
+    },
+    # filters run on symbols as their bars land, while the fetch goes on
+    "watchlist": {
+        "enabled": True,
+        # last run's hits fetched first, then by traded value
+        "hit_results": ["pullback_filter", "vcp_filter", "inside_bars_filter"],
+        "liquidity_days": 30,  # calendar days of traded value to rank by
+        "batch_symbols": 50,  # symbols scanned together
+        "max_wait_seconds": 10,  # a smaller batch is scanned after this idle
+        "batch_retries": 3,  # reads may fail while the fetcher writes
+    },
+}
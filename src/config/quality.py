@@ -0,0 +1,14 @@
+QUALITY_CONF = {
+    # symbols with any of these left out of the filter scans, they skew
+    # moving averages & ADR
+    "exclude_anomalies": ["n_duplicates", "n_bad_ohlc", "n_non_positive", "n_nulls"],
+    # anomalies only count within this many sessions back, about the year
+    # of bars the 200 day averages & the scan lookbacks read
+    "anomaly_sessions": 260,
+    # symbols this many sessions behind the last one held are taken as
+    # delisted or suspended & left out as well
+    "stale_sessions": 5,
+    # a missing day still missing after this many backfills is taken as a
+    # day the symbol did not trade & no longer requested
+    "backfill_attempts": 3,
+}
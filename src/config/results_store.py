@@ -0,0 +1,16 @@
+import polars as pl
+
+# Columns kept per symbol per result, whichever a result lacks are null
+RESULTS_STORE_DTYPES = {
+    "symbol": pl.String(),
+    "rank": pl.UInt32(),
+    "close": pl.Float64(),
+    "adr_pct_20": pl.Float64(),
+    "rvol_pct": pl.Float64(),
+    "rs_rating": pl.Float64(),
+}
+
+RESULTS_STORE_HIVE_SCHEMA = {"run_date": pl.Date(), "market": pl.String()}
+
+# Small row groups so that symbol min/max statistics skip most of a file
+RESULTS_STORE_ROW_GROUP_SIZE = 512
@@ -1,6 +1,3 @@
-from src.brokers.kite_broker import Kite
-from src.brokers.nse_broker import NSE
-from src.brokers.polygon_broker import Polygon
 from src.config.brokers.kite import KiteConfig
 from src.config.brokers.nse import NSEConfig
 from src.config.brokers.polygon import PolygonConfig
@@ -8,9 +5,14 @@ from src.config.exchange import Exchange
 from src.config.market import Market
 from src.config.scans import filter_conf, scans_conf
 
+# Brokers by import path, loaded with load_broker only when fetching
+_KITE = "src.brokers.kite_broker:Kite"
+_NSE = "src.brokers.nse_broker:NSE"
+_POLYGON = "src.brokers.polygon_broker:Polygon"
+
 RUN_MODES = {
     "1": {
-        "broker": Kite,
+        "broker": _KITE,
         "market": Market.INDIA_EQUITIES,
         "exchange": Exchange.NSE,
         "config": KiteConfig,
@@ -18,13 +20,13 @@ RUN_MODES = {
         "filter_conf": filter_conf[Market.INDIA_EQUITIES],
     },
     "2": {
-        "broker": NSE,
+        "broker": _NSE,
         "market": Market.INDIA,
         "exchange": Exchange.NSE,
         "config": NSEConfig,
     },
     "3": {
-        "broker": Polygon,
+        "broker": _POLYGON,
         "market": Market.US_EQUITIES,
         "exchange": Exchange.NYSE,
         "config": PolygonConfig,
@@ -32,7 +34,7 @@ RUN_MODES = {
         "filter_conf": filter_conf[Market.US_EQUITIES],
     },
     "4": {
-        "broker": Polygon,
+        "broker": _POLYGON,
         "market": Market.US_EQUITIES,
         "exchange": Exchange.NASDAQ,
         "config": PolygonConfig,
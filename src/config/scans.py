@@ -24,20 +24,63 @@ _VCP_FILTER_CONF = {
     "base_lower_limit_pct": 60,  # in % eg: 60%
     "pivot_length": 5,
     "pivot_width_limit_pct": 10,  # in % eg: 10%
+    "contractions": 3,  # successive shallower pullbacks before the pivot
+    "contraction_length": 15,  # bars per pullback window
 }
 
 _INSIDE_BARS_FILTER_CONF = {"min_pivot_length": 3, "max_pivot_length": 10}
 
+_RS_LINE_NEW_HIGH_WINDOW = 252
+
+_INDIA_RS_LINE_CONF = {
+    "table": "indices_ohlcv_daily",
+    "benchmark": "NIFTY 500",
+    "new_high_window": _RS_LINE_NEW_HIGH_WINDOW,
+}
+
+# No index feed for US, the benchmark ETF is fetched into the indices table
+_US_RS_LINE_CONF = {
+    "table": "indices_ohlcv_daily",
+    "benchmark": "SPY",
+    "new_high_window": _RS_LINE_NEW_HIGH_WINDOW,
+}
+
+_RS_RATING_CONF = {
+    # bars of return to weight, recent quarter counts double
+    "return_weights": {63: 0.4, 126: 0.2, 189: 0.2, 252: 0.2},
+    "min_lookback": 63,  # bars of history needed to be rated
+}
+
+_BREADTH_CONF = {"new_high_window": 252}  # 52 week highs & lows
+
+_INDIA_SECTORS_CONF = {
+    "levels": ["macro_economic_sector", "sector", "industry", "basic_industry"],
+    "return_windows": [21, 63],  # 1 & 3 month returns
+}
+
+_STREAMING_CONF = {
+    "memory_budget_mb": 2048,
+    "bytes_per_row": 1024,  # OHLCV row with all indicator, shift & gain columns
+    "chunk_size": 50_000,
+}
+
 scans_conf = {
     Market.INDIA_EQUITIES: {
         "months_lookback": 3,
         "data_lookback_days": 500,
         "lookback_min_return_pct": _INDIA_LOOKBACK_DAYS_TO_MIN_RETURN_PCT,
+        "rs_rating": {**_RS_RATING_CONF},
+        "breadth": {**_BREADTH_CONF},
+        "sectors": {**_INDIA_SECTORS_CONF},
+        "streaming": {**_STREAMING_CONF},
     },
     Market.US_EQUITIES: {
         "months_lookback": 3,
         "data_lookback_days": 500,
         "lookback_min_return_pct": _US_LOOKBACK_DAYS_TO_MIN_RETURN_PCT,
+        "rs_rating": {**_RS_RATING_CONF},
+        "breadth": {**_BREADTH_CONF},
+        "streaming": {**_STREAMING_CONF},
     },
 }
 
@@ -50,6 +93,7 @@ filter_conf = {
         },
         "vcp": {**_VCP_FILTER_CONF},
         "inside_bars": {**_INSIDE_BARS_FILTER_CONF},
+        "rs_line": {**_INDIA_RS_LINE_CONF},
     },
     Market.US_EQUITIES: {
         "pullback": {
@@ -58,5 +102,6 @@ filter_conf = {
             "rvol_pct_cutoff": _RVOL_PCT_CUTOFF,
         },
         "vcp": {**_VCP_FILTER_CONF},
+        "rs_line": {**_US_RS_LINE_CONF},
     },
 }
@@ -0,0 +1,87 @@
+from src.config.exchange import Exchange
+
+_US_SESSION = {
+    "time_zone": "America/New_York",
+    "open": "09:30",
+    "close": "16:00",
+    "settle_minutes": 20,  # grouped daily aggs are posted after the close
+}
+
+SESSIONS = {
+    Exchange.NSE: {
+        "time_zone": "Asia/Kolkata",
+        "open": "09:15",
+        "close": "15:30",
+        "settle_minutes": 10,  # closing price is set in the minutes after 15:30
+    },
+    Exchange.NYSE: _US_SESSION,
+    Exchange.NASDAQ: _US_SESSION,
+}
+
+# Full day closures from the exchange circulars, to be extended each year
+_US_HOLIDAYS = [
+    "2025-01-01",
+    "2025-01-09",
+    "2025-01-20",
+    "2025-02-17",
+    "2025-04-18",
+    "2025-05-26",
+    "2025-06-19",
+    "2025-07-04",
+    "2025-09-01",
+    "2025-11-27",
+    "2025-12-25",
+    "2026-01-01",
+    "2026-01-19",
+    "2026-02-16",
+    "2026-04-03",
+    "2026-05-25",
+    "2026-06-19",
+    "2026-07-03",
+    "2026-09-07",
+    "2026-11-26",
+    "2026-12-25",
+]
+
+HOLIDAYS = {
+    Exchange.NSE: [
+        "2025-02-26",
+        "2025-03-14",
+        "2025-03-31",
+        "2025-04-10",
+        "2025-04-14",
+        "2025-04-18",
+        "2025-05-01",
+        "2025-08-15",
+        "2025-08-27",
+        "2025-10-02",
+        "2025-10-21",
+        "2025-10-22",
+        "2025-11-05",
+        "2025-12-25",
+        "2026-01-26",
+        "2026-03-03",
+        "2026-03-26",
+        "2026-03-31",
+        "2026-04-03",
+        "2026-04-14",
+        "2026-05-01",
+        "2026-05-28",
+        "2026-06-26",
+        "2026-09-14",
+        "2026-10-02",
+        "2026-10-20",
+        "2026-11-10",
+        "2026-11-24",
+        "2026-12-25",
+    ],
+    Exchange.NYSE: _US_HOLIDAYS,
+    Exchange.NASDAQ: _US_HOLIDAYS,
+}
+
+SCHEDULER_CONF = {
+    "warmup_minutes": 20,  # login & instruments fetched this long before close
+    "poll_seconds": 60,  # between availability probes after the close
+    "give_up_minutes": 240,  # after the close, a day without bars is skipped
+    "sleep_chunk_seconds": 60,  # waits are slept in chunks, robust to suspend
+}
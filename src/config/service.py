@@ -0,0 +1,11 @@
+from src.config.storage_layout import StorageLayout
+
+SCANNER_SERVICE_CONF = {
+    # local only, the API runs arbitrary scans & SQL for whoever can reach it
+    "host": "127.0.0.1",
+    "port": 8765,
+    "socket_path": StorageLayout.ROOT / "scanner.sock",
+    "refresh_seconds": 60,  # poll the DB for new bars, 0 to refresh on request
+    "filter_cache_size": 64,  # filter results kept per data version
+    "max_rows": 5_000,  # rows returned by a query unless it asks for fewer
+}
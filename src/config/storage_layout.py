@@ -9,6 +9,9 @@ class StorageLayout:
 
     RUNS = ROOT / "runs"
     DATA = ROOT / "data"
+    RESULTS = ROOT / "results"
+    RESULT_RUNS = ROOT / "result_runs"
+    BENCHMARKS = ROOT / "benchmarks"
 
     @staticmethod
     def runs_dir(run_date: str, market: str, exchange: str) -> Path:
@@ -22,6 +25,12 @@ class StorageLayout:
         logger.debug(f"Returning path: {out}")
         return out
 
+    @staticmethod
+    def history_dir(market: str, exchange: str) -> Path:
+        out = StorageLayout.data_dir(market=market, exchange=exchange) / "history"
+        logger.debug(f"Returning path: {out}")
+        return out
+
     @staticmethod
     def scans_dir(run_date: str, market: str, exchange: str) -> Path:
         out = (
@@ -49,6 +58,63 @@ class StorageLayout:
         logger.debug(f"Returning path: {out}")
         return out
 
+    @staticmethod
+    def pipeline_dir(run_date: str, market: str, exchange: str) -> Path:
+        out = (
+            StorageLayout.runs_dir(run_date=run_date, market=market, exchange=exchange)
+            / "pipeline"
+        )
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def watchlist_dir(run_date: str, market: str, exchange: str) -> Path:
+        out = (
+            StorageLayout.runs_dir(run_date=run_date, market=market, exchange=exchange)
+            / "watchlist"
+        )
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def fetch_priority_path(run_date: str, market: str, exchange: str) -> Path:
+        out = (
+            StorageLayout.runs_dir(run_date=run_date, market=market, exchange=exchange)
+            / "fetch_priority.parquet"
+        )
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def merged_filters_dir(run_date: str, market: str) -> Path:
+        out = StorageLayout.RUNS / run_date / market / "merged" / "filters"
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def work_dir(run_date: str, market: str, exchange: str) -> Path:
+        out = (
+            StorageLayout.runs_dir(run_date=run_date, market=market, exchange=exchange)
+            / "work"
+        )
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def results_dir(run_date: str, market: str) -> Path:
+        # str concat, an f-string would render the Market enum by name
+        out = StorageLayout.RESULTS / ("run_date=" + run_date) / ("market=" + market)
+        logger.debug(f"Returning path: {out}")
+        return out
+
+    @staticmethod
+    def result_runs_dir(run_date: str, market: str) -> Path:
+        out = (
+            StorageLayout.RESULT_RUNS / ("run_date=" + run_date) / ("market=" + market)
+        )
+        logger.debug(f"Returning path: {out}")
+        return out
+
     @staticmethod
     def db_path(market: str, exchange: str) -> Path:
         out = StorageLayout.data_dir(market=market, exchange=exchange) / "data.db"
@@ -0,0 +1,213 @@
+import logging
+import re
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+
+from src.config.data_source import DataSource
+from src.config.market import Market
+from src.config.storage_layout import StorageLayout
+from src.data_source.chartsmaze.helper import industry_to_sector
+from src.pipeline.cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+_CSV_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}\.csv$")
+
+_NA_COLS = [
+    "Market Cap(Cr.)",
+    "1 Month Returns(%)",
+    "3 Month Returns(%)",
+    "% from 52W High",
+]
+
+_RENAME = {
+    "Stock Name": "symbol",
+    "RS Rating": "rs_rating",
+    "Basic Industry": "basic_industry_cmaze",
+    "Market Cap(Cr.)": "market_cap_cr_cmaze",
+    "1 Month Returns(%)": "1_mo_rtr_pct",
+    "3 Month Returns(%)": "3_mo_rtr_pct",
+    "% from 52W High": "pct_from_52w_high",
+}
+
+HISTORY_SCHEMA = {
+    "symbol": pl.String(),
+    "rs_rating": pl.Int64(),
+    "basic_industry_cmaze": pl.String(),
+    "market_cap_cr_cmaze": pl.Float64(),
+    "1_mo_rtr_pct": pl.Float64(),
+    "3_mo_rtr_pct": pl.Float64(),
+    "pct_from_52w_high": pl.Float64(),
+}
+
+HIVE_SCHEMA = {"snapshot_date": pl.Date()}
+
+
+def _cmaze_dir() -> Path:
+    return StorageLayout.data_dir(market=Market.INDIA, exchange=DataSource.CMAZE)
+
+
+def _history_dir() -> Path:
+    return StorageLayout.history_dir(market=Market.INDIA, exchange=DataSource.CMAZE)
+
+
+def _partition_path(snapshot_date: str) -> Path:
+    return _history_dir() / ("snapshot_date=" + snapshot_date) / "data.parquet"
+
+
+def _source_hash_path(snapshot_date: str) -> Path:
+    return _partition_path(snapshot_date=snapshot_date).with_name("source.sha256")
+
+
+def _source_hash(snapshot_date: str) -> str | None:
+    """
+    Hash of the CSV a partition was ingested from
+    """
+    path = _source_hash_path(snapshot_date=snapshot_date)
+    return path.read_text() if path.exists() else None
+
+
+def _sector_lookup_path() -> Path:
+    return _cmaze_dir() / "industry_sector.parquet"
+
+
+def write_sector_lookup(mapping: dict) -> Path:
+    """
+    Industry to sector lookup, one row per industry with its sectors joined
+    """
+    path = _sector_lookup_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    (
+        industry_to_sector(mapping=mapping)
+        .group_by("Basic Industry", maintain_order=True)
+        .agg(pl.col("Sector").str.join(", "))
+        .rename({"Basic Industry": "basic_industry_cmaze", "Sector": "sector_cmaze"})
+        .write_parquet(path)
+    )
+    logger.info(f"ChartsMaze sector lookup written: {path}")
+
+    return path
+
+
+def ingested_dates() -> list[str]:
+    return sorted(
+        p.name.removeprefix("snapshot_date=")
+        for p in _history_dir().glob("snapshot_date=*")
+        if (p / "data.parquet").exists()
+    )
+
+
+def ingest_cmaze_file(
+    snapshot_date: str, force: bool = False, csv_hash: str | None = None
+) -> Path | None:
+    """
+    Parse one daily ChartsMaze CSV into its typed history partition, a date
+    already ingested from the same CSV is skipped unless forced. csv_hash
+    saves hashing the CSV again when the caller has it.
+    """
+    out_path = _partition_path(snapshot_date=snapshot_date)
+    csv_path = _cmaze_dir() / f"{snapshot_date}.csv"
+    if csv_hash is None:
+        csv_hash = hash_file(csv_path)
+
+    if out_path.exists() and not force:
+        # the CSV is gone, the partition is all there is
+        if csv_hash is None or csv_hash == _source_hash(snapshot_date=snapshot_date):
+            logger.debug(f"ChartsMaze {snapshot_date} already ingested")
+            return out_path
+        logger.info(f"ChartsMaze {snapshot_date} CSV changed, ingesting again")
+
+    if csv_hash is None:
+        logger.warning(f"ChartsMaze file missing: {csv_path}")
+        return None
+
+    res = (
+        pl.scan_csv(csv_path, schema_overrides={i: pl.String() for i in _NA_COLS})
+        .with_columns(
+            pl.when(pl.col(col) == "NA")
+            .then(None)
+            .otherwise(col)
+            .cast(pl.Float64())
+            .alias(col)
+            for col in _NA_COLS
+        )
+        .rename(_RENAME)
+        .select(pl.col(col).cast(dtype) for col, dtype in HISTORY_SCHEMA.items())
+        .sort("symbol")
+    )
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(".tmp")
+    res.sink_parquet(tmp_path)
+    tmp_path.replace(out_path)
+    _source_hash_path(snapshot_date=snapshot_date).write_text(csv_hash)
+    logger.info(f"ChartsMaze {snapshot_date} ingested to {out_path}")
+
+    return out_path
+
+
+def ingest_new_files(force: bool = False) -> list[str]:
+    """
+    Ingest every daily CSV not in the history yet or changed since it was
+    ingested
+    """
+    done = set() if force else set(ingested_dates())
+    csv_hashes = {
+        p.stem: hash_file(p)
+        for p in _cmaze_dir().glob("*.csv")
+        if _CSV_NAME.match(p.name)
+    }
+    new_dates = sorted(
+        snapshot_date
+        for snapshot_date, csv_hash in csv_hashes.items()
+        if snapshot_date not in done
+        or csv_hash != _source_hash(snapshot_date=snapshot_date)
+    )
+    for snapshot_date in new_dates:
+        ingest_cmaze_file(
+            snapshot_date=snapshot_date, force=force, csv_hash=csv_hashes[snapshot_date]
+        )
+
+    logger.info(f"ChartsMaze: {len(new_dates)} new files ingested")
+    return new_dates
+
+
+def scan_cmaze_history(
+    start_date: date | None = None, end_date: date | None = None
+) -> pl.LazyFrame:
+    """
+    ChartsMaze history with the sectors looked up, filtering on snapshot_date
+    prunes partitions
+    """
+    res = pl.scan_parquet(
+        _history_dir() / "**" / "*.parquet",
+        hive_partitioning=True,
+        hive_schema=HIVE_SCHEMA,
+    )
+    if start_date is not None:
+        res = res.filter(pl.col("snapshot_date") >= start_date)
+    if end_date is not None:
+        res = res.filter(pl.col("snapshot_date") <= end_date)
+
+    return res.join(
+        pl.scan_parquet(_sector_lookup_path()), on="basic_industry_cmaze", how="left"
+    )
+
+
+def rs_rating_history(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    symbols: list[str] | None = None,
+) -> pl.DataFrame:
+    res = scan_cmaze_history(start_date=start_date, end_date=end_date)
+    if symbols is not None:
+        res = res.filter(pl.col("symbol").is_in(symbols))
+
+    return (
+        res.select("snapshot_date", "symbol", "rs_rating")
+        .sort("symbol", "snapshot_date")
+        .collect()
+    )
@@ -0,0 +1,38 @@
+import argparse
+import logging
+
+from src.config.run_modes import RUN_MODES
+from src.jobs.pipeline import backfill_gaps, broker_session
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fetch only the bars missing against the exchange calendar"
+    )
+    parser.add_argument("--run_mode", required=True, help="Run Mode")
+    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--freq", default="day", help="Frequency of data to be fetched")
+    parser.add_argument(
+        "--dry_run", action="store_true", help="Print the ranges, fetch nothing"
+    )
+    args = parser.parse_args()
+
+    mode_conf = RUN_MODES[args.run_mode]
+    ranges = backfill_gaps(
+        mode_conf=mode_conf,
+        end_date=args.end_date,
+        frequency=args.freq,
+        broker=broker_session(
+            mode_conf=mode_conf,
+            end_date=args.end_date,
+            frequency=args.freq,
+            incremental=True,
+        ),
+        dry_run=args.dry_run,
+    )
+    if args.dry_run:
+        print(ranges)
@@ -0,0 +1,96 @@
+import argparse
+import logging
+import sys
+
+import polars as pl
+
+from src.benchmarks.imports import run_import_suite
+from src.benchmarks.suite import (CASES, compare, run_suite, save_baseline,
+                                  save_run)
+from src.config.benchmarks import (BENCHMARK_CONF, BENCHMARK_SCALES,
+                                   IMPORT_BENCHMARK_MODULES)
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark scans & filters on a synthetic universe"
+    )
+    parser.add_argument(
+        "--scales",
+        default=",".join(str(n) for n in BENCHMARK_SCALES),
+        help="Comma separated universe sizes in symbols",
+    )
+    parser.add_argument(
+        "--cases",
+        default=",".join(CASES),
+        help=f"Comma separated cases, any of {', '.join(CASES)}",
+    )
+    parser.add_argument(
+        "--suite",
+        choices=["scans", "imports", "all"],
+        default="scans",
+        help="Scan & filter cases, entrypoint import times or both",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=BENCHMARK_CONF["repeat"], help="Timed runs"
+    )
+    parser.add_argument(
+        "--save_baseline",
+        action="store_true",
+        help="Store these results as the baseline",
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Exit 1 if any case regressed"
+    )
+    args = parser.parse_args()
+
+    cases = args.cases.split(",")
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {sorted(unknown)}")
+
+    suites = []
+    if args.suite in ["scans", "all"]:
+        suites.append(
+            run_suite(
+                scales=[int(n) for n in args.scales.split(",")],
+                cases=cases,
+                conf={**BENCHMARK_CONF, "repeat": args.repeat},
+            )
+        )
+    if args.suite in ["imports", "all"]:
+        suites.append(
+            run_import_suite(modules=IMPORT_BENCHMARK_MODULES, repeat=args.repeat)
+        )
+    res = pl.concat(suites, how="diagonal_relaxed")
+    logger.info(f"Results saved: {save_run(res)}")
+
+    res = compare(res=res, regression_ratio=BENCHMARK_CONF["regression_ratio"])
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200):
+        print(res)
+
+    if args.save_baseline:
+        save_baseline(
+            res.select(
+                "case",
+                "n_symbols",
+                "n_rows",
+                "min_s",
+                "mean_s",
+                "peak_rss_mb",
+                "case_rss_mb",
+            )
+        )
+
+    regressed = res.filter(pl.col("regressed"))
+    if regressed.height > 0:
+        logger.warning(
+            f"Regressed over {BENCHMARK_CONF['regression_ratio']}x baseline: "
+            f"{regressed.select('case', 'n_symbols').rows()}"
+        )
+        if args.check:
+            sys.exit(1)
@@ -0,0 +1,29 @@
+import argparse
+import logging
+
+from src.data_source.chartsmaze.history import (ingest_cmaze_file,
+                                                ingest_new_files,
+                                                write_sector_lookup)
+from src.data_source.chartsmaze.sectors import sectors as cmaze_sectors
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest ChartsMaze daily files")
+    parser.add_argument(
+        "--end_date", help="Ingest only this date YYYY-MM-DD, else every new file"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-ingest dates already stored"
+    )
+    args = parser.parse_args()
+
+    write_sector_lookup(mapping=cmaze_sectors)
+
+    if args.end_date:
+        ingest_cmaze_file(snapshot_date=args.end_date, force=args.force)
+    else:
+        ingest_new_files(force=args.force)
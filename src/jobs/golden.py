@@ -0,0 +1,69 @@
+import argparse
+import logging
+import sys
+
+import polars as pl
+
+from src.benchmarks.golden import (ENGINES, diff_engine, freeze_recorded,
+                                   freeze_synthetic, list_golden)
+from src.config.benchmarks import BENCHMARK_CONF
+from src.config.exchange import Exchange
+from src.config.market import Market
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Freeze reference scan outputs & diff other engines against them"
+    )
+    parser.add_argument("command", choices=["freeze", "diff", "list"])
+    parser.add_argument(
+        "--dataset",
+        choices=["synthetic", "recorded"],
+        default="synthetic",
+        help="Freeze a synthetic universe or the stored OHLCV",
+    )
+    parser.add_argument("--n_symbols", type=int, default=500, help="Synthetic size")
+    parser.add_argument("--market", default="IND_EQ", help="Recorded market")
+    parser.add_argument("--exchange", default="NSE", help="Recorded exchange")
+    parser.add_argument("--end_date", help="Recorded scan date YYYY-MM-DD")
+    parser.add_argument(
+        "--adr_cutoff", type=float, default=BENCHMARK_CONF["adr_cutoff"]
+    )
+    parser.add_argument("--force", action="store_true", help="Freeze over a set")
+    parser.add_argument("--name", help="Golden set to diff, see list")
+    parser.add_argument(
+        "--engines",
+        default=",".join(ENGINES),
+        help=f"Comma separated engines, any of {', '.join(ENGINES)}",
+    )
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print(list_golden())
+    elif args.command == "freeze" and args.dataset == "synthetic":
+        freeze_synthetic(
+            n_symbols=args.n_symbols, adr_cutoff=args.adr_cutoff, force=args.force
+        )
+    elif args.command == "freeze":
+        freeze_recorded(
+            market=Market(args.market),
+            exchange=Exchange(args.exchange),
+            end_date=args.end_date,
+            adr_cutoff=args.adr_cutoff,
+            force=args.force,
+        )
+    else:
+        res = pl.concat(
+            [
+                diff_engine(name=args.name, engine=engine)
+                for engine in args.engines.split(",")
+            ]
+        )
+        with pl.Config(tbl_rows=-1, fmt_str_lengths=120, tbl_width_chars=200):
+            print(res)
+        if res.height > 0:
+            sys.exit(1)
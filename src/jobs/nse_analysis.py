@@ -1,5 +1,8 @@
 import argparse
 import logging
+import sys
+from datetime import datetime
+from pathlib import Path
 
 import polars as pl
 import polars.selectors as cs
@@ -7,10 +10,20 @@ import polars.selectors as cs
 from src.config.brokers.nse import NSEConfig
 from src.config.data_source import DataSource
 from src.config.exchange import Exchange
+from src.config.exchange_tables import EXCHG_TABLES
 from src.config.market import Market
 from src.config.storage_layout import StorageLayout
-from src.data_source.chartsmaze.helper import industry_to_sector
+from src.data_source.chartsmaze import history as cmaze_history
+from src.data_source.chartsmaze.history import (ingest_cmaze_file,
+                                                scan_cmaze_history,
+                                                write_sector_lookup)
 from src.data_source.chartsmaze.sectors import sectors as cmaze_sectors
+from src.pipeline.cache import (StageCache, has_table, hash_code, hash_config,
+                                hash_file, sqlite_watermark)
+from src.pipeline.metrics import current_stage, end_run, stage, start_run
+from src.scans.artifacts import read_artifact, scan_artifact, write_artifact
+from src.scans.rs_rating import read_rs_ratings
+from src.store.results import append_stage_dir
 from src.utils import setup_logger
 
 logger = logging.getLogger(__name__)
@@ -27,60 +40,39 @@ def _make_dir(end_date: str, market: Market, exchange: Exchange):
     return analysis_path
 
 
-def _fetch_cmaze_file(end_date: str, sectors_mapping: dict) -> pl.LazyFrame:
-    cmaze_path = StorageLayout.data_dir(market=Market.INDIA, exchange=DataSource.CMAZE)
-    cmaze_sectors_df = industry_to_sector(mapping=sectors_mapping).lazy()
-
-    _override_cols = [
-        "Market Cap(Cr.)",
-        "1 Month Returns(%)",
-        "3 Month Returns(%)",
-        "% from 52W High",
-    ]
+CMAZE_SCHEMA = {
+    "symbol": pl.String(),
+    "rs_rating": pl.Int64(),
+    "basic_industry_cmaze": pl.String(),
+    "sector_cmaze": pl.String(),
+    "market_cap_cr_cmaze": pl.Float64(),
+    "1_mo_rtr_pct": pl.Float64(),
+    "3_mo_rtr_pct": pl.Float64(),
+    "pct_from_52w_high": pl.Float64(),
+}
+
+
+def _fetch_cmaze_file(
+    end_date: str,
+    sectors_mapping: dict,
+    symbols: pl.LazyFrame | None = None,
+    csv_hash: str | None = None,
+) -> pl.LazyFrame | None:
+    """
+    ChartsMaze snapshot of end_date from the history store, ingested first if
+    it is a new or changed file. Limited to symbols when given, None when
+    there is no file for end_date.
+    """
+    write_sector_lookup(mapping=sectors_mapping)
+    if ingest_cmaze_file(snapshot_date=end_date, csv_hash=csv_hash) is None:
+        return None
 
-    cmaze_df = (
-        pl.scan_csv(
-            cmaze_path / f"{end_date}.csv",
-            schema_overrides={i: pl.String() for i in _override_cols},
-        )
-        .with_columns(
-            pl.when(pl.col(col) == "NA")
-            .then(None)
-            .otherwise(col)
-            .cast(pl.Float64())
-            .alias(col)
-            for col in _override_cols
-        )
-        .join(cmaze_sectors_df, on="Basic Industry", how="left")
-        .group_by(pl.exclude("Sector"))
-        .agg(pl.col("Sector").str.join(", "))
-        .rename(
-            {
-                "Stock Name": "symbol",
-                "RS Rating": "rs_rating",
-                "Basic Industry": "basic_industry_cmaze",
-                "Sector": "sector_cmaze",
-                "Market Cap(Cr.)": "market_cap_cr_cmaze",
-                "1 Month Returns(%)": "1_mo_rtr_pct",
-                "3 Month Returns(%)": "3_mo_rtr_pct",
-                "% from 52W High": "pct_from_52w_high",
-            }
-        )
-        .select(
-            [
-                "symbol",
-                "rs_rating",
-                "basic_industry_cmaze",
-                "sector_cmaze",
-                "market_cap_cr_cmaze",
-                "1_mo_rtr_pct",
-                "3_mo_rtr_pct",
-                "pct_from_52w_high",
-            ]
-        )
-    )
+    snapshot_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    cmaze_df = scan_cmaze_history(start_date=snapshot_date, end_date=snapshot_date)
+    if symbols is not None:
+        cmaze_df = cmaze_df.join(symbols, on="symbol", how="semi")
 
-    return cmaze_df
+    return cmaze_df.select(CMAZE_SCHEMA.keys())
 
 
 def _fetch_nse_sectors() -> pl.LazyFrame:
@@ -112,135 +104,226 @@ def _fetch_nse_sectors() -> pl.LazyFrame:
     return nse_classify_df
 
 
-def _combine_filers_files(end_date: str) -> pl.LazyFrame:
-    filters_path = StorageLayout.filters_dir(
-        run_date=end_date, market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
-    )
+_RS_RATING_SCHEMA = {
+    "timestamp": pl.Date(),
+    "symbol": pl.String(),
+    "rs_score": pl.Float64(),
+    "rs_rating": pl.Int64(),
+}
 
-    basic_filter = (
-        pl.scan_csv(filters_path / "basic_filter.csv")
-        .with_columns(
-            pl.col("timestamp")
-            .str.strptime(pl.Datetime, format="%Y-%m-%dT%H:%M:%S%.f")
-            .cast(pl.Date)
-            .alias("timestamp")
-        )
-        .select("timestamp", "symbol")
+
+def _rs_table() -> tuple[Path, str] | None:
+    """
+    DB & table of the OHLCV RS ratings, None before a scanner run wrote them
+    """
+    db_path = StorageLayout.db_path(market=Market.INDIA_EQUITIES, exchange=Exchange.NSE)
+    table_id = EXCHG_TABLES[Exchange.NSE]["equity_rs_rating_daily"]
+    if not db_path.exists() or not has_table(
+        conn=f"sqlite:///{db_path}", table_id=table_id
+    ):
+        return None
+    return db_path, table_id
+
+
+def _rs_ratings(end_date: str) -> pl.DataFrame:
+    rs_table = _rs_table()
+    if rs_table is None:
+        logger.warning("No OHLCV RS ratings stored yet")
+        return pl.DataFrame(schema=_RS_RATING_SCHEMA)
+
+    db_path, table_id = rs_table
+    return read_rs_ratings(
+        db_path=db_path, rs_table_id=table_id, start_date=end_date, end_date=end_date
     )
 
-    df_list = []
-    for filter_type in [
-        "sma_200",
-        "adr",
-        "pullback",
-    ]:
-        df = (
-            pl.scan_csv(filters_path / f"{filter_type}_filter.csv")
-            .with_columns(pl.lit(True).alias(f"{filter_type}_filter_flag"))
-            .select("symbol", f"{filter_type}_filter_flag")
-        )
-        df_list.append(df)
 
-    res = (
-        basic_filter.join(df_list[0], on="symbol", how="left")
-        .join(df_list[1], on="symbol", how="left")
-        .join(df_list[2], on="symbol", how="left")
-        .with_columns(cs.ends_with("flag").fill_null(False))
-        .collect()
-    )
+def _rs_rating_watermark() -> dict | None:
+    rs_table = _rs_table()
+    if rs_table is None:
+        return None
+    db_path, table_id = rs_table
+    return sqlite_watermark(db_path=db_path, table_id=table_id)
+
 
-    logger.info(f"Overall Before RS filter: {res.shape}")
-    return res.lazy()
+_PULLBACK_COLS = ["near_ema_9", "near_ema_21", "near_sma_50", "mid_down_streak"]
 
 
-def _pullback_filters_file(end_date: str) -> pl.LazyFrame:
+def _filter_flags(end_date: str) -> pl.LazyFrame:
+    """
+    Basic filter stocks flagged by the filters they pass, every filter
+    artifact is scanned once & the pullback columns ride along
+    """
     filters_path = StorageLayout.filters_dir(
         run_date=end_date, market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
     )
 
-    basic_filter = (
-        pl.scan_csv(filters_path / "basic_filter.csv")
-        .with_columns(
-            pl.col("timestamp")
-            .str.strptime(pl.Datetime, format="%Y-%m-%dT%H:%M:%S%.f")
-            .cast(pl.Date)
-            .alias("timestamp")
-        )
-        .select("timestamp", "symbol")
+    res = scan_artifact(out_dir=filters_path, name="basic_filter").select(
+        "timestamp", "symbol"
     )
-
-    df_list = []
-    for filter_type in ["sma_200", "adr"]:
+    for filter_type, extra_cols in [
+        ("sma_200", []),
+        ("adr", []),
+        ("pullback", _PULLBACK_COLS),
+    ]:
         df = (
-            pl.scan_csv(filters_path / f"{filter_type}_filter.csv")
+            scan_artifact(out_dir=filters_path, name=f"{filter_type}_filter")
             .with_columns(pl.lit(True).alias(f"{filter_type}_filter_flag"))
-            .select("symbol", f"{filter_type}_filter_flag")
+            .select("symbol", f"{filter_type}_filter_flag", *extra_cols)
         )
-        df_list.append(df)
+        res = res.join(df, on="symbol", how="left")
 
-    for filter_type in ["pullback"]:
-        df = (
-            pl.scan_csv(filters_path / f"{filter_type}_filter.csv")
-            .with_columns(pl.lit(True).alias(f"{filter_type}_filter_flag"))
-            .select(
-                "symbol",
-                f"{filter_type}_filter_flag",
-                "near_ema_9",
-                "near_ema_21",
-                "near_sma_50",
-                "mid_down_streak",
-            )
-        )
-        df_list.append(df)
+    return res.with_columns(cs.ends_with("flag").fill_null(False))
 
-    res = (
-        basic_filter.join(df_list[0], on="symbol", how="left")
-        .join(df_list[1], on="symbol", how="left")
-        .join(df_list[2], on="symbol", how="left")
-        .with_columns(cs.ends_with("flag").fill_null(False))
-        .collect()
+
+def _analysis_results(
+    end_date: str, sectors_mapping: dict, cmaze_hash: str | None = None
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Overall & pullback results from one lazy graph, the shared reads and
+    joins are computed once by collect_all
+    """
+    flags_df = _filter_flags(end_date=end_date)
+    cmaze_df = _fetch_cmaze_file(
+        end_date=end_date,
+        sectors_mapping=sectors_mapping,
+        symbols=flags_df.select("symbol"),
+        csv_hash=cmaze_hash,
+    )
+    nse_classify_df = _fetch_nse_sectors()
+    rs_df = (
+        _rs_ratings(end_date=end_date)
+        .lazy()
+        .select("symbol", pl.col("rs_rating").alias("rs_rating_ohlcv"))
     )
 
-    logger.info(f"Pullback Before RS filter: {res.shape}")
-    return res.lazy()
+    cmaze_flag = cmaze_df is not None
+    if not cmaze_flag:
+        logger.warning(f"No ChartsMaze file for {end_date}, RS rating from OHLCV")
+        cmaze_df = pl.LazyFrame(schema=CMAZE_SCHEMA)
 
+    res = (
+        flags_df.join(cmaze_df, on="symbol", how="left")
+        .join(rs_df, on="symbol", how="left")
+        .join(nse_classify_df, on="symbol", how="left")
+    )
+    if not cmaze_flag:
+        res = res.with_columns(
+            pl.col("rs_rating_ohlcv").cast(pl.Int64()).alias("rs_rating")
+        )
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Run Filter Scans Analysis")
-    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
-    parser.add_argument("--rs_cutoff", default=70, help="RS Cutoff")
-    args = parser.parse_args()
+    overall_df, pullback_df = current_stage().collect_all(
+        [res.drop(_PULLBACK_COLS), res]
+    )
+    logger.info(f"Overall Before RS filter: {overall_df.shape}")
+    logger.info(f"Pullback Before RS filter: {pullback_df.shape}")
 
-    end_date = args.end_date
-    rs_cutoff = int(args.rs_cutoff)
+    return overall_df, pullback_df
 
+
+def run_analysis(
+    end_date: str, rs_cutoff: int, csv_flag: bool = False, force: bool = False
+) -> None:
+    """
+    Filter results joined with ChartsMaze, NSE sectors & RS ratings, unless
+    the inputs match the manifest
+    """
     analysis_path = _make_dir(
         end_date=end_date, market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
     )
-    cmaze_df = _fetch_cmaze_file(end_date=end_date, sectors_mapping=cmaze_sectors)
-    nse_classify_df = _fetch_nse_sectors()
-    res = _combine_filers_files(end_date=end_date)
 
-    res = (
-        res.join(cmaze_df, on="symbol", how="left")
-        .join(nse_classify_df, on="symbol", how="left")
-        .collect()
+    filters_path = StorageLayout.filters_dir(
+        run_date=end_date, market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
     )
+    analysis_cache = StageCache(stage="analysis", out_dir=analysis_path, force=force)
+    analysis_inputs = {
+        "filter_scan": StageCache(stage="filter_scan", out_dir=filters_path).digest(),
+        "cmaze": hash_file(
+            StorageLayout.data_dir(market=Market.INDIA, exchange=DataSource.CMAZE)
+            / f"{end_date}.csv"
+        ),
+        "nse_classify": sqlite_watermark(
+            db_path=StorageLayout.db_path(market=Market.INDIA, exchange=Exchange.NSE),
+            table_id=NSEConfig.CLASSIFICATION_TABLE_ID,
+        ),
+        "rs_rating": _rs_rating_watermark(),
+        "config": hash_config(cmaze_sectors),
+        "code": hash_code(sys.modules[__name__], cmaze_history),
+        "args": {"end_date": end_date, "csv": csv_flag},
+    }
+
+    if analysis_cache.is_fresh(analysis_inputs):
+        with stage("analysis") as m:
+            m.extra["cached"] = True
+            for name in ["overall_filter_result", "pullback_filter_result"]:
+                res = read_artifact(out_dir=analysis_path, name=name)
+                res_cutoff = res.filter(pl.col("rs_rating") >= rs_cutoff)
+                logger.info(f"{name} After RS filter: {res_cutoff.shape}")
+        return
+
+    analysis_cache.reset()
+    with stage("analysis") as m:
+        overall_df, pullback_df = _analysis_results(
+            end_date=end_date,
+            sectors_mapping=cmaze_sectors,
+            cmaze_hash=analysis_inputs["cmaze"],
+        )
+        m.rows_out = overall_df.shape[0]
 
-    res.write_csv(analysis_path / "overall_filter_result.csv")
-
-    res_cutoff = res.filter(pl.col("rs_rating") >= rs_cutoff)
+    write_artifact(
+        overall_df,
+        out_dir=analysis_path,
+        name="overall_filter_result",
+        csv_flag=csv_flag,
+    )
+    res_cutoff = overall_df.filter(pl.col("rs_rating") >= rs_cutoff)
     logger.info(f"Overall After RS filter: {res_cutoff.shape}")
 
-    res = _pullback_filters_file(end_date=end_date)
+    write_artifact(
+        pullback_df,
+        out_dir=analysis_path,
+        name="pullback_filter_result",
+        csv_flag=csv_flag,
+    )
+    res_cutoff = pullback_df.filter(pl.col("rs_rating") >= rs_cutoff)
+    logger.info(f"Pullback After RS filter: {res_cutoff.shape}")
 
-    res = (
-        res.join(cmaze_df, on="symbol", how="left")
-        .join(nse_classify_df, on="symbol", how="left")
-        .collect()
+    analysis_cache.record(analysis_inputs)
+    append_stage_dir(
+        run_date=end_date,
+        market=Market.INDIA_EQUITIES,
+        exchange=Exchange.NSE,
+        stage="analysis",
+        stage_dir=analysis_path,
     )
 
-    res.write_csv(analysis_path / "pullback_filter_result.csv")
 
-    res_cutoff = res.filter(pl.col("rs_rating") >= rs_cutoff)
-    logger.info(f"Pullback After RS filter: {res_cutoff.shape}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Filter Scans Analysis")
+    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--rs_cutoff", default=70, help="RS Cutoff")
+    parser.add_argument(
+        "--csv", action="store_true", help="Export a CSV copy of the results"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-run even if inputs unchanged"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Add Polars profiles to run metrics"
+    )
+    args = parser.parse_args()
+
+    start_run(
+        out_dir=StorageLayout.runs_dir(
+            run_date=args.end_date, market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
+        ),
+        profile=args.profile,
+    )
+    try:
+        run_analysis(
+            end_date=args.end_date,
+            rs_cutoff=int(args.rs_cutoff),
+            csv_flag=args.csv,
+            force=args.force,
+        )
+    finally:
+        end_run()
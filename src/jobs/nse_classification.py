@@ -2,8 +2,7 @@ import argparse
 import logging
 import shutil
 
-from src.config.exchange import Exchange
-from src.config.market import Market
+from src.brokers.registry import load_broker
 from src.config.run_modes import RUN_MODES
 from src.config.storage_layout import StorageLayout
 from src.utils import setup_logger
@@ -27,40 +26,41 @@ def __make_dir(market: str, exchange: str, fetch_flag: bool):
     return data_path, db_path
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Run NSE Industry Classification")
-    parser.add_argument(
-        "--fetch", action="store_true", help="Delete Eveerything & Fecth"
-    )
-    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
-    parser.add_argument("--run_mode", help="Run Mode", default="2")
-    args = parser.parse_args()
-
-    fetch_date = args.end_date
-    mode_conf = RUN_MODES[args.run_mode]
+def run_classification(end_date: str, run_mode: str = "2", fetch_flag: bool = False):
+    mode_conf = RUN_MODES[run_mode]
 
     data_path, db_path = __make_dir(
         market=mode_conf["market"],
         exchange=mode_conf["exchange"],
-        fetch_flag=args.fetch,
+        fetch_flag=fetch_flag,
     )
 
     logger.info("######### Starting NSE Industry Fetching #########")
 
-    instruments_path = StorageLayout.data_dir(
-        market=Market.INDIA_EQUITIES, exchange=Exchange.NSE
-    )
-
     instruments_path = mode_conf["config"].INSTRUMENTS_FILE_PATH
 
     logger.info(f"INSTRUMENTS PATH: {instruments_path}")
 
-    broker = mode_conf["broker"]
-    broker = broker(
+    broker = load_broker(mode_conf["broker"])
+    broker(
         market=mode_conf["market"],
         exchange=mode_conf["exchange"],
-        end_date=args.end_date,
+        end_date=end_date,
         config=mode_conf["config"],
     )(instruments_path=instruments_path)
 
     logger.info("######### Completed NSE Industry Fetching #########")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run NSE Industry Classification")
+    parser.add_argument(
+        "--fetch", action="store_true", help="Delete Eveerything & Fecth"
+    )
+    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--run_mode", help="Run Mode", default="2")
+    args = parser.parse_args()
+
+    run_classification(
+        end_date=args.end_date, run_mode=args.run_mode, fetch_flag=args.fetch
+    )
@@ -0,0 +1,519 @@
+import argparse
+import logging
+import subprocess
+import sys
+from datetime import date, timedelta
+from functools import cache
+from typing import Callable
+
+import polars as pl
+
+from src.brokers.base import BaseBroker
+from src.brokers.registry import load_broker
+from src.config.adjustments import ADJUSTMENT_CONF
+from src.config.exchange import Exchange
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.pipeline import PIPELINE_CONF
+from src.config.quality import QUALITY_CONF
+from src.config.run_modes import RUN_MODES
+from src.config.scans import filter_conf, scans_conf
+from src.config.storage_layout import StorageLayout
+from src.jobs.nse_analysis import run_analysis
+from src.jobs.nse_classification import run_classification
+from src.jobs.scanner import (get_start_lookback_date, make_run_dirs,
+                              run_filter_stages, run_swing_stages)
+from src.pipeline.backfill import plan_backfill, run_backfill
+from src.pipeline.cache import drop_table, last_table_date
+from src.pipeline.dag import BLOCKED, FAILED, Pipeline, Stage
+from src.pipeline.market_calendar import MarketCalendar
+from src.pipeline.metrics import end_run, start_run
+from src.scans.watchlist import Watchlist, priority_symbols
+from src.store.adjustments import merge_fetched
+from src.store.catalog import catalog_last_date, update_catalog
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+# fetched into staging tables & merged when incremental
+_OHLCV_TABLES = ["equity_ohlcv_daily", "indices_ohlcv_daily"]
+
+STAGES = [
+    "priority",
+    "instruments",
+    "ohlcv",
+    "backfill",
+    "classification",
+    "scans",
+    "filters",
+    "analysis",
+    "backup",
+]
+
+
+def fetch_start_date(mode_conf: dict, end_date: str, incremental: bool) -> str:
+    """
+    Lookback date of a full fetch. An incremental one starts overlap_days
+    before the last bar held, the bars fetched again show corporate actions.
+    """
+    _, lookback_date = get_start_lookback_date(end_date=end_date, mode_conf=mode_conf)
+    if not incremental:
+        return lookback_date
+
+    exchange = mode_conf["exchange"]
+    db_path = StorageLayout.db_path(market=mode_conf["market"], exchange=exchange)
+    conn = f"sqlite:///{db_path}"
+    table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+    last_date = (
+        catalog_last_date(conn=conn, ohlcv_table_id=table_id)
+        or last_table_date(conn=conn, table_id=table_id)
+        if db_path.exists()
+        else None
+    )
+    if last_date is None:
+        logger.info(f"No bars held for {exchange.value}, fetching from {lookback_date}")
+        return lookback_date
+    return (last_date - timedelta(days=ADJUSTMENT_CONF["overlap_days"])).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def _fetch_tables(exchange: Exchange, incremental: bool) -> dict:
+    """
+    Tables the broker writes to, OHLCV into staging tables when incremental
+    """
+    tables = dict(EXCHG_TABLES[exchange])
+    if incremental:
+        for key in _OHLCV_TABLES:
+            if key in tables:
+                tables[key] = tables[key] + "_staging"
+    return {**EXCHG_TABLES, exchange: tables}
+
+
+def broker_session(
+    mode_conf: dict, end_date: str, frequency: str, incremental: bool
+) -> Callable[[], BaseBroker]:
+    """
+    Broker of a run mode, logged in on first use & reused after
+    """
+
+    @cache
+    def broker() -> BaseBroker:
+        client = load_broker(mode_conf["broker"])(
+            market=mode_conf["market"],
+            exchange=mode_conf["exchange"],
+            start_date=fetch_start_date(
+                mode_conf=mode_conf, end_date=end_date, incremental=incremental
+            ),
+            end_date=end_date,
+            frequency=frequency,
+            config=mode_conf["config"],
+            tables=_fetch_tables(
+                exchange=mode_conf["exchange"], incremental=incremental
+            ),
+        )
+        client.login()
+        return client
+
+    return broker
+
+
+def backfill_gaps(
+    mode_conf: dict,
+    end_date: str,
+    frequency: str,
+    broker: Callable[[], BaseBroker],
+    dry_run: bool = False,
+) -> pl.DataFrame:
+    """
+    Bars missing from the scan lookback against the exchange calendar,
+    fetched in ranges within the broker's request limit. Returns the ranges.
+    """
+    exchange = mode_conf["exchange"]
+    db_path = StorageLayout.db_path(market=mode_conf["market"], exchange=exchange)
+    table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+    _, lookback_date = get_start_lookback_date(end_date=end_date, mode_conf=mode_conf)
+
+    gaps, ranges = plan_backfill(
+        db_path=db_path,
+        ohlcv_table_id=table_id,
+        calendar=MarketCalendar(exchange=exchange),
+        start=date.fromisoformat(lookback_date),
+        end=date.fromisoformat(end_date),
+        limit_days=getattr(mode_conf["config"], "HISTORICAL_DATA_LIMIT_DAYS", {}).get(
+            frequency
+        ),
+        conf=QUALITY_CONF,
+    )
+    if not dry_run:
+        run_backfill(
+            db_path=db_path,
+            ohlcv_table_id=table_id,
+            gaps=gaps,
+            ranges=ranges,
+            broker=broker,
+            conf=QUALITY_CONF,
+        )
+
+    return ranges
+
+
+def _fetch_stages(
+    mode_conf: dict,
+    end_date: str,
+    frequency: str,
+    adr_cutoff: float,
+    incremental: bool,
+    broker: Callable[[], BaseBroker] | None,
+) -> list[Stage]:
+    """
+    Instruments, OHLCV & the backfill of its gaps from the same logged in
+    broker. A full fetch
+    starts from an empty data dir, as scanner --fetch. An incremental one
+    fetches into staging tables, merged into the bars held with the splits
+    & bonuses seen recorded as adjustments. With the watchlist on, last
+    run's hits & the most traded symbols are fetched first & filtered while
+    the rest downloads, ranked before a full fetch deletes the bars held.
+    """
+    market = mode_conf["market"]
+    exchange = mode_conf["exchange"]
+    data_path = StorageLayout.data_dir(market=market, exchange=exchange)
+    db_path = StorageLayout.db_path(market=market, exchange=exchange)
+    priority_path = StorageLayout.fetch_priority_path(
+        run_date=end_date, market=market, exchange=exchange
+    )
+    watchlist_conf = PIPELINE_CONF["watchlist"]
+    start_date = fetch_start_date(
+        mode_conf=mode_conf, end_date=end_date, incremental=incremental
+    )
+    if broker is None:
+        broker = broker_session(
+            mode_conf=mode_conf,
+            end_date=end_date,
+            frequency=frequency,
+            incremental=incremental,
+        )
+
+    def priority():
+        symbols = (
+            priority_symbols(
+                db_path=db_path,
+                table_id=EXCHG_TABLES[exchange]["equity_ohlcv_daily"],
+                market=market.value,
+                exchange=exchange.value,
+                end_date=end_date,
+                conf=watchlist_conf,
+            )
+            if watchlist_conf["enabled"]
+            else []
+        )
+        priority_path.parent.mkdir(parents=True, exist_ok=True)
+        pl.DataFrame({"symbol": symbols}, schema={"symbol": pl.String()}).write_parquet(
+            priority_path
+        )
+
+    def instruments():
+        make_run_dirs(
+            end_date=end_date,
+            market=market,
+            exchange=exchange,
+            fetch_flag=not incremental,
+        )
+        broker().fetch_instruments()
+
+    def ohlcv():
+        if start_date > end_date:
+            logger.info(f"Bars up to {end_date} already held")
+            return
+        staging = _fetch_tables(exchange=exchange, incremental=True)[exchange]
+        table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+        if not incremental:
+            # the instruments stage deleted it, unless it was cached & only
+            # the fetch runs again
+            db_path.unlink(missing_ok=True)
+        elif db_path.exists():
+            # brokers append, leftovers of a failed fetch would be merged twice
+            for key in _OHLCV_TABLES:
+                if key in staging:
+                    drop_table(conn=f"sqlite:///{db_path}", table_id=staging[key])
+        if hasattr(broker(), "fetch_indices_ohlcv"):
+            broker().fetch_indices_ohlcv()
+        if watchlist_conf["enabled"]:
+            scan_start_date, _ = get_start_lookback_date(
+                end_date=end_date, mode_conf=mode_conf
+            )
+            watchlist = Watchlist(
+                db_path=db_path,
+                table_id=table_id,
+                staging_table_id=staging["equity_ohlcv_daily"] if incremental else None,
+                out_dir=StorageLayout.watchlist_dir(
+                    run_date=end_date, market=market.value, exchange=exchange.value
+                ),
+                start_date=scan_start_date,
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                scans_conf=scans_conf[market],
+                filters_conf=filter_conf[market],
+                conf=watchlist_conf,
+            )
+            try:
+                broker().fetch_ohlcv_stream(
+                    priority=pl.read_parquet(priority_path)
+                    .get_column("symbol")
+                    .to_list(),
+                    on_symbol=watchlist.submit,
+                )
+            finally:
+                watchlist.close()
+        else:
+            broker().fetch_ohlcv()
+
+        if incremental:
+            for key in _OHLCV_TABLES:
+                if key in staging:
+                    merge_fetched(
+                        conn=f"sqlite:///{db_path}",
+                        ohlcv_table_id=EXCHG_TABLES[exchange][key],
+                        staging_table_id=staging[key],
+                        conf=ADJUSTMENT_CONF,
+                    )
+        # bars may be replaced in place, the row count alone misses them
+        update_catalog(
+            db_path=db_path,
+            ohlcv_table_id=EXCHG_TABLES[exchange]["equity_ohlcv_daily"],
+            conf=QUALITY_CONF,
+            rebuild=True,
+        )
+
+    return [
+        Stage(name="priority", func=priority),
+        Stage(
+            name="instruments",
+            func=instruments,
+            deps=["priority"],
+            inputs=lambda: {"broker": mode_conf["broker"], "end_date": end_date},
+            outputs=[data_path / "instruments.parquet"],
+        ),
+        Stage(
+            name="ohlcv",
+            func=ohlcv,
+            deps=["instruments"],
+            # not the incremental start, it moves once the bars are fetched
+            inputs=lambda: {
+                "start_date": None if incremental else start_date,
+                "end_date": end_date,
+                "frequency": frequency,
+            },
+            outputs=[db_path],
+        ),
+        Stage(
+            name="backfill",
+            func=lambda: backfill_gaps(
+                mode_conf=mode_conf,
+                end_date=end_date,
+                frequency=frequency,
+                broker=broker,
+            ),
+            deps=["ohlcv"],
+        ),
+    ]
+
+
+def _backup_inputs() -> dict:
+    source = PIPELINE_CONF["backup"]["source"]
+    return {
+        "remote": PIPELINE_CONF["backup"]["remote"],
+        "files": {
+            str(p.relative_to(source)): [p.stat().st_size, p.stat().st_mtime_ns]
+            for p in sorted(source.rglob("*"))
+            if p.is_file()
+        },
+    }
+
+
+def _backup() -> None:
+    conf = PIPELINE_CONF["backup"]
+    subprocess.run(
+        ["rclone", "sync", str(conf["source"]), conf["remote"], "--progress"],
+        check=True,
+    )
+
+
+def build_pipeline(
+    run_mode: str,
+    end_date: str,
+    adr_cutoff: float,
+    frequency: str,
+    fetch_flag: bool,
+    backup_flag: bool,
+    workers: int,
+    force: set[str],
+    incremental: bool = False,
+    broker: Callable[[], BaseBroker] | None = None,
+) -> Pipeline:
+    """
+    Fetch, classification, scans, filters, analysis & backup of one run mode.
+    Scans, filters & analysis keep their own manifests, the pipeline caches
+    the rest. broker is a logged in session to fetch with, a new one by
+    default.
+    """
+    mode_conf = RUN_MODES[run_mode]
+    market = mode_conf["market"]
+    exchange = mode_conf["exchange"]
+    nse_flag = run_mode in PIPELINE_CONF["nse_run_modes"]
+
+    stages = []
+    if fetch_flag:
+        stages += _fetch_stages(
+            mode_conf=mode_conf,
+            end_date=end_date,
+            frequency=frequency,
+            adr_cutoff=adr_cutoff,
+            incremental=incremental,
+            broker=broker,
+        )
+    if fetch_flag and nse_flag:
+        classification_conf = RUN_MODES[PIPELINE_CONF["classification_run_mode"]]
+        stages.append(
+            Stage(
+                name="classification",
+                func=lambda: run_classification(
+                    end_date=end_date,
+                    run_mode=PIPELINE_CONF["classification_run_mode"],
+                ),
+                deps=["instruments"],
+                inputs=lambda: {"end_date": end_date},
+                outputs=[
+                    StorageLayout.db_path(
+                        market=classification_conf["market"],
+                        exchange=classification_conf["exchange"],
+                    )
+                ],
+            )
+        )
+
+    def scans():
+        make_run_dirs(
+            end_date=end_date, market=market, exchange=exchange, fetch_flag=False
+        )
+        run_swing_stages(
+            run_mode=run_mode,
+            end_date=end_date,
+            adr_cutoff=adr_cutoff,
+            streaming=False,
+            workers=workers,
+            force="scans" in force,
+        )
+
+    stages += [
+        Stage(name="scans", func=scans, deps=["backfill"] if fetch_flag else []),
+        Stage(
+            name="filters",
+            func=lambda: run_filter_stages(
+                run_mode=run_mode,
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                workers=workers,
+                shards=None,
+                force="filters" in force,
+            ),
+            deps=["scans"],
+        ),
+    ]
+
+    if nse_flag:
+        stages.append(
+            Stage(
+                name="analysis",
+                func=lambda: run_analysis(
+                    end_date=end_date,
+                    rs_cutoff=PIPELINE_CONF["rs_cutoff"],
+                    force="analysis" in force,
+                ),
+                deps=["filters", "classification"] if fetch_flag else ["filters"],
+            )
+        )
+    if nse_flag and backup_flag:
+        stages.append(
+            Stage(name="backup", func=_backup, deps=["analysis"], inputs=_backup_inputs)
+        )
+
+    return Pipeline(
+        stages=stages,
+        state_dir=StorageLayout.pipeline_dir(
+            run_date=end_date, market=market, exchange=exchange
+        ),
+        max_workers=PIPELINE_CONF["max_workers"],
+        force=force,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the swing pipeline as a dependency graph"
+    )
+    parser.add_argument("--fetch", action="store_true", help="Fetch Data")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fetch only the bars after the last one held",
+    )
+    parser.add_argument("--run_mode", required=True, help="Run Mode")
+    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--adr_cutoff", default=3.5, help="ADR Cutoff")
+    parser.add_argument("--freq", default="day", help="Frequency of data to be fetched")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes for per symbol shards"
+    )
+    parser.add_argument(
+        "--stages", help="Run only these stages & their upstream, comma separated"
+    )
+    parser.add_argument(
+        "--rerun", default="", help="Re-run these stages, comma separated"
+    )
+    parser.add_argument("--force", action="store_true", help="Re-run every stage")
+    parser.add_argument(
+        "--skip_backup", action="store_true", help="Do not sync ChartsMaze files"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Add Polars profiles to run metrics"
+    )
+
+    args = parser.parse_args()
+    mode_conf = RUN_MODES[args.run_mode]
+    if "scans_conf" not in mode_conf:
+        parser.error(f"Run mode {args.run_mode} has no scans")
+
+    if args.force:
+        force = set(STAGES)
+    else:
+        force = {name for name in args.rerun.split(",") if name}
+        if force - set(STAGES):
+            parser.error(f"Unknown stages {sorted(force - set(STAGES))}, of {STAGES}")
+
+    start_run(
+        out_dir=StorageLayout.runs_dir(
+            run_date=args.end_date,
+            market=mode_conf["market"],
+            exchange=mode_conf["exchange"],
+        ),
+        profile=args.profile,
+    )
+    try:
+        status = build_pipeline(
+            run_mode=args.run_mode,
+            end_date=args.end_date,
+            adr_cutoff=float(args.adr_cutoff),
+            frequency=args.freq,
+            fetch_flag=args.fetch,
+            incremental=args.incremental,
+            backup_flag=not args.skip_backup,
+            workers=args.workers,
+            force=force,
+        ).run(targets=args.stages.split(",") if args.stages else None)
+    finally:
+        end_run()
+
+    logger.info(f"Pipeline: {status}")
+    if any(s in [FAILED, BLOCKED] for s in status.values()):
+        sys.exit(1)
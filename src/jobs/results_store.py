@@ -0,0 +1,62 @@
+import argparse
+import logging
+from datetime import datetime
+
+import polars as pl
+
+from src.store.results import (backfill_results, changes, first_last_seen,
+                               streaks, symbol_history)
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+def _parse_date(value: str | None):
+    return None if value is None else datetime.strptime(value, "%Y-%m-%d").date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the scan results store")
+    parser.add_argument(
+        "query",
+        choices=["backfill", "streaks", "seen", "changes", "symbol"],
+        help="backfill loads past runs, the rest query the store",
+    )
+    parser.add_argument("--market", help="Market e.g. IND_EQ")
+    parser.add_argument("--result", help="Result name e.g. pullback_filter")
+    parser.add_argument("--symbol", help="Symbol for the symbol query")
+    parser.add_argument("--as_of", help="Streaks as of YYYY-MM-DD")
+    parser.add_argument("--run_date", help="Changes on YYYY-MM-DD")
+    parser.add_argument("--prev_run_date", help="Changes against YYYY-MM-DD")
+    parser.add_argument(
+        "--all_streaks", action="store_true", help="Include streaks already ended"
+    )
+    args = parser.parse_args()
+
+    pl.Config.set_tbl_rows(50)
+
+    if args.query == "backfill":
+        backfill_results()
+    elif args.query == "symbol":
+        print(symbol_history(symbol=args.symbol, market=args.market))
+    elif args.query == "streaks":
+        print(
+            streaks(
+                market=args.market,
+                result=args.result,
+                as_of=_parse_date(args.as_of),
+                current_only=not args.all_streaks,
+            )
+        )
+    elif args.query == "seen":
+        print(first_last_seen(market=args.market, result=args.result))
+    elif args.query == "changes":
+        print(
+            changes(
+                market=args.market,
+                result=args.result,
+                run_date=_parse_date(args.run_date),
+                prev_run_date=_parse_date(args.prev_run_date),
+            )
+        )
@@ -1,26 +1,49 @@
 import argparse
 import logging
 import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import polars as pl
+import polars.selectors as cs
 
+from src.analytics.breadth import update_breadth
+from src.analytics.sectors import update_sector_strength
+from src.brokers.registry import load_broker
+from src.config.artifacts import ARTIFACT_COLUMNS, ARTIFACT_SUFFIX
 from src.config.exchange_tables import EXCHG_TABLES
+from src.config.quality import QUALITY_CONF
 from src.config.run_modes import RUN_MODES
 from src.config.scans import filter_conf, scans_conf
 from src.config.storage_layout import StorageLayout
-from src.scans.filter_scan import (adr_filter, basic_filter, pullback_filter,
-                                   sma_200_filter)
+from src.pipeline.cache import (StageCache, hash_code, hash_config,
+                                sqlite_watermark)
+from src.pipeline.metrics import (current_run, current_stage, end_run, stage,
+                                  start_run)
+from src.scans import artifacts, filter_scan, rs_line, sharded
+from src.scans import streaming as streaming_module
+from src.scans import swing_scan
+from src.scans.artifacts import artifact_path, read_artifact, write_artifact
+from src.scans.filter_scan import basic_filter, run_filters
+from src.scans.rs_line import read_benchmark, read_rs_line_bars, rs_line_filter
+from src.scans.rs_rating import update_rs_ratings
+from src.scans.sharded import merge_ranked, process_pool, run_sharded_filters
+from src.scans.streaming import read_bucketed, stream_prep_scan_data
 from src.scans.swing_scan import (basic_scan, find_stocks, high_adr_scan,
                                   prep_scan_data)
+from src.store import adjustments, catalog
+from src.store.adjustments import adjustments_watermark, read_adjusted
+from src.store.catalog import flagged_symbols, read_catalog, update_catalog
+from src.store.results import append_stage_dir
 from src.utils import setup_logger
 
 logger = logging.getLogger(__name__)
 setup_logger()
 
 
-def _get_start_lookback_date(end_date: str, mode_conf: dict) -> tuple[str, str]:
+def get_start_lookback_date(end_date: str, mode_conf: dict) -> tuple[str, str]:
     _date_obj = datetime.strptime(end_date, "%Y-%m-%d")
     start_date = _date_obj - timedelta(
         days=mode_conf["scans_conf"]["months_lookback"] * 30
@@ -39,7 +62,7 @@ def _get_start_lookback_date(end_date: str, mode_conf: dict) -> tuple[str, str]:
     return start_date, lookback_date
 
 
-def _make_dir(end_date: str, market: str, exchange: str, fetch_flag: bool):
+def make_run_dirs(end_date: str, market: str, exchange: str, fetch_flag: bool):
     data_path = StorageLayout.data_dir(market=market, exchange=exchange)
     db_path = StorageLayout.db_path(market=market, exchange=exchange)
 
@@ -50,26 +73,30 @@ def _make_dir(end_date: str, market: str, exchange: str, fetch_flag: bool):
         data_path.mkdir(exist_ok=True, parents=True)
         logger.info(f"Creating Directory: {data_path}")
 
+    # scans & filters outputs are cleared by their stage only when they re-run
     runs_path = StorageLayout.runs_dir(
         run_date=end_date, market=market, exchange=exchange
     )
-    if runs_path.exists() and runs_path.is_dir():
-        logger.info(f"Deleting Directory: {runs_path}")
-        shutil.rmtree(runs_path)
-
     runs_path.mkdir(parents=True, exist_ok=True)
     logger.info(f"Creating Directory: {runs_path}")
 
+    work_path = StorageLayout.work_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+    if work_path.exists() and work_path.is_dir():
+        logger.info(f"Deleting Directory: {work_path}")
+        shutil.rmtree(work_path)
+
     scans_path = StorageLayout.scans_dir(
         run_date=end_date, market=market, exchange=exchange
     )
-    scans_path.mkdir(parents=True)
+    scans_path.mkdir(parents=True, exist_ok=True)
     logger.info(f"Creating Directory: {scans_path}")
 
     filters_path = StorageLayout.filters_dir(
         run_date=end_date, market=market, exchange=exchange
     )
-    filters_path.mkdir(parents=True)
+    filters_path.mkdir(parents=True, exist_ok=True)
     logger.info(f"Creating Directory: {filters_path}")
 
     return data_path, db_path, runs_path, scans_path, filters_path
@@ -83,15 +110,29 @@ def _run_swing_scan(
     start_date: str,
     end_date: str,
     adr_cutoff: float,
+    work_path: Path | None = None,
+    workers: int = 1,
+    csv_flag: bool = False,
 ):
     start_date = datetime.strptime(start_date, "%Y-%m-%d")
     end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
-    master_df = prep_scan_data(
-        conn=f"sqlite:///{db_path}",
-        table_id=table_id,
-        lookback_min_gains_dict=scans_conf["lookback_min_return_pct"],
-    )
+    if work_path is not None:
+        logger.info("Preparing Scan Data with Streaming Engine")
+        master_df = stream_prep_scan_data(
+            conn=f"sqlite:///{db_path}",
+            table_id=table_id,
+            lookback_min_gains_dict=scans_conf["lookback_min_return_pct"],
+            work_dir=work_path,
+            conf=scans_conf["streaming"],
+            max_workers=workers,
+        )
+    else:
+        master_df = prep_scan_data(
+            conn=f"sqlite:///{db_path}",
+            table_id=table_id,
+            lookback_min_gains_dict=scans_conf["lookback_min_return_pct"],
+        )
 
     ## BASIC SCAN
     basic_scan_df = basic_scan(data=master_df, conf=scans_conf)
@@ -106,12 +147,16 @@ def _run_swing_scan(
     basic_stocks_df = find_stocks(
         data=basic_scan_df, start_date=start_date, end_date=end_date
     )
-    basic_scan_df.collect().write_csv(scans_path / "basic_scan.csv")
-    basic_stocks_df.write_csv(scans_path / "basic_stocks.csv")
-    logger.info(f"SCan path: {scans_path}")
-    logger.info(
-        f"# Stocks in BASIC SCAN: {basic_stocks_df.select(pl.col('symbol').n_unique()).item(0, 0)}"
+    write_artifact(
+        basic_scan_df, out_dir=scans_path, name="basic_scan", csv_flag=csv_flag
     )
+    write_artifact(
+        basic_stocks_df, out_dir=scans_path, name="basic_stocks", csv_flag=csv_flag
+    )
+    logger.info(f"SCan path: {scans_path}")
+    n_basic_stocks = basic_stocks_df.select(pl.col("symbol").n_unique()).item(0, 0)
+    logger.info(f"# Stocks in BASIC SCAN: {n_basic_stocks}")
+    current_stage().rows_out = n_basic_stocks
 
     ## ADR SCAN
     adr_scan_df = high_adr_scan(data=master_df, adr_cutoff=adr_cutoff, conf=scans_conf)
@@ -126,8 +171,10 @@ def _run_swing_scan(
     adr_stocks_df = find_stocks(
         data=adr_scan_df, start_date=start_date, end_date=end_date
     )
-    adr_scan_df.collect().write_csv(scans_path / "adr_scan.csv")
-    adr_stocks_df.write_csv(scans_path / "adr_stocks.csv")
+    write_artifact(adr_scan_df, out_dir=scans_path, name="adr_scan", csv_flag=csv_flag)
+    write_artifact(
+        adr_stocks_df, out_dir=scans_path, name="adr_stocks", csv_flag=csv_flag
+    )
     logger.info(
         f"# Stocks in ADR SCAN: {adr_stocks_df.select(pl.col('symbol').n_unique()).item(0, 0)}"
     )
@@ -142,24 +189,49 @@ def _run_filter_scan(
     filters_conf: dict,
     end_date: str,
     adr_cutoff: float,
+    work_path: Path,
+    workers: int = 1,
+    shards: int | None = None,
+    streaming: bool = False,
+    csv_flag: bool = False,
+    benchmark_table_id: str | None = None,
 ):
-    end_date = datetime.strptime(args.end_date, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
     scan_symbol_list = (
-        pl.scan_csv(scans_path / "basic_stocks.csv")
-        .collect()
+        read_artifact(out_dir=scans_path, name="basic_stocks")
         .get_column("symbol")
         .to_list()
     )
+    coverage = read_catalog(conn=f"sqlite:///{db_path}", ohlcv_table_id=table_id)
+    if coverage is not None:
+        flagged = set(flagged_symbols(catalog=coverage, conf=QUALITY_CONF))
+        excluded = [s for s in scan_symbol_list if s in flagged]
+        if excluded:
+            logger.warning(f"Left out for data quality: {excluded}")
+        scan_symbol_list = [s for s in scan_symbol_list if s not in flagged]
     logger.info(f"Stocks in the Scan List {len(scan_symbol_list)}")
-
-    query = f"""
-    select * 
-    from {table_id}
-    where symbol in {tuple(scan_symbol_list)}
-    """
-
-    data = pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}")
+    current_stage().rows_in = len(scan_symbol_list)
+
+    if streaming:
+        # scan list rows only, out of the symbol buckets of the swing prep
+        data = read_bucketed(
+            conn=f"sqlite:///{db_path}",
+            table_id=table_id,
+            work_dir=work_path,
+            symbols=scan_symbol_list,
+            conf=scans_conf["streaming"],
+        )
+    else:
+        query = f"""
+        select * 
+        from {table_id}
+        where symbol in {tuple(scan_symbol_list)}
+        """
+
+        data = read_adjusted(
+            query=query, conn=f"sqlite:///{db_path}", ohlcv_table_id=table_id
+        )
     basic_stock_list = basic_filter(
         data=data, symbol_list=scan_symbol_list, scan_date=end_date, conf=scans_conf
     )
@@ -167,41 +239,70 @@ def _run_filter_scan(
 
     # Basic filter
     basic_filter_df = data.filter(pl.col("timestamp") == end_date)
-    basic_filter_df.write_csv(filters_path / "basic_filter.csv")
+    write_artifact(
+        basic_filter_df, out_dir=filters_path, name="basic_filter", csv_flag=csv_flag
+    )
     logger.info(f"# Stocks in Basic Filter: {basic_filter_df.shape[0]}")
+    current_stage().rows_out = basic_filter_df.shape[0]
 
-    # 200 SMA filter
     basic_filter_stocks = basic_filter_df.get_column("symbol").to_list()
     data = data.filter(pl.col("symbol").is_in(basic_filter_stocks))
-    sma_200_filter_df = sma_200_filter(data=data, end_date=end_date)
-    sma_200_filter_df.write_csv(filters_path / "sma_200_filter.csv")
-    logger.info(f"# Stocks in SMA 200 Filter: {sma_200_filter_df.shape[0]}")
-
-    # ADR filter
-    # sma_200_filter_stocks = sma_200_filter_df.get_column("symbol").to_list()
-    # data = data.filter(pl.col("symbol").is_in(sma_200_filter_stocks))
-    adr_filter_df = adr_filter(data=data, adr_cutoff=adr_cutoff, end_date=end_date)
-    adr_filter_df.write_csv(filters_path / "adr_filter.csv")
-    logger.info(f"# Stocks in ADR Filter: {adr_filter_df.shape[0]}")
 
-    # Final ADR Filter
-    # adr_filter_stocks = adr_filter_df.get_column("symbol").to_list()
-    # data = data.filter(pl.col("symbol").is_in(adr_filter_stocks))
-
-    # Pullback filter
-    pullback_df = pullback_filter(
-        data=data, end_date=end_date, conf=filters_conf["pullback"]
-    )
-    pullback_df.select(pl.exclude("flag_dates")).write_csv(
-        filters_path / "pullback_filter.csv"
-    )
-    pullback_df.write_parquet(filters_path / "pullback_filter.parquet")
-    logger.info(f"# Stocks in PullBack: {pullback_df.shape[0]}")
-
-    # # VCP filter
-    # vcp_df = vcp_filter(data=data, end_date=end_date, conf=filters_conf["vcp"])
-    # vcp_df.write_csv(filters_path / "vcp_filter.csv")
-    # logger.info(f"# Stocks in VCP: {vcp_df.shape[0]}")
+    if workers > 1:
+        filter_results = run_sharded_filters(
+            data=data,
+            work_dir=work_path,
+            end_date=end_date,
+            adr_cutoff=adr_cutoff,
+            filters_conf=filters_conf,
+            n_shards=shards or workers,
+            max_workers=workers,
+        )
+    else:
+        filter_results = run_filters(
+            data=data, end_date=end_date, adr_cutoff=adr_cutoff, conf=filters_conf
+        )
+
+    for filter_type, filter_df in filter_results.items():
+        write_artifact(
+            filter_df,
+            out_dir=filters_path,
+            name=f"{filter_type}_filter",
+            csv_flag=csv_flag,
+        )
+        logger.info(f"# Stocks in {filter_type} Filter: {filter_df.shape[0]}")
+        current_stage().extra[f"{filter_type}_filter_rows"] = filter_df.shape[0]
+
+    ## RS Line against the benchmark, of every symbol held
+    if benchmark_table_id is not None:
+        rs_line_conf = filters_conf["rs_line"]
+        benchmark_df = read_benchmark(
+            db_path=db_path,
+            table_id=benchmark_table_id,
+            symbol=rs_line_conf["benchmark"],
+        )
+        if benchmark_df.is_empty():
+            logger.warning(
+                f"No data for benchmark {rs_line_conf['benchmark']} in {benchmark_table_id}, skipping RS line"
+            )
+        else:
+            rs_line_df = rs_line_filter(
+                data=read_rs_line_bars(
+                    db_path=db_path,
+                    table_id=table_id,
+                    end_date=end_date,
+                    conf=rs_line_conf,
+                ),
+                benchmark=benchmark_df,
+                end_date=end_date,
+                conf=rs_line_conf,
+            )
+            write_artifact(
+                rs_line_df, out_dir=filters_path, name="rs_line", csv_flag=csv_flag
+            )
+            logger.info(
+                f"# Stocks at RS line high: {rs_line_df.filter(pl.col('rs_new_high')).shape[0]}"
+            )
 
     # ## Pullback Reversal
     # reversal_df = pullback_reversal_filter(
@@ -210,47 +311,14 @@ def _run_filter_scan(
     # reversal_df.write_csv(filters_path / "reversal_filter.csv")
     # logger.info(f"# Stocks in Pullback reversal: {reversal_df.shape[0]}")
 
-    # ## Inside Bars
-    # inside_df = insider_bars_filter(
-    #     data=data, end_date=end_date, conf=filters_conf["inside_bars"]
-    # )
-    # inside_df.write_csv(filters_path / "inside_bars_filter.csv")
-    # logger.info(f"# Stocks in Inside Bars: {inside_df.shape[0]}")
-
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Run Swing Scans")
-    parser.add_argument("--fetch", action="store_true", help="Fetch Data")
-    parser.add_argument("--run_mode", required=True, help="Run Mode")
-    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
-    parser.add_argument("--adr_cutoff", help="ADR Cutoff")
-    parser.add_argument("--freq", help="Frequency of data to be fetched")
-
-    args = parser.parse_args()
-    fetch_flag = args.fetch
-    mode_conf = RUN_MODES[args.run_mode]
-    end_date = args.end_date
-    adr_cutoff = float(args.adr_cutoff)
-    frequency = args.freq
-
-    ## Fetch Dates
-    start_date, lookback_date = _get_start_lookback_date(
-        end_date=end_date, mode_conf=mode_conf
-    )
 
-    ## Make Dir
-    data_path, db_path, runs_path, scans_path, filters_path = _make_dir(
-        end_date=end_date,
-        market=mode_conf["market"],
-        exchange=mode_conf["exchange"],
-        fetch_flag=fetch_flag,
-    )
-
-    ## Fetch Data
-    if fetch_flag:
-        logger.info("Fetching Data....")
-        broker = mode_conf["broker"]
-        broker = broker(
+def _fetch_data(
+    mode_conf: dict, lookback_date: str, end_date: str, frequency: str
+) -> None:
+    logger.info(f"Fetching Data for {mode_conf['exchange']}....")
+    broker = load_broker(mode_conf["broker"])
+    with stage(f"fetch:{mode_conf['exchange'].value}"):
+        broker(
             market=mode_conf["market"],
             exchange=mode_conf["exchange"],
             start_date=lookback_date,
@@ -260,28 +328,535 @@ if __name__ == "__main__":
             tables=EXCHG_TABLES,
         )()
 
-    ## Run Swing Scan
-    logger.info("######### Running Swing Scan #########")
-    data_table_id = EXCHG_TABLES[mode_conf["exchange"]]["equity_ohlcv_daily"]
-    _run_swing_scan(
+
+def _run_scans(
+    run_mode: str,
+    end_date: str,
+    adr_cutoff: float,
+    streaming: bool,
+    workers: int,
+    shards: int | None,
+    csv_flag: bool = False,
+    force: bool = False,
+    profile: bool = False,
+) -> Path:
+    """
+    Scans of one run mode, recorded in the current run metrics or in the run
+    mode's own when there is none (a process pool worker)
+    """
+    scan_args = (run_mode, end_date, adr_cutoff, streaming, workers, shards)
+    if current_run() is not None:
+        return _run_scan_stages(*scan_args, csv_flag=csv_flag, force=force)
+
+    mode_conf = RUN_MODES[run_mode]
+    start_run(
+        out_dir=StorageLayout.runs_dir(
+            run_date=end_date,
+            market=mode_conf["market"],
+            exchange=mode_conf["exchange"],
+        ),
+        profile=profile,
+    )
+    try:
+        return _run_scan_stages(*scan_args, csv_flag=csv_flag, force=force)
+    finally:
+        end_run()
+
+
+def _run_scan_stages(
+    run_mode: str,
+    end_date: str,
+    adr_cutoff: float,
+    streaming: bool,
+    workers: int,
+    shards: int | None,
+    csv_flag: bool = False,
+    force: bool = False,
+) -> Path:
+    """
+    Swing & filter scans for one run mode on already fetched data, a stage
+    whose inputs match its manifest is skipped
+    """
+    run_swing_stages(
+        run_mode=run_mode,
+        end_date=end_date,
+        adr_cutoff=adr_cutoff,
+        streaming=streaming,
+        workers=workers,
+        csv_flag=csv_flag,
+        force=force,
+    )
+    return run_filter_stages(
+        run_mode=run_mode,
+        end_date=end_date,
+        adr_cutoff=adr_cutoff,
+        workers=workers,
+        shards=shards,
+        streaming=streaming,
+        csv_flag=csv_flag,
+        force=force,
+    )
+
+
+def _run_inputs(
+    db_path: Path, table_id: str, end_date: str, adr_cutoff: float, csv_flag: bool
+) -> dict:
+    return {
+        "data": sqlite_watermark(db_path=db_path, table_id=table_id),
+        "adjustments": adjustments_watermark(
+            conn=f"sqlite:///{db_path}", ohlcv_table_id=table_id
+        ),
+        "args": {"end_date": end_date, "adr_cutoff": adr_cutoff, "csv": csv_flag},
+    }
+
+
+def run_swing_stages(
+    run_mode: str,
+    end_date: str,
+    adr_cutoff: float,
+    streaming: bool,
+    workers: int,
+    csv_flag: bool = False,
+    force: bool = False,
+) -> None:
+    """
+    RS ratings, breadth & sectors updated, then the swing scan unless its
+    inputs match its manifest
+    """
+    mode_conf = RUN_MODES[run_mode]
+    market = mode_conf["market"]
+    exchange = mode_conf["exchange"]
+
+    start_date, _ = get_start_lookback_date(end_date=end_date, mode_conf=mode_conf)
+
+    db_path = StorageLayout.db_path(market=market, exchange=exchange)
+    scans_path = StorageLayout.scans_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+    work_path = StorageLayout.work_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+
+    data_table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+    run_inputs = _run_inputs(
         db_path=db_path,
-        scans_path=scans_path,
         table_id=data_table_id,
-        scans_conf=scans_conf[mode_conf["market"]],
-        start_date=start_date,
         end_date=end_date,
         adr_cutoff=adr_cutoff,
+        csv_flag=csv_flag,
     )
 
-    ## Run Filter Scan
-    logger.info("######### Running Filter Scan #########")
-    _run_filter_scan(
+    ## Validate OHLCV into its coverage catalog
+    with stage("catalog") as m:
+        m.rows_out = update_catalog(
+            db_path=db_path,
+            ohlcv_table_id=data_table_id,
+            conf=QUALITY_CONF,
+            rebuild=force,
+        ).shape[0]
+
+    ## Update RS Ratings
+    logger.info(
+        f"######### Updating RS Ratings, Breadth & Sectors: {exchange} #########"
+    )
+    with stage("rs_rating") as m:
+        m.rows_out = update_rs_ratings(
+            db_path=db_path,
+            ohlcv_table_id=data_table_id,
+            rs_table_id=EXCHG_TABLES[exchange]["equity_rs_rating_daily"],
+            conf=scans_conf[market]["rs_rating"],
+            rebuild=force,
+        )
+
+    ## Update Market Breadth
+    with stage("breadth") as m:
+        m.rows_out = update_breadth(
+            db_path=db_path,
+            ohlcv_table_id=data_table_id,
+            breadth_table_id=EXCHG_TABLES[exchange]["equity_breadth_daily"],
+            conf=scans_conf[market],
+            rebuild=force,
+        )
+
+    ## Update Sector & Industry Strength
+    if "sectors" in scans_conf[market]:
+        with stage("sectors") as m:
+            m.rows_out = update_sector_strength(
+                db_path=db_path,
+                ohlcv_table_id=data_table_id,
+                rs_table_id=EXCHG_TABLES[exchange]["equity_rs_rating_daily"],
+                sectors_table_id=EXCHG_TABLES[exchange]["sector_strength_daily"],
+                conf=scans_conf[market],
+                rebuild=force,
+            )
+
+    ## Run Swing Scan
+    swing_cache = StageCache(stage="swing_scan", out_dir=scans_path, force=force)
+    swing_inputs = {
+        **run_inputs,
+        "config": hash_config(scans_conf[market]),
+        "code": hash_code(
+            swing_scan,
+            streaming_module,
+            artifacts,
+            adjustments,
+            sys.modules[__name__],
+        ),
+    }
+    with stage("swing_scan") as m:
+        m.rows_in = run_inputs["data"]["n_rows"]
+        m.extra["cached"] = swing_cache.is_fresh(swing_inputs)
+        if not m.extra["cached"]:
+            logger.info(f"######### Running Swing Scan: {exchange} #########")
+            swing_cache.reset()
+            sharded_flag = streaming or workers > 1
+            _run_swing_scan(
+                db_path=db_path,
+                scans_path=scans_path,
+                table_id=data_table_id,
+                scans_conf=scans_conf[market],
+                start_date=start_date,
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                work_path=work_path if sharded_flag else None,
+                workers=workers,
+                csv_flag=csv_flag,
+            )
+            swing_cache.record(swing_inputs)
+
+
+def run_filter_stages(
+    run_mode: str,
+    end_date: str,
+    adr_cutoff: float,
+    workers: int,
+    shards: int | None,
+    streaming: bool = False,
+    csv_flag: bool = False,
+    force: bool = False,
+) -> Path:
+    """
+    Filter scans on the swing scan results, unless their inputs match their
+    manifest. Streaming reads the scan list out of the swing prep buckets.
+    """
+    mode_conf = RUN_MODES[run_mode]
+    market = mode_conf["market"]
+    exchange = mode_conf["exchange"]
+
+    db_path = StorageLayout.db_path(market=market, exchange=exchange)
+    scans_path = StorageLayout.scans_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+    filters_path = StorageLayout.filters_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+    work_path = StorageLayout.work_dir(
+        run_date=end_date, market=market, exchange=exchange
+    )
+
+    data_table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+    run_inputs = _run_inputs(
         db_path=db_path,
-        scans_path=scans_path,
-        filters_path=filters_path,
         table_id=data_table_id,
-        scans_conf=scans_conf[mode_conf["market"]],
-        filters_conf=filter_conf[mode_conf["market"]],
         end_date=end_date,
         adr_cutoff=adr_cutoff,
+        csv_flag=csv_flag,
+    )
+
+    ## Run Filter Scan
+    benchmark_table_id = None
+    if "rs_line" in filter_conf[market]:
+        benchmark_table_id = EXCHG_TABLES[exchange].get(
+            filter_conf[market]["rs_line"]["table"]
+        )
+    filter_cache = StageCache(stage="filter_scan", out_dir=filters_path, force=force)
+    filter_inputs = {
+        **run_inputs,
+        "benchmark": None
+        if benchmark_table_id is None
+        else sqlite_watermark(db_path=db_path, table_id=benchmark_table_id),
+        "swing_scan": StageCache(stage="swing_scan", out_dir=scans_path).digest(),
+        "config": hash_config(
+            {
+                "scans_conf": scans_conf[market],
+                "filter_conf": filter_conf[market],
+                "quality_conf": QUALITY_CONF,
+            }
+        ),
+        "code": hash_code(
+            filter_scan,
+            swing_scan,
+            sharded,
+            rs_line,
+            artifacts,
+            adjustments,
+            catalog,
+            sys.modules[__name__],
+        ),
+    }
+    with stage("filter_scan") as m:
+        m.extra["cached"] = filter_cache.is_fresh(filter_inputs)
+        if not m.extra["cached"]:
+            logger.info(f"######### Running Filter Scan: {exchange} #########")
+            filter_cache.reset()
+            _run_filter_scan(
+                db_path=db_path,
+                scans_path=scans_path,
+                filters_path=filters_path,
+                table_id=data_table_id,
+                scans_conf=scans_conf[market],
+                filters_conf=filter_conf[market],
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                work_path=work_path,
+                workers=workers,
+                shards=shards,
+                streaming=streaming,
+                csv_flag=csv_flag,
+                benchmark_table_id=benchmark_table_id,
+            )
+            filter_cache.record(filter_inputs)
+            append_stage_dir(
+                run_date=end_date,
+                market=market,
+                exchange=exchange,
+                stage="filters",
+                stage_dir=filters_path,
+            )
+
+    return filters_path
+
+
+def _merge_filter_results(
+    end_date: str, market: str, filters_paths: dict[str, Path], csv_flag: bool
+) -> None:
+    """
+    Rank each filter across all the exchanges of a market
+    """
+    merged_path = StorageLayout.merged_filters_dir(run_date=end_date, market=market)
+    if merged_path.exists() and merged_path.is_dir():
+        logger.info(f"Deleting Directory: {merged_path}")
+        shutil.rmtree(merged_path)
+    merged_path.mkdir(parents=True)
+    logger.info(f"Creating Directory: {merged_path}")
+
+    filter_names = sorted(
+        {
+            path.stem
+            for p in filters_paths.values()
+            for path in p.glob(f"*{ARTIFACT_SUFFIX}")
+        }
+    )
+    for filter_name in filter_names:
+        dfs = [
+            read_artifact(out_dir=path, name=filter_name).with_columns(
+                pl.lit(exchange).alias("exchange")
+            )
+            for exchange, path in filters_paths.items()
+            if artifact_path(out_dir=path, name=filter_name).exists()
+        ]
+        if "rank" in dfs[0].columns:
+            merged_df = merge_ranked(dfs)
+        else:
+            merged_df = pl.concat(dfs, how="diagonal_relaxed")
+        write_artifact(
+            merged_df,
+            out_dir=merged_path,
+            name=filter_name,
+            csv_flag=csv_flag,
+            columns=ARTIFACT_COLUMNS[filter_name] | cs.by_name("exchange"),
+        )
+        logger.info(f"# Stocks in merged {filter_name}: {merged_df.shape[0]}")
+
+
+def _run_multi_modes(
+    run_modes: list[str],
+    end_date: str,
+    adr_cutoff: float,
+    frequency: str,
+    fetch_flag: bool,
+    streaming: bool,
+    workers: int,
+    shards: int | None,
+    csv_flag: bool = False,
+    force: bool = False,
+    profile: bool = False,
+) -> None:
+    """
+    Fetch all run modes concurrently, scan them in parallel processes & write
+    a merged ranking per market
+    """
+    for run_mode in run_modes:
+        mode_conf = RUN_MODES[run_mode]
+        make_run_dirs(
+            end_date=end_date,
+            market=mode_conf["market"],
+            exchange=mode_conf["exchange"],
+            fetch_flag=fetch_flag,
+        )
+
+    ## Fetch Data, every broker enforces its own rate limit across threads
+    if fetch_flag:
+        # imported here, it pulls in the Polygon SDK
+        from src.brokers.polygon.api import shared_grouped_daily_aggs
+
+        with (
+            shared_grouped_daily_aggs(),
+            ThreadPoolExecutor(max_workers=len(run_modes)) as executor,
+        ):
+            futures = []
+            for run_mode in run_modes:
+                mode_conf = RUN_MODES[run_mode]
+                _, lookback_date = get_start_lookback_date(
+                    end_date=end_date, mode_conf=mode_conf
+                )
+                futures.append(
+                    executor.submit(
+                        _fetch_data, mode_conf, lookback_date, end_date, frequency
+                    )
+                )
+            for future in futures:
+                future.result()
+
+    ## Run Scans
+    with process_pool(max_workers=len(run_modes)) as executor:
+        futures = {
+            run_mode: executor.submit(
+                _run_scans,
+                run_mode,
+                end_date,
+                adr_cutoff,
+                streaming,
+                workers,
+                shards,
+                csv_flag,
+                force,
+                profile,
+            )
+            for run_mode in run_modes
+        }
+        filters_paths = {
+            run_mode: future.result() for run_mode, future in futures.items()
+        }
+
+    ## Merged Ranking
+    markets = {}
+    for run_mode, filters_path in filters_paths.items():
+        mode_conf = RUN_MODES[run_mode]
+        markets.setdefault(mode_conf["market"], {})[mode_conf["exchange"].value] = (
+            filters_path
+        )
+
+    for market, market_filters_paths in markets.items():
+        if len(market_filters_paths) > 1:
+            with stage(f"merge:{market.value}"):
+                _merge_filter_results(
+                    end_date=end_date,
+                    market=market,
+                    filters_paths=market_filters_paths,
+                    csv_flag=csv_flag,
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Swing Scans")
+    parser.add_argument("--fetch", action="store_true", help="Fetch Data")
+    parser.add_argument(
+        "--run_mode", required=True, help="Run Mode, comma separated for many eg: 3,4"
     )
+    parser.add_argument("--end_date", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--adr_cutoff", help="ADR Cutoff")
+    parser.add_argument("--freq", help="Frequency of data to be fetched")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Prepare scan data in memory bounded buckets with the streaming engine",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes for per symbol shards"
+    )
+    parser.add_argument(
+        "--shards", type=int, help="Symbol hash shards for filters, default workers"
+    )
+    parser.add_argument(
+        "--csv", action="store_true", help="Export a CSV copy of every run artifact"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-run stages even if inputs unchanged"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Add Polars profiles to run metrics"
+    )
+
+    args = parser.parse_args()
+    fetch_flag = args.fetch
+    run_modes = args.run_mode.split(",")
+    end_date = args.end_date
+    adr_cutoff = float(args.adr_cutoff)
+    frequency = args.freq
+
+    if len(run_modes) > 1:
+        # fetch & merge metrics, each run mode's scans write their own
+        start_run(out_dir=StorageLayout.RUNS / end_date, profile=args.profile)
+        try:
+            _run_multi_modes(
+                run_modes=run_modes,
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                frequency=frequency,
+                fetch_flag=fetch_flag,
+                streaming=args.streaming,
+                workers=args.workers,
+                shards=args.shards,
+                csv_flag=args.csv,
+                force=args.force,
+                profile=args.profile,
+            )
+        finally:
+            end_run()
+    else:
+        mode_conf = RUN_MODES[run_modes[0]]
+
+        ## Fetch Dates
+        _, lookback_date = get_start_lookback_date(
+            end_date=end_date, mode_conf=mode_conf
+        )
+
+        ## Make Dir
+        make_run_dirs(
+            end_date=end_date,
+            market=mode_conf["market"],
+            exchange=mode_conf["exchange"],
+            fetch_flag=fetch_flag,
+        )
+
+        start_run(
+            out_dir=StorageLayout.runs_dir(
+                run_date=end_date,
+                market=mode_conf["market"],
+                exchange=mode_conf["exchange"],
+            ),
+            profile=args.profile,
+        )
+        try:
+            ## Fetch Data
+            if fetch_flag:
+                _fetch_data(
+                    mode_conf=mode_conf,
+                    lookback_date=lookback_date,
+                    end_date=end_date,
+                    frequency=frequency,
+                )
+
+            _run_scans(
+                run_mode=run_modes[0],
+                end_date=end_date,
+                adr_cutoff=adr_cutoff,
+                streaming=args.streaming,
+                workers=args.workers,
+                shards=args.shards,
+                csv_flag=args.csv,
+                force=args.force,
+            )
+        finally:
+            end_run()
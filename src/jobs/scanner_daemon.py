@@ -0,0 +1,59 @@
+import argparse
+import logging
+from pathlib import Path
+
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.run_modes import RUN_MODES
+from src.config.service import SCANNER_SERVICE_CONF
+from src.config.storage_layout import StorageLayout
+from src.service.hot_frame import HotFrame
+from src.service.server import serve
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep one run mode's data in memory & serve scans, filters & SQL"
+    )
+    parser.add_argument("--run_mode", default="1", help="Run Mode")
+    parser.add_argument(
+        "--socket",
+        nargs="?",
+        const=str(SCANNER_SERVICE_CONF["socket_path"]),
+        help="Serve on this Unix socket, default path when given bare",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=SCANNER_SERVICE_CONF["port"],
+        help="Serve on localhost at this port, unless --socket",
+    )
+    parser.add_argument(
+        "--refresh_seconds",
+        type=int,
+        default=SCANNER_SERVICE_CONF["refresh_seconds"],
+        help="Poll the DB for new bars this often, 0 to refresh on request",
+    )
+
+    args = parser.parse_args()
+    mode_conf = RUN_MODES[args.run_mode]
+
+    hot_frame = HotFrame(
+        db_path=StorageLayout.db_path(
+            market=mode_conf["market"], exchange=mode_conf["exchange"]
+        ),
+        table_id=EXCHG_TABLES[mode_conf["exchange"]]["equity_ohlcv_daily"],
+        scans_conf=mode_conf["scans_conf"],
+        filter_conf=mode_conf["filter_conf"],
+        filter_cache_size=SCANNER_SERVICE_CONF["filter_cache_size"],
+    )
+
+    serve(
+        hot_frame=hot_frame,
+        conf={**SCANNER_SERVICE_CONF, "refresh_seconds": args.refresh_seconds},
+        socket_path=None if args.socket is None else Path(args.socket),
+        port=args.port,
+    )
@@ -0,0 +1,110 @@
+import argparse
+import logging
+from datetime import date
+
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.run_modes import RUN_MODES
+from src.config.schedule import SCHEDULER_CONF
+from src.config.storage_layout import StorageLayout
+from src.jobs.pipeline import broker_session, build_pipeline
+from src.pipeline.market_calendar import MarketCalendar
+from src.pipeline.metrics import end_run, start_run
+from src.pipeline.scheduler import CloseScheduler, local_bars_available
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fetch & scan each trading day as soon as its bars are out"
+    )
+    parser.add_argument("--run_mode", required=True, help="Run Mode")
+    parser.add_argument("--adr_cutoff", default=3.5, help="ADR Cutoff")
+    parser.add_argument("--freq", default="day", help="Frequency of data to be fetched")
+    parser.add_argument(
+        "--probe",
+        choices=["broker", "local"],
+        default="broker",
+        help="Ask the broker for the day's bars, or wait for them in the local DB & only scan",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes for per symbol shards"
+    )
+    parser.add_argument(
+        "--skip_backup", action="store_true", help="Do not sync ChartsMaze files"
+    )
+    parser.add_argument("--once", action="store_true", help="Run the next day only")
+
+    args = parser.parse_args()
+    mode_conf = RUN_MODES[args.run_mode]
+    if "scans_conf" not in mode_conf:
+        parser.error(f"Run mode {args.run_mode} has no scans")
+
+    market = mode_conf["market"]
+    exchange = mode_conf["exchange"]
+    fetch_flag = args.probe == "broker"
+    # logged in broker of each day, kept from warmup to run
+    sessions = {}
+
+    def session(day: date):
+        if day not in sessions:
+            end_date = day.strftime("%Y-%m-%d")
+            sessions.clear()
+            sessions[day] = broker_session(
+                mode_conf=mode_conf,
+                end_date=end_date,
+                frequency=args.freq,
+                incremental=True,
+            )
+        return sessions[day]
+
+    def pipeline(day: date):
+        return build_pipeline(
+            run_mode=args.run_mode,
+            end_date=day.strftime("%Y-%m-%d"),
+            adr_cutoff=float(args.adr_cutoff),
+            frequency=args.freq,
+            fetch_flag=fetch_flag,
+            incremental=True,
+            backup_flag=not args.skip_backup,
+            workers=args.workers,
+            force=set(),
+            broker=session(day) if fetch_flag else None,
+        )
+
+    def warmup(day: date):
+        # login & the instrument master, ready before the bell
+        if fetch_flag:
+            pipeline(day).run(targets=["instruments"])
+
+    def probe(day: date) -> bool:
+        if fetch_flag:
+            return session(day)().bars_available(day)
+        return local_bars_available(
+            db_path=StorageLayout.db_path(market=market, exchange=exchange),
+            table_id=EXCHG_TABLES[exchange]["equity_ohlcv_daily"],
+            day=day,
+        )
+
+    def run(day: date):
+        end_date = day.strftime("%Y-%m-%d")
+        start_run(
+            out_dir=StorageLayout.runs_dir(
+                run_date=end_date, market=market, exchange=exchange
+            )
+        )
+        try:
+            status = pipeline(day).run()
+        finally:
+            end_run()
+        logger.info(f"Pipeline {end_date}: {status}")
+
+    CloseScheduler(
+        calendar=MarketCalendar(exchange=exchange),
+        warmup=warmup,
+        probe=probe,
+        run=run,
+        conf=SCHEDULER_CONF,
+    ).serve(once=args.once)
@@ -0,0 +1,47 @@
+import argparse
+import logging
+
+import polars as pl
+
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.quality import QUALITY_CONF
+from src.config.run_modes import RUN_MODES
+from src.config.storage_layout import StorageLayout
+from src.store.catalog import flagged_symbols, update_catalog
+from src.utils import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Validate the OHLCV store into its coverage catalog"
+    )
+    parser.add_argument("--run_mode", required=True, help="Run Mode(s), e.g. 1,3")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Validate even if the catalog is fresh"
+    )
+    args = parser.parse_args()
+
+    for run_mode in args.run_mode.split(","):
+        mode_conf = RUN_MODES[run_mode]
+        exchange = mode_conf["exchange"]
+        table_id = EXCHG_TABLES[exchange]["equity_ohlcv_daily"]
+
+        catalog = update_catalog(
+            db_path=StorageLayout.db_path(
+                market=mode_conf["market"], exchange=exchange
+            ),
+            ohlcv_table_id=table_id,
+            conf=QUALITY_CONF,
+            rebuild=args.rebuild,
+        )
+        flagged = catalog.filter(
+            pl.col("symbol").is_in(flagged_symbols(catalog=catalog, conf=QUALITY_CONF))
+        )
+        logger.info(
+            f"{exchange.value}: {catalog.shape[0]} symbols, {flagged.shape[0]} left out of scans"
+        )
+        if not flagged.is_empty():
+            print(flagged.drop("validated_at"))
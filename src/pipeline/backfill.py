@@ -0,0 +1,90 @@
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from src.brokers.base import BaseBroker
+from src.pipeline.cache import drop_table
+from src.pipeline.market_calendar import MarketCalendar
+from src.store.catalog import update_catalog
+from src.store.gaps import (compact_gaps, find_gaps, merge_backfill,
+                            record_attempts)
+
+logger = logging.getLogger(__name__)
+
+
+def plan_backfill(
+    db_path: Path,
+    ohlcv_table_id: str,
+    calendar: MarketCalendar,
+    start: date,
+    end: date,
+    limit_days: int | None,
+    conf: dict,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Gaps against the exchange calendar from start to end & the fewest
+    ranges to fetch them with
+    """
+    if start < calendar.covers_from:
+        logger.info(
+            f"Gaps checked from {calendar.covers_from}, the holidays before are not known"
+        )
+        start = calendar.covers_from
+    sessions = calendar.trading_days(start=start, end=end)
+
+    gaps = find_gaps(
+        conn=f"sqlite:///{db_path}",
+        ohlcv_table_id=ohlcv_table_id,
+        catalog=update_catalog(
+            db_path=db_path, ohlcv_table_id=ohlcv_table_id, conf=conf
+        ),
+        sessions=sessions,
+        conf=conf,
+    )
+    ranges = compact_gaps(gaps=gaps, sessions=sessions, limit_days=limit_days)
+    logger.info(
+        f"{gaps.shape[0]} missing bars of {gaps.get_column('symbol').n_unique()} symbols in {ranges.shape[0]} ranges"
+    )
+
+    return gaps, ranges
+
+
+def run_backfill(
+    db_path: Path,
+    ohlcv_table_id: str,
+    gaps: pl.DataFrame,
+    ranges: pl.DataFrame,
+    broker: Callable[[], BaseBroker],
+    conf: dict,
+) -> int:
+    """
+    Fetch the ranges into a staging table, merge the bars of the gaps & count
+    an attempt for those still missing. Returns the bars filled.
+    """
+    if ranges.is_empty():
+        return 0
+
+    conn = f"sqlite:///{db_path}"
+    staging_table_id = f"{ohlcv_table_id}_backfill"
+    drop_table(conn=conn, table_id=staging_table_id)
+
+    broker().fetch_ranges(ranges=ranges, insert_table_name=staging_table_id)
+    filled = merge_backfill(
+        conn=conn,
+        ohlcv_table_id=ohlcv_table_id,
+        staging_table_id=staging_table_id,
+        gaps=gaps,
+    )
+    record_attempts(
+        conn=conn,
+        ohlcv_table_id=ohlcv_table_id,
+        missing=gaps.join(filled, on=["symbol", "date"], how="anti"),
+    )
+    update_catalog(
+        db_path=db_path, ohlcv_table_id=ohlcv_table_id, conf=conf, rebuild=True
+    )
+
+    return filled.shape[0]
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from types import ModuleType
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _normalize(obj: object) -> object:
+    """
+    JSON round trip so enums, dates & int keys compare the way they are stored
+    """
+    return json.loads(json.dumps(obj, default=str))
+
+
+def _digest(obj: object) -> str:
+    payload = json.dumps(_normalize(obj), sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def hash_config(conf: dict) -> str:
+    """
+    Stable hash of a config dict, enum keys & values hash by their value
+    """
+    return _digest(conf)
+
+
+def hash_code(*modules: ModuleType) -> str:
+    """
+    Hash of the source of the modules a stage runs
+    """
+    sha = hashlib.sha256()
+    # a job run with python -m is __main__, hashed by its import name so the
+    # digest is the same when the pipeline imports it
+    names = {m: m.__spec__.name if m.__spec__ else m.__name__ for m in modules}
+    for module in sorted(modules, key=names.get):
+        sha.update(names[module].encode())
+        sha.update(Path(module.__file__).read_bytes())
+    return sha.hexdigest()
+
+
+def hash_file(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def sqlite_watermark(db_path: Path, table_id: str, before: str | None = None) -> dict:
+    """
+    Row count, timestamp range & sums of the numeric columns of a table,
+    changes whenever data is fetched or bars are replaced in place. before
+    limits it to the rows before that date.
+    """
+    conn = f"sqlite:///{db_path}"
+    # sqlite type affinity of the declared types
+    numeric = (
+        pl.read_database_uri(
+            query=f"select name, type from pragma_table_info('{table_id}')",
+            uri=conn,
+        )
+        .filter(
+            pl.col("type")
+            .str.to_uppercase()
+            .str.contains("INT|REAL|FLOA|DOUB|NUMERIC|DECIMAL")
+        )
+        .get_column("name")
+        .to_list()
+    )
+    sums = "".join(f", total({col}) as sum_{col}" for col in numeric)
+    query = f"""
+            select count(*) as n_rows,
+                min(timestamp) as min_timestamp,
+                max(timestamp) as max_timestamp{sums}
+            from {table_id}
+            """
+    if before is not None:
+        query += f"where timestamp < '{before}'"
+    return pl.read_database_uri(query=query, uri=conn).row(0, named=True)
+
+
+def has_table(conn: str, table_id: str) -> bool:
+    query = f"""
+            select count(*) as n_tables
+            from sqlite_master
+            where type = 'table' and name = '{table_id}'
+            """
+    return pl.read_database_uri(query=query, uri=conn).item(0, 0) > 0
+
+
+def drop_table(conn: str, table_id: str) -> None:
+    # sqlalchemy takes a while to import & only a rebuild needs it
+    from sqlalchemy import create_engine, text
+
+    with create_engine(conn).begin() as db_conn:
+        db_conn.execute(text(f"DROP TABLE IF EXISTS {table_id}"))
+
+
+def last_table_date(conn: str, table_id: str) -> date | None:
+    """
+    Last date in a table updated incrementally, None if it does not exist yet
+    """
+    if not has_table(conn=conn, table_id=table_id):
+        return None
+
+    query = f"""
+            select max(timestamp) as timestamp
+            from {table_id}
+            """
+    last_date = pl.read_database_uri(query=query, uri=conn).item(0, 0)
+    if last_date is None:
+        return None
+    return date.fromisoformat(str(last_date)[:10])
+
+
+class StageCache:
+    """
+    Manifest of a stage's input hashes kept next to its outputs. A stage whose
+    inputs match the manifest & whose outputs are all present is skipped.
+    """
+
+    def __init__(self, stage: str, out_dir: Path, force: bool = False):
+        self._stage = stage
+        self._out_dir = out_dir
+        self._force = force
+        self._manifest_path = out_dir / MANIFEST_FILE
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def read_manifest(self) -> dict | None:
+        if not self._manifest_path.exists():
+            return None
+        return json.loads(self._manifest_path.read_text())
+
+    def digest(self) -> str | None:
+        """
+        Digest of the recorded inputs, downstream stages use it as an input
+        """
+        manifest = self.read_manifest()
+        return None if manifest is None else manifest["digest"]
+
+    def is_fresh(self, inputs: dict) -> bool:
+        manifest = self.read_manifest()
+        if self._force or manifest is None:
+            return False
+
+        if manifest["digest"] != _digest(inputs):
+            changed = [
+                key
+                for key in inputs
+                if _digest(inputs[key]) != _digest(manifest["inputs"].get(key))
+            ]
+            self.logger.info(f"{self._stage}: inputs changed {changed}")
+            return False
+
+        missing = [f for f in manifest["outputs"] if not (self._out_dir / f).exists()]
+        if missing:
+            self.logger.info(f"{self._stage}: outputs missing {missing}")
+            return False
+
+        self.logger.info(
+            f"{self._stage}: inputs unchanged since {manifest['created_at']}, reusing outputs"
+        )
+        return True
+
+    def reset(self) -> None:
+        """
+        Clear stale outputs before the stage runs again
+        """
+        if self._out_dir.exists() and self._out_dir.is_dir():
+            self.logger.info(f"Deleting Directory: {self._out_dir}")
+            shutil.rmtree(self._out_dir)
+        self._out_dir.mkdir(parents=True)
+        self.logger.info(f"Creating Directory: {self._out_dir}")
+
+    def record(self, inputs: dict) -> None:
+        outputs = sorted(
+            str(path.relative_to(self._out_dir))
+            for path in self._out_dir.rglob("*")
+            if path.is_file() and path != self._manifest_path
+        )
+        manifest = {
+            "stage": self._stage,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "digest": _digest(inputs),
+            "inputs": _normalize(inputs),
+            "outputs": outputs,
+        }
+        self._manifest_path.write_text(json.dumps(manifest, indent=2))
+        self.logger.info(
+            f"{self._stage}: manifest recorded with {len(outputs)} outputs"
+        )
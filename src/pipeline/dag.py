@@ -0,0 +1,168 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Callable
+
+from src.pipeline.cache import StageCache
+from src.pipeline.metrics import bind_stage
+from src.pipeline.metrics import stage as metrics_stage
+
+logger = logging.getLogger(__name__)
+
+RAN = "ran"
+CACHED = "cached"
+FAILED = "failed"
+BLOCKED = "blocked"  # an upstream stage failed
+
+
+class Stage:
+    """
+    One node of a pipeline, run once its deps are done.
+
+    A stage with inputs is skipped while they, the runs of its upstream
+    stages & its outputs are unchanged since it last ran. inputs is called
+    once the deps are done, so it can read what they wrote. A stage without
+    inputs always runs, for stages that keep their own manifests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        deps: list[str] | None = None,
+        inputs: Callable[[], dict] | None = None,
+        outputs: list[Path] | None = None,
+    ):
+        self.name = name
+        self.func = func
+        self.deps = deps or []
+        self.inputs = inputs
+        self.outputs = outputs or []
+
+
+class Pipeline:
+    """
+    Stages run as a dependency graph, independent ones concurrently in
+    threads. A failed stage blocks its downstream stages only, the others
+    still run.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        state_dir: Path,
+        max_workers: int,
+        force: set[str] | None = None,
+    ):
+        self._stages = {s.name: s for s in stages}
+        self._state_dir = state_dir
+        self._max_workers = max_workers
+        self._force = force or set()
+
+        unknown = {
+            dep: s.name for s in stages for dep in s.deps if dep not in self._stages
+        }
+        if unknown:
+            raise ValueError(f"Unknown deps (dep: stage): {unknown}")
+        # raises CycleError on a cycle
+        TopologicalSorter({s.name: s.deps for s in stages}).prepare()
+
+    def upstream(self, names: list[str]) -> list[str]:
+        """
+        The stages & everything they depend on
+        """
+        res, todo = set(), list(names)
+        while todo:
+            name = todo.pop()
+            if name not in self._stages:
+                raise ValueError(f"Unknown stage {name}, one of {list(self._stages)}")
+            if name not in res:
+                res.add(name)
+                todo.extend(self._stages[name].deps)
+        return [name for name in self._stages if name in res]
+
+    def _cache(self, name: str) -> StageCache:
+        return StageCache(
+            stage=name, out_dir=self._state_dir / name, force=name in self._force
+        )
+
+    def _fingerprint(self, name: str) -> dict | None:
+        # the last run of a stage, a new run changes it
+        manifest = self._cache(name).read_manifest()
+        if manifest is None:
+            return None
+        return {"digest": manifest["digest"], "created_at": manifest["created_at"]}
+
+    def _run_stage(self, stage: Stage) -> str:
+        with metrics_stage(f"pipeline:{stage.name}") as m:
+            if stage.inputs is None:
+                stage.func()
+                return RAN
+
+            cache = self._cache(stage.name)
+            inputs = {
+                **stage.inputs(),
+                "upstream": {dep: self._fingerprint(dep) for dep in stage.deps},
+            }
+            missing = [str(p) for p in stage.outputs if not p.exists()]
+            if missing:
+                logger.info(f"{stage.name}: outputs missing {missing}")
+            elif cache.is_fresh(inputs):
+                m.extra["cached"] = True
+                return CACHED
+
+            cache.reset()
+            stage.func()
+            cache.record(inputs)
+            return RAN
+
+    def run(self, targets: list[str] | None = None) -> dict[str, str]:
+        """
+        Run the targets & their upstream stages, all stages by default.
+        Returns the status of each stage.
+        """
+        names = self.upstream(targets) if targets else list(self._stages)
+        sorter = TopologicalSorter({n: self._stages[n].deps for n in names})
+        sorter.prepare()
+
+        status = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    failed = [
+                        d
+                        for d in self._stages[name].deps
+                        if status[d] in [FAILED, BLOCKED]
+                    ]
+                    if failed:
+                        logger.warning(f"{name}: blocked by {failed}")
+                        status[name] = BLOCKED
+                        sorter.done(name)
+                        continue
+
+                    logger.info(f"######### Pipeline stage: {name} #########")
+                    future = executor.submit(
+                        bind_stage(self._run_stage), self._stages[name]
+                    )
+                    running[future] = (name, time.perf_counter())
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, start = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception:
+                        logger.exception(f"{name}: failed")
+                        status[name] = FAILED
+                    logger.info(
+                        f"{name}: {status[name]} in {time.perf_counter() - start:.1f}s"
+                    )
+                    sorter.done(name)
+
+        return status
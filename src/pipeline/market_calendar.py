@@ -0,0 +1,71 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from src.config.exchange import Exchange
+from src.config.schedule import HOLIDAYS, SESSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class MarketCalendar:
+    """
+    Trading days & session times of an exchange, weekends & the configured
+    holidays closed
+    """
+
+    def __init__(self, exchange: Exchange):
+        conf = SESSIONS[exchange]
+        self.exchange = exchange
+        self.tz = ZoneInfo(conf["time_zone"])
+        self._open = time.fromisoformat(conf["open"])
+        self._close = time.fromisoformat(conf["close"])
+        self.settle = timedelta(minutes=conf["settle_minutes"])
+        self._holidays = {date.fromisoformat(d) for d in HOLIDAYS[exchange]}
+        # days before the first holiday year are not reliable, holidays unknown
+        self.covers_from = date(min(self._holidays).year, 1, 1)
+
+        last_holiday = max(self._holidays)
+        if last_holiday.year < date.today().year:
+            logger.warning(
+                f"{exchange.value} holidays end in {last_holiday.year}, every weekday after is taken as trading"
+            )
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self._holidays
+
+    def next_trading_day(self, day: date) -> date:
+        """
+        day itself when it trades, else the first trading day after
+        """
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day: date) -> date:
+        """
+        Last trading day before day
+        """
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def trading_days(self, start: date, end: date) -> list[date]:
+        """
+        Trading days from start to end, both included
+        """
+        return [
+            start + timedelta(days=i)
+            for i in range((end - start).days + 1)
+            if self.is_trading_day(start + timedelta(days=i))
+        ]
+
+    def session_open(self, day: date) -> datetime:
+        return datetime.combine(day, self._open, tzinfo=self.tz)
+
+    def session_close(self, day: date) -> datetime:
+        return datetime.combine(day, self._close, tzinfo=self.tz)
+
+    def today(self) -> date:
+        return datetime.now(tz=self.tz).date()
@@ -0,0 +1,267 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# one run per process, the scanner's process pool workers each start their own
+_run: "RunMetrics | None" = None
+_local = threading.local()
+
+_api_lock = threading.Lock()
+# stages open in this context, outermost first, API calls count in each so
+# concurrent stages do not count each other's calls
+_api_stages: contextvars.ContextVar[tuple["StageMetrics", ...]] = (
+    contextvars.ContextVar("api_stages", default=())
+)
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def api_call(name: str):
+    """
+    Count calls & latency of an API function under name
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                latency = time.perf_counter() - start
+                with _api_lock:
+                    for m in _api_stages.get():
+                        m._api_latencies[name].append(latency)
+
+        return wrapper
+
+    return decorator
+
+
+def bind_stage(func):
+    """
+    func with the API calls it makes counted in the current stages, for
+    work submitted to threads, which start outside any stage
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def _api_summary(api_latencies: dict[str, list[float]]) -> dict[str, dict]:
+    with _api_lock:
+        return {
+            name: {
+                "calls": len(latencies),
+                "total_s": round(sum(latencies), 3),
+                "mean_s": round(sum(latencies) / len(latencies), 4),
+                "max_s": round(max(latencies), 4),
+            }
+            for name, latencies in api_latencies.items()
+        }
+
+
+class StageMetrics:
+    """
+    Wall & CPU time, peak RSS, rows and API calls of one stage, plus Polars
+    profiles of the frames collected through it when profiling is on. The
+    peak RSS is the process' high water mark, peak_rss_growth_mb how much
+    it rose during the stage.
+    """
+
+    def __init__(self, name: str, profile: bool = False):
+        self.name = name
+        self.rows_in: int | None = None
+        self.rows_out: int | None = None
+        self.extra: dict = {}
+        self._profile = profile
+        self._profiles: list[dict] = []
+        self._api_latencies: dict[str, list[float]] = defaultdict(list)
+
+    def __enter__(self):
+        self._started_at = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._rss = peak_rss_mb()
+        self._api_token = _api_stages.set((*_api_stages.get(), self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _api_stages.reset(self._api_token)
+        self.wall_s = round(time.perf_counter() - self._wall, 3)
+        # process wide, includes Polars & fetcher threads
+        self.cpu_s = round(time.process_time() - self._cpu, 3)
+        self.process_peak_rss_mb = peak_rss_mb()
+        self.peak_rss_growth_mb = (
+            None
+            if self._rss is None
+            else round(self.process_peak_rss_mb - self._rss, 1)
+        )
+        self.api_calls = _api_summary(self._api_latencies)
+        self.status = "failed" if exc_type else "ok"
+        return False
+
+    def collect(self, data: pl.LazyFrame) -> pl.DataFrame:
+        if not self._profile:
+            return data.collect()
+
+        res, profile = data.profile()
+        self._profiles.append(
+            profile.with_columns((pl.col("end") - pl.col("start")).alias("duration_us"))
+            .sort("duration_us", descending=True)
+            .to_dicts()
+        )
+        return res
+
+    def collect_all(self, data: list[pl.LazyFrame]) -> list[pl.DataFrame]:
+        if not self._profile:
+            return pl.collect_all(data)
+        # profiled one by one, shared subplans are not reused
+        return [self.collect(df) for df in data]
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "status": self.status,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "process_peak_rss_mb": self.process_peak_rss_mb,
+            "peak_rss_growth_mb": self.peak_rss_growth_mb,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "api_calls": self.api_calls,
+            "extra": self.extra,
+            "profiles": self._profiles,
+        }
+
+
+class RunMetrics:
+    """
+    Metrics of every stage of a run, written as JSON & Parquet under
+    <out_dir>/metrics, one pair of files per run so reruns are comparable
+    """
+
+    def __init__(self, out_dir: Path, profile: bool = False):
+        self._out_dir = out_dir / "metrics"
+        self._profile = profile
+        self._started_at = datetime.now()
+        self._lock = threading.Lock()
+        self.stages: list[StageMetrics] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = getattr(_local, "stack", [])
+        _local.stack = stack
+        with StageMetrics(name=name, profile=self._profile) as m:
+            stack.append(m)
+            try:
+                yield m
+            finally:
+                stack.pop()
+        with self._lock:
+            self.stages.append(m)
+        logger.debug(f"Stage {name}: {m.wall_s}s wall, {m.cpu_s}s cpu")
+
+    def write(self) -> Path:
+        self._out_dir.mkdir(parents=True, exist_ok=True)
+        stem = self._started_at.strftime("%Y%m%dT%H%M%S")
+        stages = [s.to_dict() for s in self.stages]
+
+        json_path = self._out_dir / f"{stem}.json"
+        json_path.write_text(
+            json.dumps(
+                {
+                    "started_at": self._started_at.isoformat(timespec="seconds"),
+                    "stages": stages,
+                },
+                indent=2,
+                default=str,
+            )
+        )
+
+        # flat table, nested api calls & profiles stay in the JSON
+        pl.DataFrame(
+            [
+                {
+                    **{k: v for k, v in s.items() if k not in ["profiles", "extra"]},
+                    "api_calls": sum(a["calls"] for a in s["api_calls"].values()),
+                    "api_total_s": sum(
+                        (a["total_s"] for a in s["api_calls"].values()), 0.0
+                    ),
+                }
+                for s in stages
+            ],
+            infer_schema_length=None,
+        ).with_columns(pl.lit(self._started_at).alias("run_started_at")).write_parquet(
+            self._out_dir / f"{stem}.parquet"
+        )
+
+        logger.info(f"Run metrics written: {json_path}")
+        return json_path
+
+
+def start_run(out_dir: Path, profile: bool = False) -> RunMetrics:
+    global _run
+    _run = RunMetrics(out_dir=out_dir, profile=profile)
+    return _run
+
+
+def current_run() -> RunMetrics | None:
+    return _run
+
+
+def end_run() -> Path | None:
+    global _run
+    if _run is None:
+        return None
+    path = _run.write()
+    _run = None
+    return path
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Stage of the current run, measured but not recorded when no run started
+    """
+    if _run is None:
+        with StageMetrics(name=name) as m:
+            yield m
+    else:
+        with _run.stage(name=name) as m:
+            yield m
+
+
+def current_stage() -> StageMetrics:
+    """
+    Innermost stage of this thread, a throwaway one outside any stage
+    """
+    stack = getattr(_local, "stack", [])
+    return stack[-1] if stack else StageMetrics(name="unstaged")
+
+
+def collect(data: pl.LazyFrame) -> pl.DataFrame:
+    """
+    Collect through the current stage, profiled when the run profiles
+    """
+    return current_stage().collect(data)
@@ -0,0 +1,112 @@
+import logging
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from src.pipeline.cache import has_table
+from src.pipeline.market_calendar import MarketCalendar
+
+logger = logging.getLogger(__name__)
+
+
+def local_bars_available(db_path: Path, table_id: str, day: date) -> bool:
+    """
+    Stand-in probe, whether a local table already has bars of day
+    """
+    conn = f"sqlite:///{db_path}"
+    if not db_path.exists() or not has_table(conn=conn, table_id=table_id):
+        return False
+
+    query = f"""
+            select count(*) as n_rows
+            from {table_id}
+            where timestamp >= '{day:%Y-%m-%d}'
+                and timestamp < '{day + timedelta(days=1):%Y-%m-%d}'
+            """
+    return pl.read_database_uri(query=query, uri=conn).item(0, 0) > 0
+
+
+class CloseScheduler:
+    """
+    Runs a job once per trading day, as soon as the day's bars are out:
+    warmup before the close, the probe polled from close + settle & run
+    when it passes. now & sleep are swappable for a simulated clock.
+    """
+
+    def __init__(
+        self,
+        calendar: MarketCalendar,
+        warmup: Callable[[date], None],
+        probe: Callable[[date], bool],
+        run: Callable[[date], None],
+        conf: dict,
+        now: Callable[[], datetime] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._calendar = calendar
+        self._warmup = warmup
+        self._probe = probe
+        self._run = run
+        self._conf = conf
+        self._now = now or (lambda: datetime.now(tz=calendar.tz))
+        self._sleep = sleep
+
+    def _wait_until(self, at: datetime) -> None:
+        while (remaining := (at - self._now()).total_seconds()) > 0:
+            self._sleep(min(remaining, self._conf["sleep_chunk_seconds"]))
+
+    def _available(self, day: date) -> bool:
+        try:
+            return self._probe(day)
+        except Exception as e:
+            logger.warning(f"Probe for {day} failed, retrying: {e}")
+            return False
+
+    def run_day(self, day: date) -> bool:
+        """
+        Warmup, wait for the bars of day & run. False when they did not come
+        before give up.
+        """
+        close = self._calendar.session_close(day)
+        warmup_at = close - timedelta(minutes=self._conf["warmup_minutes"])
+        deadline = close + timedelta(minutes=self._conf["give_up_minutes"])
+
+        logger.info(f"{day}: close at {close}, warming up at {warmup_at}")
+        self._wait_until(warmup_at)
+        try:
+            self._warmup(day)
+        except Exception:
+            # the run logs in & fetches on its own
+            logger.exception(f"{day}: warmup failed")
+
+        self._wait_until(close + self._calendar.settle)
+        while not self._available(day):
+            if self._now() >= deadline:
+                logger.warning(f"{day}: no bars by {deadline}, skipping the day")
+                return False
+            self._sleep(self._conf["poll_seconds"])
+
+        logger.info(f"{day}: bars available {self._now() - close} after the close")
+        start = time.perf_counter()
+        self._run(day)
+        logger.info(
+            f"{day}: results {self._now() - close} after the close, run took {time.perf_counter() - start:.1f}s"
+        )
+        return True
+
+    def serve(self, once: bool = False) -> None:
+        """
+        Every trading day from today, or only the next one when once
+        """
+        day = self._calendar.next_trading_day(self._now().date())
+        while True:
+            try:
+                self.run_day(day)
+            except Exception:
+                logger.exception(f"{day}: run failed, moving to the next day")
+            if once:
+                return
+            day = self._calendar.next_trading_day(day + timedelta(days=1))
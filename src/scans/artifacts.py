@@ -0,0 +1,66 @@
+import logging
+from pathlib import Path
+
+import polars as pl
+import polars.selectors as cs
+
+from src.config.artifacts import (ARTIFACT_COLUMNS, ARTIFACT_DTYPES,
+                                  ARTIFACT_SUFFIX)
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_path(out_dir: Path, name: str) -> Path:
+    return out_dir / f"{name}{ARTIFACT_SUFFIX}"
+
+
+def write_artifact(
+    data: pl.DataFrame | pl.LazyFrame,
+    out_dir: Path,
+    name: str,
+    csv_flag: bool = False,
+    columns: cs.Selector | None = None,
+) -> Path:
+    """
+    Write a run artifact as uncompressed Arrow IPC with the artifact's columns
+    & dtypes, so readers can memory map it. Lazy frames are sunk with the
+    streaming engine. CSV copy only when asked for.
+    """
+    path = artifact_path(out_dir=out_dir, name=name)
+    if columns is None:
+        columns = ARTIFACT_COLUMNS.get(name, cs.all())
+
+    res = data.lazy().select(columns)
+    res = res.with_columns(
+        pl.col(col).cast(dtype)
+        for col, dtype in ARTIFACT_DTYPES.items()
+        if col in res.collect_schema().names()
+    )
+
+    if isinstance(data, pl.LazyFrame):
+        res.sink_ipc(path, compression="uncompressed", engine="streaming")
+    else:
+        res.collect().write_ipc(path, compression="uncompressed")
+
+    logger.debug(f"Artifact written: {path}")
+
+    if csv_flag:
+        read_artifact(out_dir=out_dir, name=name).select(~cs.nested()).write_csv(
+            path.with_suffix(".csv")
+        )
+        logger.debug(f"CSV exported: {path.with_suffix('.csv')}")
+
+    return path
+
+
+def read_artifact(out_dir: Path, name: str) -> pl.DataFrame:
+    """
+    Memory mapped, zero copy read of a run artifact
+    """
+    return pl.read_ipc(
+        artifact_path(out_dir=out_dir, name=name), memory_map=True, rechunk=False
+    )
+
+
+def scan_artifact(out_dir: Path, name: str) -> pl.LazyFrame:
+    return pl.scan_ipc(artifact_path(out_dir=out_dir, name=name), memory_map=True)
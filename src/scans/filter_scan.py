@@ -1,5 +1,6 @@
 import logging
 from datetime import datetime
+from functools import reduce
 
 import polars as pl
 import polars.selectors as cs
@@ -161,89 +162,144 @@ def pullback_filter(
     return res
 
 
-# def vcp_filter(data: pl.DataFrame, end_date: datetime, conf: dict) -> pl.DataFrame:
-#     """ """
+def vcp_filter(data: pl.LazyFrame, end_date: datetime, conf: dict) -> pl.DataFrame:
+    """
+    Volatility Contraction Pattern: successive shallower pullbacks inside a
+    base near the 52 week high, ending in a tight pivot on drying volume
+    """
 
-#     df = add_basic_indicators(data=data)
+    df = add_basic_indicators(data=data)
 
-#     timeframe = conf["timeframe"]
-#     volume_timeframe = conf["volume_timeframe"]
-#     pivot_length = conf["pivot_length"]
-#     pivot_width_limit_pct = conf["pivot_width_limit_pct"]
-#     base_lower_limit_pct = conf["base_lower_limit_pct"]
+    timeframe = conf["timeframe"]
+    volume_timeframe = conf["volume_timeframe"]
+    pivot_length = conf["pivot_length"]
+    pivot_width_limit_pct = conf["pivot_width_limit_pct"]
+    base_lower_limit_pct = conf["base_lower_limit_pct"]
+    contractions = conf["contractions"]
+    contraction_length = conf["contraction_length"]
+
+    volume_sma_col = f"volume_sma_{volume_timeframe}"
+    if volume_sma_col not in df.collect_schema().names():
+        df = df.with_columns(
+            pl.col("volume")
+            .rolling_mean(window_size=volume_timeframe)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias(volume_sma_col)
+        )
 
-#     res = (
-#         df.lazy()
-#         .with_columns(
-#             # 52 week high calculation
-#             pl.col("close")
-#             .rolling_max(window_size=timeframe)
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias("52_week_high"),
-#             # volume sma calculation
-#             pl.col("volume")
-#             .rolling_mean(window_size=volume_timeframe)
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias(f"volume_sma_{volume_timeframe}"),
-#             # pivot high calculation
-#             pl.col("high")
-#             .rolling_max(window_size=pivot_length)
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias("pivot_high"),
-#             # pivot low calculation
-#             pl.col("low")
-#             .rolling_min(window_size=pivot_length)
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias("pivot_low"),
-#             # pivot start high
-#             pl.col("high")
-#             .shift(pivot_length - 1)
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias("pivot_start_high"),
-#         )
-#         .with_columns(
-#             # pivot width
-#             ((pl.col("pivot_high") - pl.col("pivot_low")) * 100 / pl.col("close"))
-#             .round(4)
-#             .alias("pivot_width")
-#         )
-#         .with_columns(
-#             # find pivot
-#             (
-#                 (pl.col("pivot_width") < pivot_width_limit_pct)
-#                 & (pl.col("pivot_high") == pl.col("pivot_start_high"))
-#             ).alias("is_pivot"),
-#             # volume dry up
-#             pl.all_horizontal(
-#                 [
-#                     pl.col("volume").shift(i)
-#                     < pl.col(f"volume_sma_{volume_timeframe}").shift(i)
-#                     for i in range(pivot_length)
-#                 ]
-#             )
-#             .over(partition_by="symbol", order_by="timestamp", descending=False)
-#             .alias("vol_dry_up"),
-#             # near 52 week high
-#             (
-#                 (pl.col("close") < pl.col("52_week_high"))
-#                 & (
-#                     pl.col("close")
-#                     > ((base_lower_limit_pct / 100) * pl.col("52_week_high"))
-#                 )
-#             ).alias("near_high"),
-#         )
-#         .filter(
-#             pl.col("near_high")
-#             & pl.col("is_pivot")
-#             & pl.col("vol_dry_up")
-#             & (pl.col("timestamp") == end_date)
-#         )
-#         .sort(["adr_pct_20", "rvol_pct"], descending=[True, False])
-#         .with_row_index(name="rank", offset=1)
-#         .collect()
-#     )
+    # most recent contraction first, each must be shallower than the one before it
+    contracting_expr = reduce(
+        lambda a, b: a & b,
+        [pl.col("pivot_width") < pl.col("contraction_depth_1")]
+        + [
+            pl.col(f"contraction_depth_{k}") < pl.col(f"contraction_depth_{k + 1}")
+            for k in range(1, contractions)
+        ],
+    )
 
-#     return res
+    res = (
+        df.lazy()
+        .with_columns(
+            # 52 week high calculation
+            pl.col("close")
+            .rolling_max(window_size=timeframe)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias("52_week_high"),
+            # pivot high calculation
+            pl.col("high")
+            .rolling_max(window_size=pivot_length)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias("pivot_high"),
+            # pivot low calculation
+            pl.col("low")
+            .rolling_min(window_size=pivot_length)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias("pivot_low"),
+            # pivot start high
+            pl.col("high")
+            .shift(pivot_length - 1)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias("pivot_start_high"),
+            # pullback depth over a contraction window
+            (
+                (
+                    pl.col("high").rolling_max(window_size=contraction_length)
+                    - pl.col("low").rolling_min(window_size=contraction_length)
+                )
+                * 100
+                / pl.col("high").rolling_max(window_size=contraction_length)
+            )
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .round(2)
+            .alias("pullback_depth"),
+            # volume below average, run length is counted below
+            (pl.col("volume") < pl.col(volume_sma_col))
+            .fill_null(False)
+            .alias("vol_below_avg"),
+        )
+        .with_columns(
+            # pivot width
+            ((pl.col("pivot_high") - pl.col("pivot_low")) * 100 / pl.col("close"))
+            .round(4)
+            .alias("pivot_width"),
+            # every bar at or above average volume starts a new dry up run
+            (~pl.col("vol_below_avg"))
+            .cum_sum()
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias("vol_run_id"),
+            # contraction windows placed back to back before the pivot
+            *[
+                pl.col("pullback_depth")
+                .shift(pivot_length + (k - 1) * contraction_length)
+                .over(partition_by="symbol", order_by="timestamp", descending=False)
+                .alias(f"contraction_depth_{k}")
+                for k in range(1, contractions + 1)
+            ],
+        )
+        .with_columns(
+            # consecutive below average volume days ending at each bar
+            pl.col("vol_below_avg")
+            .cast(pl.Int32())
+            .cum_sum()
+            .over(
+                partition_by=["symbol", "vol_run_id"],
+                order_by="timestamp",
+                descending=False,
+            )
+            .alias("vol_dry_up_days")
+        )
+        .with_columns(
+            # find pivot
+            (
+                (pl.col("pivot_width") < pivot_width_limit_pct)
+                & (pl.col("pivot_high") == pl.col("pivot_start_high"))
+            ).alias("is_pivot"),
+            # volume dry up through the whole pivot
+            (pl.col("vol_dry_up_days") >= pivot_length).alias("vol_dry_up"),
+            # near 52 week high
+            (
+                (pl.col("close") < pl.col("52_week_high"))
+                & (
+                    pl.col("close")
+                    > ((base_lower_limit_pct / 100) * pl.col("52_week_high"))
+                )
+            ).alias("near_high"),
+            contracting_expr.fill_null(False).alias("is_contracting"),
+        )
+        .filter(
+            pl.col("near_high")
+            & pl.col("is_pivot")
+            & pl.col("vol_dry_up")
+            & pl.col("is_contracting")
+            & (pl.col("timestamp") == end_date)
+        )
+        .sort(["adr_pct_20", "rvol_pct"], descending=[True, False])
+        .with_row_index(name="rank", offset=1)
+        .select(pl.exclude("pullback_depth", "vol_below_avg", "vol_run_id"))
+        .collect()
+    )
+
+    return res
 
 
 def sma_200_filter(data: pl.DataFrame, end_date: datetime) -> pl.DataFrame:
@@ -322,39 +378,146 @@ def sma_200_filter(data: pl.DataFrame, end_date: datetime) -> pl.DataFrame:
 #     return res
 
 
-# def insider_bars_filter(
-#     data: pl.LazyFrame, end_date: datetime, conf: dict
-# ) -> pl.DataFrame:
-#     def _contraction_valid_expr(L: int):
-#         return (pl.col("high").rolling_max(L - 1) <= pl.col("high").shift(L - 1)) & (
-#             pl.col("low").rolling_min(L - 1) >= pl.col("low").shift(L - 1)
-#         )
+def _contraction_scan(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Mother bars & the range of the inside bars so far, data sorted by symbol &
+    timestamp. A bar inside the running mother extends the contraction, any
+    other bar becomes the new mother, so each bar depends on the one before it
+    & is found in one pass.
+    """
+    is_mother, inside_high, inside_low = [], [], []
+    prev_symbol = m_high = m_low = i_high = i_low = None
+    for symbol, high, low in df.select("symbol", "high", "low").iter_rows():
+        inside = (
+            symbol == prev_symbol
+            and None not in (high, low, m_high, m_low)
+            and high <= m_high
+            and low >= m_low
+        )
+        if inside:
+            i_high = high if i_high is None else max(i_high, high)
+            i_low = low if i_low is None else min(i_low, low)
+        else:
+            m_high, m_low, i_high, i_low = high, low, None, None
+        is_mother.append(not inside)
+        inside_high.append(i_high)
+        inside_low.append(i_low)
+        prev_symbol = symbol
+
+    return pl.DataFrame(
+        {"_mother": is_mother, "inside_high": inside_high, "inside_low": inside_low},
+        schema={
+            "_mother": pl.Boolean(),
+            "inside_high": df.schema["high"],
+            "inside_low": df.schema["low"],
+        },
+    )
 
-#     MIN_L = conf["min_pivot_length"]
-#     MAX_L = conf["max_pivot_length"]
 
-#     df = add_basic_indicators(data)
-#     res = (
-#         df.lazy()
-#         .with_columns(
-#             [
-#                 pl.when(_contraction_valid_expr(L))
-#                 .then(pl.lit(L))
-#                 .otherwise(None)
-#                 .alias(f"pivot_len_{L}")
-#                 for L in range(MIN_L, MAX_L + 1)
-#             ]
-#         )
-#         .with_columns(
-#             pl.max_horizontal(
-#                 [pl.col(f"pivot_len_{L}") for L in range(MIN_L, MAX_L + 1)]
-#             ).alias("max_pivot_length")
-#         )
-#         .filter(
-#             (pl.col("max_pivot_length") >= MIN_L) & (pl.col("timestamp") == end_date)
-#         )
-#         .select("symbol", "max_pivot_length", "adr_pct_20", "rvol_pct")
-#         .collect()
-#     )
+def _inside_bar_contraction(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Longest inside bar contraction ending at each bar, data sorted by symbol &
+    timestamp. The running mother is always the earliest bar all the later
+    ones sit inside, so its run is the longest contraction.
+    """
+    return (
+        pl.concat([df, _contraction_scan(df=df)], how="horizontal")
+        .with_columns(
+            pl.when("_mother")
+            .then(pl.int_range(pl.len()))
+            .forward_fill()
+            .alias("_mother_idx")
+        )
+        .with_columns(
+            (pl.int_range(pl.len()) - pl.col("_mother_idx") + 1)
+            .cast(pl.Int32())
+            .alias("contraction_length"),
+            pl.col("high").gather("_mother_idx").alias("mother_high"),
+            pl.col("low").gather("_mother_idx").alias("mother_low"),
+        )
+        .drop("_mother", "_mother_idx")
+    )
 
-#     return res
+
+def inside_bars_filter(
+    data: pl.LazyFrame, end_date: datetime, conf: dict
+) -> pl.DataFrame:
+    """
+    Inside bar / NR contraction: bars holding inside the range of a mother bar,
+    contraction length counts the mother bar & is reported as is, bases longer
+    than max_pivot_length are filtered out & logged
+    """
+
+    MIN_L = conf["min_pivot_length"]
+    MAX_L = conf["max_pivot_length"]
+
+    df = add_basic_indicators(data=data).sort(["symbol", "timestamp"]).collect()
+
+    df = _inside_bar_contraction(df=df).filter(
+        (pl.col("contraction_length") >= MIN_L) & (pl.col("timestamp") == end_date)
+    )
+    n_long = df.filter(pl.col("contraction_length") > MAX_L).height
+    if n_long:
+        logger.info(f"Inside bars: {n_long} bases longer than {MAX_L} bars dropped")
+
+    res = (
+        df.lazy()
+        .with_columns(
+            # mother bar range
+            ((pl.col("mother_high") / pl.col("mother_low") - 1) * 100)
+            .round(2)
+            .alias("mother_range_pct"),
+            # share of mother range used by the inside bars
+            (
+                (pl.col("inside_high") - pl.col("inside_low"))
+                * 100
+                / (pl.col("mother_high") - pl.col("mother_low"))
+            )
+            .round(2)
+            .alias("contraction_depth_pct"),
+        )
+        .filter(pl.col("contraction_length") <= MAX_L)
+        .sort(["adr_pct_20", "rvol_pct"], descending=[True, False])
+        .with_row_index(name="rank", offset=1)
+        .select(
+            "rank",
+            "timestamp",
+            "symbol",
+            "contraction_length",
+            "mother_high",
+            "mother_low",
+            "mother_range_pct",
+            "contraction_depth_pct",
+            "adr_pct_20",
+            "rvol_pct",
+        )
+        .collect()
+    )
+
+    return res
+
+
+def run_filters(
+    data: pl.LazyFrame | pl.DataFrame,
+    end_date: datetime,
+    adr_cutoff: float,
+    conf: dict,
+) -> dict[str, pl.DataFrame]:
+    """
+    Run every configured filter on the data, keyed by filter name
+    """
+    res = {
+        "sma_200": sma_200_filter(data=data, end_date=end_date),
+        "adr": adr_filter(data=data, adr_cutoff=adr_cutoff, end_date=end_date),
+        "pullback": pullback_filter(
+            data=data, end_date=end_date, conf=conf["pullback"]
+        ),
+        "vcp": vcp_filter(data=data, end_date=end_date, conf=conf["vcp"]),
+    }
+
+    if "inside_bars" in conf:
+        res["inside_bars"] = inside_bars_filter(
+            data=data, end_date=end_date, conf=conf["inside_bars"]
+        )
+
+    return res
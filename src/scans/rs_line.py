@@ -0,0 +1,115 @@
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.store.adjustments import read_adjusted
+from src.utils import bars_to_calendar_days
+
+logger = logging.getLogger(__name__)
+
+
+def read_benchmark(db_path: Path, table_id: str, symbol: str) -> pl.DataFrame:
+    query = f"""
+            select timestamp, close
+            from {table_id}
+            where symbol = '{symbol}'
+            """
+    return (
+        pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}")
+        .select(
+            pl.col("timestamp").cast(pl.Date()),
+            pl.col("close").alias("benchmark_close"),
+        )
+        .unique("timestamp", keep="last")
+        .sort("timestamp")
+    )
+
+
+def read_rs_line_bars(
+    db_path: Path, table_id: str, end_date: datetime, conf: dict
+) -> pl.DataFrame:
+    """
+    Adjusted close & high of every symbol over the new high window up to
+    end_date, the whole universe & not only the scan list
+    """
+    start = end_date - timedelta(days=bars_to_calendar_days(conf["new_high_window"]))
+    query = f"""
+            select symbol, timestamp, close, high
+            from {table_id}
+            where timestamp >= '{start:%Y-%m-%d}'
+            """
+    return read_adjusted(
+        query=query, conn=f"sqlite:///{db_path}", ohlcv_table_id=table_id
+    )
+
+
+def add_rs_line(
+    data: pl.LazyFrame, benchmark: pl.LazyFrame, conf: dict
+) -> pl.LazyFrame:
+    """
+    RS line, stock close over benchmark close. Each bar takes the latest
+    benchmark bar at or before it (as-of join), so a holiday on the index
+    side does not drop stock bars. rs_new_high marks a new high of the line
+    over the window, rs_new_high_before_price one made while price is still
+    below its own high over the same window.
+    """
+    n = conf["new_high_window"]
+
+    return (
+        data.lazy()
+        .with_columns(pl.col("timestamp").cast(pl.Date()))
+        .sort("timestamp")
+        .join_asof(benchmark.lazy(), on="timestamp", strategy="backward")
+        .with_columns(
+            (pl.col("close") / pl.col("benchmark_close") * 100)
+            .round(4)
+            .alias("rs_line")
+        )
+        .with_columns(
+            pl.col("rs_line")
+            .rolling_max(window_size=n, min_samples=1)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias(f"rs_line_high_{n}"),
+            pl.col("high")
+            .rolling_max(window_size=n, min_samples=1)
+            .over(partition_by="symbol", order_by="timestamp", descending=False)
+            .alias(f"price_high_{n}"),
+        )
+        .with_columns(
+            (pl.col("rs_line") >= pl.col(f"rs_line_high_{n}")).alias("rs_new_high")
+        )
+        .with_columns(
+            (
+                pl.col("rs_new_high") & (pl.col("high") < pl.col(f"price_high_{n}"))
+            ).alias("rs_new_high_before_price")
+        )
+    )
+
+
+def rs_line_filter(
+    data: pl.DataFrame, benchmark: pl.DataFrame, end_date, conf: dict
+) -> pl.DataFrame:
+    """
+    RS line of every symbol on end_date, new RS highs first
+    """
+    return (
+        add_rs_line(data=data, benchmark=benchmark, conf=conf)
+        .filter(pl.col("timestamp") == end_date)
+        .select(
+            "timestamp",
+            "symbol",
+            "close",
+            "benchmark_close",
+            "rs_line",
+            f"rs_line_high_{conf['new_high_window']}",
+            "rs_new_high",
+            "rs_new_high_before_price",
+        )
+        .sort(
+            ["rs_new_high_before_price", "rs_new_high", "symbol"],
+            descending=[True, True, False],
+        )
+        .collect()
+    )
@@ -0,0 +1,137 @@
+import logging
+from datetime import date, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.pipeline.cache import drop_table, last_table_date
+from src.pipeline.metrics import collect
+from src.store.adjustments import read_adjusted
+from src.utils import bars_to_calendar_days
+
+logger = logging.getLogger(__name__)
+
+
+def rs_score(data: pl.LazyFrame, conf: dict) -> pl.LazyFrame:
+    """
+    Weighted sum of the 3/6/9/12 month returns of each symbol. A symbol with
+    less history than the longest lookback is scored on the returns it has,
+    weights renormalised, as long as it has min_lookback bars.
+    """
+    weights = conf["return_weights"]
+
+    res = (
+        data.lazy()
+        .with_columns(pl.col("timestamp").cast(pl.Date()))
+        .with_columns(
+            (
+                pl.col("close")
+                / pl.col("close")
+                .shift(n)
+                .over(partition_by="symbol", order_by="timestamp", descending=False)
+                - 1
+            ).alias(f"rtr_{n}")
+            for n in weights
+        )
+    )
+
+    weighted_sum = pl.sum_horizontal(
+        pl.col(f"rtr_{n}") * weight for n, weight in weights.items()
+    )
+    weight_sum = pl.sum_horizontal(
+        pl.col(f"rtr_{n}").is_not_null() * weight for n, weight in weights.items()
+    )
+
+    return res.with_columns(
+        pl.when(pl.col(f"rtr_{conf['min_lookback']}").is_not_null())
+        .then(weighted_sum / weight_sum)
+        .otherwise(None)
+        .alias("rs_score")
+    ).select("timestamp", "symbol", "rs_score")
+
+
+def rs_rank(data: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Cross sectional 1-99 percentile of rs_score per timestamp
+    """
+    n = pl.col("rs_score").count().over("timestamp")
+    pct = (pl.col("rs_score").rank(method="average").over("timestamp") - 1) / (n - 1)
+
+    return data.with_columns(
+        pl.when(n > 1)
+        .then((1 + 98 * pct).round(0))
+        .otherwise(99)
+        .cast(pl.Int32())
+        .alias("rs_rating")
+    ).filter(pl.col("rs_score").is_not_null())
+
+
+def _lookback_start(last_date: date, conf: dict) -> date:
+    max_bars = max(conf["return_weights"])
+    return last_date - timedelta(days=bars_to_calendar_days(max_bars))
+
+
+def update_rs_ratings(
+    db_path: Path,
+    ohlcv_table_id: str,
+    rs_table_id: str,
+    conf: dict,
+    rebuild: bool = False,
+) -> int:
+    """
+    Rate every date after the last rated one. Only the bars needed for the
+    longest lookback before that date are read. rebuild re-rates all dates,
+    needed after past OHLCV has been corrected.
+    """
+    conn = f"sqlite:///{db_path}"
+
+    last_date = None if rebuild else last_table_date(conn=conn, table_id=rs_table_id)
+    if rebuild:
+        drop_table(conn=conn, table_id=rs_table_id)
+
+    query = f"""
+            select symbol, timestamp, close
+            from {ohlcv_table_id}
+            """
+    if last_date is not None:
+        query += (
+            f"where timestamp >= '{_lookback_start(last_date=last_date, conf=conf)}'"
+        )
+
+    res = rs_rank(
+        rs_score(
+            data=read_adjusted(
+                query=query, conn=conn, ohlcv_table_id=ohlcv_table_id
+            ).lazy(),
+            conf=conf,
+        )
+    )
+    if last_date is not None:
+        res = res.filter(pl.col("timestamp") > last_date)
+    res = collect(res.sort("timestamp", "symbol"))
+
+    if res.is_empty():
+        logger.info(f"RS ratings up to date till {last_date}")
+        return 0
+
+    res.with_columns(pl.col("timestamp").cast(pl.String())).write_database(
+        table_name=rs_table_id, connection=conn, if_table_exists="append"
+    )
+    logger.info(
+        f"RS ratings: {res.shape[0]} rows for {res.get_column('timestamp').n_unique()} dates after {last_date}"
+    )
+
+    return res.shape[0]
+
+
+def read_rs_ratings(
+    db_path: Path, rs_table_id: str, start_date: str, end_date: str
+) -> pl.DataFrame:
+    query = f"""
+            select timestamp, symbol, rs_score, rs_rating
+            from {rs_table_id}
+            where timestamp between '{start_date}' and '{end_date}'
+            """
+    return pl.read_database_uri(query=query, uri=f"sqlite:///{db_path}").with_columns(
+        pl.col("timestamp").str.to_date()
+    )
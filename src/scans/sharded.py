@@ -0,0 +1,138 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+from src.scans.filter_scan import run_filters
+
+logger = logging.getLogger(__name__)
+
+RANK_BY = ["adr_pct_20", "rvol_pct"]
+RANK_DESCENDING = [True, False]
+
+
+@contextmanager
+def process_pool(max_workers: int):
+    """
+    Spawned process pool with the Polars thread pool of every worker sized to
+    its share of the cores, so K workers do not each start one thread per core
+    """
+    threads = max(1, (os.cpu_count() or 1) // max_workers)
+    prev_threads = os.environ.get("POLARS_MAX_THREADS")
+    os.environ["POLARS_MAX_THREADS"] = str(threads)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            yield executor
+    finally:
+        if prev_threads is None:
+            os.environ.pop("POLARS_MAX_THREADS", None)
+        else:
+            os.environ["POLARS_MAX_THREADS"] = prev_threads
+
+
+def shard_frame(data: pl.DataFrame, out_dir: Path, n_shards: int) -> list[Path]:
+    """
+    Split the frame by symbol hash into n_shards parquet files
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = data.with_columns(
+        (pl.col("symbol").hash(seed=0) % n_shards).alias("shard")
+    ).partition_by("shard", as_dict=True, include_key=False)
+
+    paths = []
+    for (shard,), df in shards.items():
+        path = out_dir / f"shard_{shard:04d}.parquet"
+        df.write_parquet(path)
+        paths.append(path)
+
+    logger.info(f"Split {data.shape[0]} rows into {len(paths)} shards")
+
+    return sorted(paths)
+
+
+def merge_ranked(dfs: list[pl.DataFrame]) -> pl.DataFrame:
+    """
+    Merge per shard filter results and rank them again over the universe
+    """
+    dfs = [df for df in dfs if df.shape[0] > 0] or dfs[:1]
+
+    return (
+        pl.concat(dfs, how="vertical_relaxed")
+        .drop("rank")
+        .sort(RANK_BY, descending=RANK_DESCENDING)
+        .with_row_index(name="rank", offset=1)
+    )
+
+
+def _filter_shard(
+    shard_path: Path,
+    out_dir: Path,
+    end_date: datetime,
+    adr_cutoff: float,
+    filters_conf: dict,
+) -> dict[str, Path]:
+    data = pl.read_parquet(shard_path)
+    res = run_filters(
+        data=data, end_date=end_date, adr_cutoff=adr_cutoff, conf=filters_conf
+    )
+
+    paths = {}
+    for name, df in res.items():
+        path = out_dir / name / shard_path.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.write_parquet(path)
+        paths[name] = path
+
+    return paths
+
+
+def run_sharded_filters(
+    data: pl.DataFrame,
+    work_dir: Path,
+    end_date: datetime,
+    adr_cutoff: float,
+    filters_conf: dict,
+    n_shards: int,
+    max_workers: int,
+) -> dict[str, pl.DataFrame]:
+    """
+    Run every filter over symbol hash shards in a process pool & merge the
+    ranked outputs
+    """
+    if data.shape[0] == 0:
+        return run_filters(
+            data=data, end_date=end_date, adr_cutoff=adr_cutoff, conf=filters_conf
+        )
+
+    shard_paths = shard_frame(
+        data=data, out_dir=work_dir / "filter_shards", n_shards=n_shards
+    )
+    out_dir = work_dir / "filter_results"
+
+    with process_pool(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _filter_shard, path, out_dir, end_date, adr_cutoff, filters_conf
+            )
+            for path in shard_paths
+        ]
+        shard_results = [future.result() for future in futures]
+
+    res = {
+        name: merge_ranked([pl.read_parquet(paths[name]) for paths in shard_results])
+        for name in shard_results[0]
+    }
+
+    logger.info(f"Merged filter results from {len(shard_paths)} shards")
+
+    return res
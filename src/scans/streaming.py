@@ -0,0 +1,164 @@
+import logging
+import math
+from pathlib import Path
+
+import polars as pl
+
+from src.scans.sharded import process_pool
+from src.scans.swing_scan import prep_scan_frame
+from src.store.adjustments import adjust_ohlcv, read_adjustments
+
+logger = logging.getLogger(__name__)
+
+
+def _symbols_in_clause(symbols: list[str]) -> str:
+    # a quote inside a symbol is doubled, as SQL escapes it
+    return ", ".join("'" + s.replace("'", "''") + "'" for s in symbols)
+
+
+def plan_buckets(conn: str, table_id: str, conf: dict) -> int:
+    """
+    Number of symbol buckets needed so one bucket with all indicator columns
+    fits inside the memory budget
+    """
+    query = f"""
+            select count(*) as n_rows
+            from {table_id}
+            """
+    n_rows = pl.read_database_uri(query=query, uri=conn).item(0, 0)
+
+    budget_bytes = conf["memory_budget_mb"] * 1024 * 1024
+    n_buckets = max(1, math.ceil(n_rows * conf["bytes_per_row"] / budget_bytes))
+
+    logger.info(
+        f"Rows: {n_rows} | Memory Budget: {conf['memory_budget_mb']} MB | Buckets: {n_buckets}"
+    )
+
+    return n_buckets
+
+
+def export_ohlcv(conn: str, table_id: str, out_dir: Path, n_buckets: int) -> Path:
+    """
+    Copy the OHLCV table to parquet, one file per symbol bucket, so that no
+    more than one bucket is ever held in memory
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    query = f"""
+            select distinct symbol
+            from {table_id}
+            """
+    buckets = (
+        pl.read_database_uri(query=query, uri=conn)
+        .with_columns((pl.col("symbol").hash(seed=0) % n_buckets).alias("bucket"))
+        .partition_by("bucket", as_dict=True, include_key=False)
+    )
+
+    adjustments = read_adjustments(conn=conn, ohlcv_table_id=table_id)
+    for (bucket,), symbols_df in buckets.items():
+        query = f"""
+                select *
+                from {table_id}
+                where symbol in ({_symbols_in_clause(symbols_df.get_column("symbol").to_list())})
+                """
+        adjust_ohlcv(
+            data=pl.read_database_uri(query=query, uri=conn), adjustments=adjustments
+        ).write_parquet(out_dir / f"bucket_{bucket:04d}.parquet")
+        logger.debug(f"Exported bucket {bucket} with {symbols_df.shape[0]} symbols")
+
+    logger.info(f"Exported {table_id} to {out_dir} in {len(buckets)} buckets")
+
+    return out_dir
+
+
+def _prep_bucket(
+    bucket_path: Path, out_path: Path, lookback_min_gains_dict: dict, chunk_size: int
+) -> Path:
+    # scoped here as the pool workers do not share the config of the parent
+    with pl.Config(streaming_chunk_size=chunk_size):
+        prep_scan_frame(
+            data=pl.scan_parquet(bucket_path),
+            lookback_min_gains_dict=lookback_min_gains_dict,
+        ).sink_parquet(out_path, engine="streaming")
+    logger.debug(f"Prepared scan data for {bucket_path.name}")
+
+    return out_path
+
+
+def stream_prep_scan_data(
+    conn: str,
+    table_id: str,
+    lookback_min_gains_dict: dict,
+    work_dir: Path,
+    conf: dict,
+    max_workers: int = 1,
+) -> pl.LazyFrame:
+    """
+    Streaming counterpart of prep_scan_data.
+
+    Windows over symbol need every row of a symbol together, so the universe is
+    split into symbol buckets sized by the memory budget. Each bucket is scanned
+    from file and sunk to parquet with the streaming engine, peak memory is
+    bounded by one bucket whatever the size of the universe.
+
+    With max_workers > 1 the buckets double as shards and are prepared in a
+    process pool, there are at least as many buckets as workers.
+    """
+    source_dir = work_dir / "ohlcv"
+    scan_data_dir = work_dir / "scan_data"
+    scan_data_dir.mkdir(parents=True, exist_ok=True)
+
+    n_buckets = max(plan_buckets(conn=conn, table_id=table_id, conf=conf), max_workers)
+    export_ohlcv(conn=conn, table_id=table_id, out_dir=source_dir, n_buckets=n_buckets)
+
+    bucket_paths = sorted(source_dir.glob("*.parquet"))
+
+    if max_workers > 1:
+        with process_pool(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _prep_bucket,
+                    bucket_path,
+                    scan_data_dir / bucket_path.name,
+                    lookback_min_gains_dict,
+                    conf["chunk_size"],
+                )
+                for bucket_path in bucket_paths
+            ]
+            for future in futures:
+                future.result()
+    else:
+        for bucket_path in bucket_paths:
+            _prep_bucket(
+                bucket_path=bucket_path,
+                out_path=scan_data_dir / bucket_path.name,
+                lookback_min_gains_dict=lookback_min_gains_dict,
+                chunk_size=conf["chunk_size"],
+            )
+
+    return pl.scan_parquet(scan_data_dir / "*.parquet")
+
+
+def read_bucketed(
+    conn: str, table_id: str, work_dir: Path, symbols: list[str], conf: dict
+) -> pl.DataFrame:
+    """
+    Adjusted bars of the symbols from the symbol buckets the streaming swing
+    prep exported, exported again when missing. The scan pushes the symbol
+    filter down, so only the rows of the scan list are read & held in memory,
+    the scan list being a small share of the universe.
+    """
+    source_dir = work_dir / "ohlcv"
+    if not any(source_dir.glob("*.parquet")):
+        export_ohlcv(
+            conn=conn,
+            table_id=table_id,
+            out_dir=source_dir,
+            n_buckets=plan_buckets(conn=conn, table_id=table_id, conf=conf),
+        )
+
+    return (
+        pl.scan_parquet(source_dir / "*.parquet")
+        .filter(pl.col("symbol").is_in(symbols))
+        .collect(engine="streaming")
+    )
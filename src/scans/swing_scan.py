@@ -4,6 +4,8 @@ from functools import reduce
 
 import polars as pl
 
+from src.store.adjustments import read_adjusted
+
 logger = logging.getLogger(__name__)
 
 
@@ -144,8 +146,18 @@ def prep_scan_data(
             select *
             from {table_id}
             """
-    df = pl.read_database_uri(query=query, uri=conn)
-    df = add_basic_indicators(data=df)
+    df = read_adjusted(query=query, conn=conn, ohlcv_table_id=table_id)
+
+    return prep_scan_frame(data=df, lookback_min_gains_dict=lookback_min_gains_dict)
+
+
+def prep_scan_frame(
+    data: pl.LazyFrame | pl.DataFrame, lookback_min_gains_dict: dict
+) -> pl.LazyFrame:
+    """
+    Add indicators, lookback shifts & gains to an OHLCV frame from any source
+    """
+    df = add_basic_indicators(data=data)
 
     res = (
         df.with_columns(
@@ -183,9 +195,9 @@ def prep_scan_data(
     return res
 
 
-def basic_scan(data: pl.LazyFrame, conf: dict) -> pl.LazyFrame:
+def basic_scan_expr(conf: dict) -> pl.Expr:
     """
-    Basic Scan checking if EMA's and Vol are aligned along with Past Pct Gains
+    Row passes the Basic Scan, usable in a filter or an aggregation
     """
     pct_gain_expr = reduce(
         lambda a, b: a | b,
@@ -194,13 +206,18 @@ def basic_scan(data: pl.LazyFrame, conf: dict) -> pl.LazyFrame:
             for days, threshold in conf["lookback_min_return_pct"].items()
         ],
     )
-    res = data.filter(
-        (
-            pl.col("all_data_flag") == True
-            # & (pl.col("close_ema_9") >= pl.col("close_sma_50")) # commenting out ema filter and keep only in filter_scan
-            # & (pl.col("close_ema_21") >= pl.col("close_sma_50"))
-        )
-    ).filter(pct_gain_expr)
+    return (
+        pl.col("all_data_flag") == True
+        # & (pl.col("close_ema_9") >= pl.col("close_sma_50")) # commenting out ema filter and keep only in filter_scan
+        # & (pl.col("close_ema_21") >= pl.col("close_sma_50"))
+    ) & pct_gain_expr
+
+
+def basic_scan(data: pl.LazyFrame, conf: dict) -> pl.LazyFrame:
+    """
+    Basic Scan checking if EMA's and Vol are aligned along with Past Pct Gains
+    """
+    res = data.filter(basic_scan_expr(conf=conf))
 
     return res
 
@@ -0,0 +1,282 @@
+import logging
+import queue
+import shutil
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.config.adjustments import ADJUSTMENT_CONF
+from src.config.quality import QUALITY_CONF
+from src.config.storage_layout import StorageLayout
+from src.pipeline.cache import has_table
+from src.scans.artifacts import write_artifact
+from src.scans.filter_scan import basic_filter, run_filters
+from src.scans.sharded import merge_ranked
+from src.scans.swing_scan import basic_scan, find_stocks, prep_scan_frame
+from src.store.adjustments import preview_merge, read_adjustments
+from src.store.catalog import flagged_symbols, read_catalog
+from src.store.results import scan_results
+
+logger = logging.getLogger(__name__)
+
+_BARS_SCHEMA = {
+    "symbol": pl.String(),
+    "timestamp": pl.String(),
+    "open": pl.Float64(),
+    "high": pl.Float64(),
+    "low": pl.Float64(),
+    "close": pl.Float64(),
+    "volume": pl.Int64(),
+}
+
+
+def _read_bars(query: str, conn: sqlite3.Connection) -> pl.DataFrame:
+    return pl.read_database(
+        query=query, connection=conn, schema_overrides=_BARS_SCHEMA
+    ).with_columns(pl.col("timestamp").str.to_datetime(time_unit="us"))
+
+
+def priority_symbols(
+    db_path: Path,
+    table_id: str,
+    market: str,
+    exchange: str,
+    end_date: str,
+    conf: dict,
+) -> list[str]:
+    """
+    Symbols to fetch first: hits of the last run before end_date, best
+    ranked first, then every symbol held by traded value. Symbols in
+    neither come after, in the fetcher's order.
+    """
+    hits = []
+    if any(StorageLayout.RESULTS.rglob("*.parquet")):
+        hits = (
+            scan_results(
+                market=market,
+                exchange=exchange,
+                end_date=date.fromisoformat(end_date) - timedelta(days=1),
+            )
+            .filter(
+                (pl.col("stage") == "filters")
+                & pl.col("result").is_in(conf["hit_results"])
+            )
+            .filter(pl.col("run_date") == pl.col("run_date").max())
+            .group_by("symbol")
+            .agg(pl.col("rank").min())
+            .sort("rank", "symbol")
+            .collect()
+            .get_column("symbol")
+            .to_list()
+        )
+
+    liquid = []
+    conn = f"sqlite:///{db_path}"
+    if db_path.exists() and has_table(conn=conn, table_id=table_id):
+        start = date.fromisoformat(end_date) - timedelta(days=conf["liquidity_days"])
+        query = f"""
+                select symbol, avg(close * volume) as traded_value
+                from {table_id}
+                where timestamp >= '{start}'
+                group by symbol
+                order by traded_value desc
+                """
+        liquid = pl.read_database_uri(query=query, uri=conn).get_column("symbol")
+
+    hit_set = set(hits)
+    logger.info(
+        f"Fetch priority: {len(hits)} last run hits, {len(liquid)} by liquidity"
+    )
+
+    return hits + [s for s in liquid if s not in hit_set]
+
+
+class Watchlist:
+    """
+    Filter results built while the fetch runs. Symbols are submitted as
+    their bars land & scanned in batches on a worker thread, the swing scan,
+    basic filter & filters of each batch merged & ranked into the watchlist
+    artifacts. Filters are per symbol, so the merged results match the
+    filters stage run on the same symbols, which stays the complete run.
+    Symbols flagged by the catalog before the fetch are left out.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        table_id: str,
+        staging_table_id: str | None,
+        out_dir: Path,
+        start_date: str,
+        end_date: str,
+        adr_cutoff: float,
+        scans_conf: dict,
+        filters_conf: dict,
+        conf: dict,
+    ):
+        self._db_path = db_path
+        self._table_id = table_id
+        self._staging_table_id = staging_table_id
+        self._out_dir = out_dir
+        self._start_date = datetime.strptime(start_date, "%Y-%m-%d")
+        self._end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        self._adr_cutoff = adr_cutoff
+        self._scans_conf = scans_conf
+        self._filters_conf = filters_conf
+        self._conf = conf
+
+        # read once, before the fetch writes
+        self._flagged = set()
+        self._adjustments = None
+        if db_path.exists():
+            conn = f"sqlite:///{db_path}"
+            coverage = read_catalog(conn=conn, ohlcv_table_id=table_id)
+            if coverage is not None:
+                self._flagged = set(
+                    flagged_symbols(catalog=coverage, conf=QUALITY_CONF)
+                )
+            self._adjustments = read_adjustments(conn=conn, ohlcv_table_id=table_id)
+        if out_dir.exists() and out_dir.is_dir():
+            logger.info(f"Deleting Directory: {out_dir}")
+            shutil.rmtree(out_dir)
+        out_dir.mkdir(parents=True)
+        logger.info(f"Creating Directory: {out_dir}")
+
+        self._results: dict[str, list[pl.DataFrame]] = {}
+        self.n_symbols = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def submit(self, symbol: str) -> None:
+        """
+        A symbol whose bars have landed, called from the fetcher
+        """
+        self._queue.put(symbol)
+
+    def close(self) -> dict[str, pl.DataFrame]:
+        """
+        Scan what is left & return the merged results
+        """
+        self._queue.put(None)
+        self._thread.join()
+        return self._merged()
+
+    def _worker(self) -> None:
+        batch = []
+        failures = 0
+        done = False
+        while not done:
+            try:
+                symbol = self._queue.get(
+                    timeout=self._conf["max_wait_seconds"] if batch else None
+                )
+            except queue.Empty:
+                symbol = ""
+            if symbol is None:
+                done = True
+            elif symbol:
+                batch.append(symbol)
+
+            if batch and (
+                done or not symbol or len(batch) >= self._conf["batch_symbols"]
+            ):
+                try:
+                    self._scan(batch)
+                    batch, failures = [], 0
+                except Exception:
+                    # sqlite reads can fail while the fetcher writes, the batch
+                    # is tried again with the next symbols
+                    failures += 1
+                    if done or failures >= self._conf["batch_retries"]:
+                        # the filters stage after the fetch still covers them
+                        logger.exception(f"Watchlist batch of {len(batch)} failed")
+                        batch, failures = [], 0
+                    else:
+                        logger.warning(
+                            f"Watchlist batch of {len(batch)} failed, retrying"
+                        )
+
+    def _read_bars(self, symbols: list[str]) -> pl.DataFrame:
+        # connectorx reads take no sqlite lock & corrupt the database under
+        # the fetcher's writes, sqlite3 waits on them
+        query = f"""
+                select symbol, timestamp, open, high, low, close, volume
+                from {{table_id}}
+                where symbol in ({", ".join(f"'{s}'" for s in symbols)})
+                """
+        conn = sqlite3.connect(self._db_path, timeout=60)
+        try:
+            stored = _read_bars(query=query.format(table_id=self._table_id), conn=conn)
+            # a full fetch starts over on the current scale, nothing to adjust
+            if self._staging_table_id is None:
+                return stored
+            fetched = _read_bars(
+                query=query.format(table_id=self._staging_table_id), conn=conn
+            )
+        finally:
+            conn.close()
+
+        return preview_merge(
+            stored=stored,
+            fetched=fetched,
+            adjustments=self._adjustments,
+            conf=ADJUSTMENT_CONF,
+        )
+
+    def _scan(self, symbols: list[str]) -> None:
+        bars = self._read_bars(symbols)
+        stocks = (
+            find_stocks(
+                data=basic_scan(
+                    data=prep_scan_frame(
+                        data=bars,
+                        lookback_min_gains_dict=self._scans_conf[
+                            "lookback_min_return_pct"
+                        ],
+                    ),
+                    conf=self._scans_conf,
+                ),
+                start_date=self._start_date,
+                end_date=self._end_date,
+            )
+            .get_column("symbol")
+            .to_list()
+        )
+        stocks = [s for s in stocks if s not in self._flagged]
+        stocks = basic_filter(
+            data=bars.filter(pl.col("symbol").is_in(stocks)),
+            symbol_list=stocks,
+            scan_date=self._end_date,
+            conf=self._scans_conf,
+        )
+        stocks = (
+            bars.filter(
+                pl.col("symbol").is_in(stocks) & (pl.col("timestamp") == self._end_date)
+            )
+            .get_column("symbol")
+            .to_list()
+        )
+        res = run_filters(
+            data=bars.filter(pl.col("symbol").is_in(stocks)),
+            end_date=self._end_date,
+            adr_cutoff=self._adr_cutoff,
+            conf=self._filters_conf,
+        )
+
+        for name, df in res.items():
+            self._results.setdefault(name, []).append(df)
+        self.n_symbols += len(symbols)
+        merged = self._merged()
+        for name, df in merged.items():
+            write_artifact(df, out_dir=self._out_dir, name=f"{name}_filter")
+
+        logger.info(
+            f"Watchlist after {self.n_symbols} symbols: { {name: df.shape[0] for name, df in merged.items()} }"
+        )
+
+    def _merged(self) -> dict[str, pl.DataFrame]:
+        return {name: merge_ranked(dfs) for name, dfs in self._results.items()}
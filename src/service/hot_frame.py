@@ -0,0 +1,294 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.pipeline.cache import sqlite_watermark
+from src.scans.filter_scan import (adr_filter, inside_bars_filter,
+                                   pullback_filter, sma_200_filter, vcp_filter)
+from src.scans.swing_scan import (basic_scan, find_stocks, high_adr_scan,
+                                  prep_scan_frame)
+from src.store.adjustments import adjustments_watermark, read_adjusted
+
+logger = logging.getLogger(__name__)
+
+
+class HotFrame:
+    """
+    OHLCV of one run mode held in memory with its scan indicators. New bars
+    are read from the DB by refresh & only the symbols that got one are
+    recomputed, from their full in memory history, so every frame matches a
+    cold prep_scan_data run on the same table. A tail window is not enough:
+    the EMAs weigh every bar before it, recomputed over a window they come
+    out slightly off & can round differently. Bars written before the last
+    day held, by a backfill or an overlap merge, load everything again.
+
+    Readers take the current frames without locking, refresh swaps them in
+    whole.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        table_id: str,
+        scans_conf: dict,
+        filter_conf: dict,
+        filter_cache_size: int,
+    ):
+        self._db_path = db_path
+        self._conn = f"sqlite:///{db_path}"
+        self._table_id = table_id
+        self._scans_conf = scans_conf
+        self._filter_conf = filter_conf
+        self._lookback = scans_conf["lookback_min_return_pct"]
+
+        self._refresh_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._filter_cache: OrderedDict[str, list[dict]] = OrderedDict()
+        self._filter_cache_size = filter_cache_size
+
+        self.version = 0
+        self.refreshed_at = None
+        self._load()
+
+    def _read(self, since: datetime | None = None) -> pl.DataFrame:
+        query = f"""
+                select *
+                from {self._table_id}
+                """
+        if since is not None:
+            # bars of the last day are read again, an intraday bar may have moved
+            query += f"where timestamp >= '{since:%Y-%m-%d}'"
+        return read_adjusted(
+            query=query, conn=self._conn, ohlcv_table_id=self._table_id
+        )
+
+    def _prep(self, data: pl.DataFrame) -> pl.DataFrame:
+        return prep_scan_frame(
+            data=data, lookback_min_gains_dict=self._lookback
+        ).collect()
+
+    def _publish(self, raw: pl.DataFrame, scan_frame: pl.DataFrame) -> None:
+        latest = scan_frame.filter(
+            pl.col("timestamp") == pl.col("timestamp").max().over("symbol")
+        )
+        # one assignment, a reader sees the old or the new frames
+        self._frames = (raw, scan_frame, latest)
+        self.version += 1
+        self.refreshed_at = datetime.now()
+        with self._cache_lock:
+            self._filter_cache.clear()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        self._adjustments = self._adjustments_watermark()
+        raw = self._read().sort("symbol", "timestamp")
+        self._publish(raw=raw, scan_frame=self._prep(raw))
+        self._history = self._history_watermark(raw)
+        logger.info(
+            f"Loaded {raw.shape[0]} rows of {self._table_id} in {time.perf_counter() - start:.2f}s"
+        )
+
+    def _adjustments_watermark(self) -> dict:
+        return adjustments_watermark(conn=self._conn, ohlcv_table_id=self._table_id)
+
+    def _history_watermark(self, raw: pl.DataFrame) -> tuple[str | None, dict]:
+        """
+        Watermark of the bars before the last day held, refresh reads the
+        ones after again
+        """
+        last = raw.get_column("timestamp").max()
+        before = None if last is None else f"{last:%Y-%m-%d}"
+        return before, sqlite_watermark(
+            db_path=self._db_path, table_id=self._table_id, before=before
+        )
+
+    def refresh(self) -> dict:
+        """
+        Apply the bars added or changed since the last one held. A new split
+        or bonus rescales whole histories & bars written before the last day
+        held are not read again, either loads everything again.
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            before, history = self._history
+            rewritten = history != sqlite_watermark(
+                db_path=self._db_path, table_id=self._table_id, before=before
+            )
+            if rewritten or self._adjustments_watermark() != self._adjustments:
+                self._load()
+                res = {
+                    "reloaded": True,
+                    "version": self.version,
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                }
+                logger.info(f"Refreshed: {res}")
+                return res
+
+            raw, scan_frame, _ = self._frames
+            last = raw.get_column("timestamp").max()
+
+            new = self._read(since=last).join(
+                raw, on=raw.columns, how="anti", nulls_equal=True
+            )
+            if new.is_empty():
+                return {"new_rows": 0, "symbols": 0, "version": self.version}
+
+            symbols = new.get_column("symbol").unique()
+            raw = (
+                pl.concat(
+                    [raw.join(new, on=["symbol", "timestamp"], how="anti"), new],
+                    how="vertical_relaxed",
+                )
+            ).sort("symbol", "timestamp")
+            recomputed = self._prep(
+                raw.filter(pl.col("symbol").is_in(symbols.implode()))
+            )
+            scan_frame = pl.concat(
+                [
+                    scan_frame.filter(~pl.col("symbol").is_in(symbols.implode())),
+                    recomputed,
+                ],
+                how="vertical_relaxed",
+            )
+            self._publish(raw=raw, scan_frame=scan_frame)
+            self._history = self._history_watermark(raw)
+
+            res = {
+                "new_rows": new.shape[0],
+                "symbols": symbols.len(),
+                "version": self.version,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+            logger.info(f"Refreshed: {res}")
+
+            return res
+
+    def status(self) -> dict:
+        raw, scan_frame, latest = self._frames
+        return {
+            "version": self.version,
+            "refreshed_at": self.refreshed_at.isoformat(timespec="seconds"),
+            "rows": raw.shape[0],
+            "symbols": latest.shape[0],
+            "last_timestamp": str(raw.get_column("timestamp").max()),
+            "columns": scan_frame.columns,
+        }
+
+    def _last_date(self) -> datetime:
+        last = self._frames[0].get_column("timestamp").max()
+        return datetime(last.year, last.month, last.day)
+
+    def scan(
+        self,
+        scan: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        adr_cutoff: float | None = None,
+        lookback_min_return_pct: dict | None = None,
+    ) -> dict:
+        """
+        Basic or high ADR scan over the held frame. lookback_min_return_pct
+        overrides the gain thresholds of the configured lookbacks.
+        """
+        conf = dict(self._scans_conf)
+        if lookback_min_return_pct is not None:
+            thresholds = {int(k): v for k, v in lookback_min_return_pct.items()}
+            unknown = set(thresholds) - set(self._lookback)
+            if unknown:
+                raise ValueError(
+                    f"No gains computed for lookbacks {sorted(unknown)}, only {list(self._lookback)}"
+                )
+            conf["lookback_min_return_pct"] = thresholds
+
+        end = self._last_date() if end_date is None else _parse_date(end_date)
+        start = (
+            end - timedelta(days=conf["months_lookback"] * 30)
+            if start_date is None
+            else _parse_date(start_date)
+        )
+
+        data = self._frames[1].lazy()
+        if scan == "basic":
+            res = basic_scan(data=data, conf=conf)
+        elif scan == "high_adr":
+            if adr_cutoff is None:
+                raise ValueError("high_adr scan needs adr_cutoff")
+            res = high_adr_scan(data=data, adr_cutoff=adr_cutoff, conf=conf)
+        else:
+            raise ValueError(f"Unknown scan {scan}, basic or high_adr")
+
+        stocks = find_stocks(data=res, start_date=start, end_date=end)
+        return {
+            "scan_date": str(stocks.get_column("scan_date").max()),
+            "symbols": stocks.get_column("symbol").sort().to_list(),
+        }
+
+    def filter(
+        self,
+        name: str,
+        end_date: str | None = None,
+        adr_cutoff: float | None = None,
+        conf: dict | None = None,
+    ) -> list[dict]:
+        """
+        One filter on the held OHLCV, conf overrides the configured one. The
+        result is cached until the next refresh.
+        """
+        key = json.dumps(
+            [name, end_date, adr_cutoff, conf], sort_keys=True, default=str
+        )
+        version = self.version
+        with self._cache_lock:
+            if key in self._filter_cache:
+                self._filter_cache.move_to_end(key)
+                return self._filter_cache[key]
+
+        data = self._frames[0]
+        end = self._last_date() if end_date is None else _parse_date(end_date)
+        filter_conf = {**self._filter_conf.get(name, {}), **(conf or {})}
+
+        if name == "sma_200":
+            res = sma_200_filter(data=data, end_date=end)
+        elif name == "adr":
+            if adr_cutoff is None:
+                raise ValueError("adr filter needs adr_cutoff")
+            res = adr_filter(data=data, adr_cutoff=adr_cutoff, end_date=end)
+        elif name == "pullback":
+            res = pullback_filter(data=data.lazy(), end_date=end, conf=filter_conf)
+        elif name == "vcp":
+            res = vcp_filter(data=data.lazy(), end_date=end, conf=filter_conf)
+        elif name == "inside_bars":
+            res = inside_bars_filter(data=data.lazy(), end_date=end, conf=filter_conf)
+        else:
+            raise ValueError(f"Unknown filter {name}")
+
+        rows = res.to_dicts()
+        with self._cache_lock:
+            # a refresh may have landed meanwhile, its data is not in rows
+            if version == self.version:
+                self._filter_cache[key] = rows
+                if len(self._filter_cache) > self._filter_cache_size:
+                    self._filter_cache.popitem(last=False)
+
+        return rows
+
+    def query(self, sql: str, limit: int) -> list[dict]:
+        """
+        SQL over the held frames: latest (last bar of each symbol with every
+        indicator), bars (all of them) & ohlcv (raw)
+        """
+        raw, scan_frame, latest = self._frames
+        ctx = pl.SQLContext(
+            {"latest": latest, "bars": scan_frame, "ohlcv": raw}, eager=True
+        )
+        return ctx.execute(sql).head(limit).to_dicts()
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
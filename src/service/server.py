@@ -0,0 +1,153 @@
+import json
+import logging
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import polars as pl
+
+from src.service.hot_frame import HotFrame
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    JSON API over the hot frame
+
+    GET  /status
+    POST /refresh
+    POST /scan    {"scan": "basic" | "high_adr", "start_date", "end_date",
+                   "adr_cutoff", "lookback_min_return_pct": {"22": 10}}
+    POST /filter  {"filter": "sma_200" | "adr" | "pullback" | "vcp" |
+                   "inside_bars", "end_date", "adr_cutoff", "conf": {...}}
+    POST /query   {"sql": "select ... from latest where ...", "limit"}
+    """
+
+    hot_frame: HotFrame
+    max_rows: int
+
+    def _send(self, code: int, body: dict) -> None:
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, route) -> None:
+        start = time.perf_counter()
+        try:
+            res = route()
+        except (KeyError, TypeError, ValueError, pl.exceptions.PolarsError) as e:
+            self._send(400, {"error": f"{type(e).__name__}: {e}"})
+            return
+        except Exception as e:
+            logger.exception(f"{self.command} {self.path} failed")
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self._send(
+            200,
+            {
+                "version": self.hot_frame.version,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+                "result": res,
+            },
+        )
+
+    def do_GET(self) -> None:
+        if self.path == "/status":
+            self._handle(self.hot_frame.status)
+        else:
+            self._send(404, {"error": f"No route GET {self.path}"})
+
+    def do_POST(self) -> None:
+        routes = {
+            "/refresh": lambda body: self.hot_frame.refresh(),
+            "/scan": lambda body: self.hot_frame.scan(**body),
+            "/filter": lambda body: self.hot_frame.filter(
+                name=body.pop("filter"), **body
+            ),
+            "/query": lambda body: self.hot_frame.query(
+                sql=body["sql"],
+                limit=min(body.get("limit", self.max_rows), self.max_rows),
+            ),
+        }
+        if self.path not in routes:
+            self._send(404, {"error": f"No route POST {self.path}"})
+            return
+
+        try:
+            body = self._body()
+        except json.JSONDecodeError as e:
+            self._send(400, {"error": f"Invalid JSON: {e}"})
+            return
+        self._handle(lambda: routes[self.path](body))
+
+    def address_string(self) -> str:
+        # a Unix socket peer has no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _refresh_loop(hot_frame: HotFrame, refresh_seconds: int, stop: threading.Event):
+    while not stop.wait(refresh_seconds):
+        try:
+            hot_frame.refresh()
+        except Exception:
+            logger.exception("Refresh failed, keeping the frames held")
+
+
+def serve(
+    hot_frame: HotFrame,
+    conf: dict,
+    socket_path: Path | None = None,
+    port: int | None = None,
+) -> None:
+    """
+    Serve the hot frame on a Unix socket, or on localhost:port, until
+    interrupted. New bars are polled every refresh_seconds.
+    """
+    handler = type(
+        "Handler", (_Handler,), {"hot_frame": hot_frame, "max_rows": conf["max_rows"]}
+    )
+
+    if socket_path is not None:
+        socket_path.unlink(missing_ok=True)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = _UnixHTTPServer(str(socket_path), handler)
+        logger.info(f"Scanner service on unix socket {socket_path}")
+    else:
+        server = ThreadingHTTPServer((conf["host"], port), handler)
+        logger.info(f"Scanner service on http://{conf['host']}:{port}")
+
+    stop = threading.Event()
+    if conf["refresh_seconds"] > 0:
+        threading.Thread(
+            target=_refresh_loop,
+            args=(hot_frame, conf["refresh_seconds"], stop),
+            daemon=True,
+        ).start()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping scanner service")
+    finally:
+        stop.set()
+        server.server_close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
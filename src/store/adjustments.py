@@ -0,0 +1,278 @@
+import logging
+from datetime import date, datetime
+
+import polars as pl
+
+from src.pipeline.cache import drop_table, has_table
+
+logger = logging.getLogger(__name__)
+
+_PRICE_COLS = ["open", "high", "low", "close"]
+_SCHEMA = {
+    "symbol": pl.String(),
+    "adjust_before": pl.Date(),  # bars dated before it are on the old scale
+    "factor": pl.Float64(),  # old scale price * factor = new scale price
+    "detected_at": pl.Datetime(time_unit="us"),
+}
+
+
+def adjustments_table(ohlcv_table_id: str) -> str:
+    return f"{ohlcv_table_id}_adjustments"
+
+
+def read_adjustments(conn: str, ohlcv_table_id: str) -> pl.DataFrame:
+    """
+    Adjustment factors of an OHLCV table, empty when none were detected
+    """
+    table_id = adjustments_table(ohlcv_table_id)
+    if not has_table(conn=conn, table_id=table_id):
+        return pl.DataFrame(schema=_SCHEMA)
+
+    query = f"""
+            select symbol, adjust_before, factor, detected_at
+            from {table_id}
+            """
+    return pl.read_database_uri(query=query, uri=conn).with_columns(
+        pl.col("adjust_before").cast(pl.String()).str.to_date(),
+        pl.col("detected_at").cast(pl.String()).str.to_datetime(time_unit="us"),
+    )
+
+
+def adjust_ohlcv(
+    data: pl.DataFrame | pl.LazyFrame, adjustments: pl.DataFrame
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Bars on the scale of the latest bars: prices times, volume over, the
+    product of the factors of every action after the bar. Any of the OHLCV
+    columns may be missing. Row order kept.
+    """
+    if adjustments.is_empty():
+        return data
+
+    schema = data.collect_schema()
+    scaled = [
+        (pl.col(c) * pl.col("_factor")).alias(c) for c in _PRICE_COLS if c in schema
+    ]
+    if "volume" in schema:
+        scaled.append(
+            (pl.col("volume") / pl.col("_factor"))
+            .round()
+            .cast(schema["volume"])
+            .alias("volume")
+        )
+
+    factors = (
+        adjustments.sort("adjust_before")
+        .with_columns(
+            pl.col("factor")
+            .reverse()
+            .cum_prod()
+            .reverse()
+            .over("symbol")
+            .alias("_factor")
+        )
+        .select("symbol", "adjust_before", "_factor")
+    )
+
+    res = (
+        data.lazy()
+        .with_row_index("_row")
+        .with_columns(pl.col("timestamp").dt.date().alias("_date"))
+        .sort("_date")
+        .join_asof(
+            factors.lazy(),
+            left_on="_date",
+            right_on="adjust_before",
+            by="symbol",
+            strategy="forward",
+            allow_exact_matches=False,
+            check_sortedness=False,
+        )
+        .sort("_row")
+        .with_columns(pl.col("_factor").fill_null(1.0))
+        .with_columns(scaled)
+        .drop("_row", "_date", "adjust_before", "_factor")
+    )
+
+    return res if isinstance(data, pl.LazyFrame) else res.collect()
+
+
+def read_adjusted(query: str, conn: str, ohlcv_table_id: str) -> pl.DataFrame:
+    """
+    Query on an OHLCV table with its adjustments applied
+    """
+    return adjust_ohlcv(
+        data=pl.read_database_uri(query=query, uri=conn),
+        adjustments=read_adjustments(conn=conn, ohlcv_table_id=ohlcv_table_id),
+    )
+
+
+def detect_actions(
+    stored: pl.DataFrame, fetched: pl.DataFrame, adjust_before: date, conf: dict
+) -> pl.DataFrame:
+    """
+    Splits & bonuses from bars both stored & fetched again. A symbol whose
+    every overlapping close moved by more than min_jump_pct, all by the same
+    ratio within max_spread_pct, was adjusted by the broker since it was
+    stored. Its stored bars before adjust_before, the ones not fetched
+    again, take the ratio as factor.
+    """
+    ratios = (
+        fetched.join(
+            stored.select("symbol", "timestamp", pl.col("close").alias("_stored")),
+            on=["symbol", "timestamp"],
+            how="inner",
+        )
+        .filter(pl.col("_stored") > 0)
+        .group_by("symbol")
+        .agg((pl.col("close") / pl.col("_stored")).alias("ratio"))
+        .with_columns(
+            pl.col("ratio").list.median().alias("factor"),
+            (
+                pl.col("ratio").list.eval((pl.element() - 1).abs()).list.min() * 100
+            ).alias("min_jump_pct"),
+            ((pl.col("ratio").list.max() / pl.col("ratio").list.min() - 1) * 100).alias(
+                "spread_pct"
+            ),
+        )
+    )
+
+    revised = ratios.filter(
+        (pl.col("min_jump_pct") > conf["min_jump_pct"])
+        & (pl.col("spread_pct") > conf["max_spread_pct"])
+    )
+    if not revised.is_empty():
+        logger.warning(
+            f"Bars revised without a consistent ratio, replaced as fetched: {revised.get_column('symbol').to_list()}"
+        )
+
+    return (
+        ratios.filter(
+            (pl.col("min_jump_pct") > conf["min_jump_pct"])
+            & (pl.col("spread_pct") <= conf["max_spread_pct"])
+        )
+        .select(
+            "symbol",
+            pl.lit(adjust_before, dtype=pl.Date()).alias("adjust_before"),
+            pl.col("factor").round(8),
+            pl.lit(datetime.now()).cast(_SCHEMA["detected_at"]).alias("detected_at"),
+        )
+        .sort("symbol")
+    )
+
+
+def merge_fetched(
+    conn: str, ohlcv_table_id: str, staging_table_id: str, conf: dict
+) -> pl.DataFrame:
+    """
+    Move freshly fetched bars from the staging table into the OHLCV table.
+    Stored bars fetched again are replaced & any split or bonus seen in them
+    recorded as an adjustment factor, so the history is rescaled at read
+    time instead of fetched again. Returns the actions detected.
+    """
+    if not has_table(conn=conn, table_id=staging_table_id):
+        logger.info(f"Nothing fetched into {staging_table_id}")
+        return pl.DataFrame(schema=_SCHEMA)
+
+    fetched = pl.read_database_uri(query=f"select * from {staging_table_id}", uri=conn)
+    if fetched.is_empty() or not has_table(conn=conn, table_id=ohlcv_table_id):
+        actions = pl.DataFrame(schema=_SCHEMA)
+        overlap_start = None
+    else:
+        overlap_start = fetched.get_column("timestamp").min()
+        query = f"""
+                select symbol, timestamp, close
+                from {ohlcv_table_id}
+                where timestamp >= '{overlap_start:%Y-%m-%d}'
+                """
+        stored = pl.read_database_uri(query=query, uri=conn)
+        actions = detect_actions(
+            stored=stored,
+            fetched=fetched,
+            adjust_before=overlap_start.date(),
+            conf=conf,
+        )
+
+    # sqlalchemy takes a while to import & only a fetch needs it
+    from sqlalchemy import create_engine, text
+
+    with create_engine(conn).begin() as db_conn:
+        if overlap_start is not None:
+            db_conn.execute(
+                text(
+                    f"""
+                    delete from {ohlcv_table_id}
+                    where timestamp >= '{overlap_start:%Y-%m-%d}'
+                        and symbol in (select distinct symbol from {staging_table_id})
+                    """
+                )
+            )
+        fetched.write_database(
+            table_name=ohlcv_table_id, connection=db_conn, if_table_exists="append"
+        )
+        if not actions.is_empty():
+            actions.write_database(
+                table_name=adjustments_table(ohlcv_table_id),
+                connection=db_conn,
+                if_table_exists="append",
+            )
+    drop_table(conn=conn, table_id=staging_table_id)
+
+    for row in actions.iter_rows(named=True):
+        logger.info(
+            f"Corporate action: {row['symbol']} bars before {row['adjust_before']} x {row['factor']}"
+        )
+    logger.info(
+        f"Merged {fetched.shape[0]} bars into {ohlcv_table_id}, {actions.shape[0]} actions"
+    )
+
+    return actions
+
+
+def preview_merge(
+    stored: pl.DataFrame,
+    fetched: pl.DataFrame,
+    adjustments: pl.DataFrame,
+    conf: dict,
+) -> pl.DataFrame:
+    """
+    Adjusted bars as they will be once fetched is merged as merge_fetched
+    does, to scan them while the rest of the fetch runs. stored & fetched
+    are the bars of the same symbols from the OHLCV & the staging table.
+    """
+    if fetched.is_empty():
+        return adjust_ohlcv(data=stored, adjustments=adjustments)
+
+    overlap_start = fetched.get_column("timestamp").min()
+    actions = detect_actions(
+        stored=stored.filter(pl.col("timestamp") >= overlap_start),
+        fetched=fetched,
+        adjust_before=overlap_start.date(),
+        conf=conf,
+    )
+    bars = pl.concat(
+        [
+            stored.filter(
+                (pl.col("timestamp") < overlap_start)
+                | ~pl.col("symbol").is_in(fetched.get_column("symbol").unique())
+            ),
+            fetched,
+        ],
+        how="vertical_relaxed",
+    ).sort("symbol", "timestamp")
+
+    return adjust_ohlcv(
+        data=bars, adjustments=pl.concat([adjustments, actions], how="vertical_relaxed")
+    )
+
+
+def adjustments_watermark(conn: str, ohlcv_table_id: str) -> dict:
+    """
+    Count & last detection of a table's adjustments, changes with every new
+    action
+    """
+    adjustments = read_adjustments(conn=conn, ohlcv_table_id=ohlcv_table_id)
+    return {
+        "n_rows": adjustments.shape[0],
+        "last_detected_at": adjustments.get_column("detected_at").max(),
+    }
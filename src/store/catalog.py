@@ -0,0 +1,210 @@
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+import polars as pl
+
+from src.pipeline.cache import has_table, sqlite_watermark
+
+logger = logging.getLogger(__name__)
+
+_PRICE_COLS = ["open", "high", "low", "close"]
+_ANOMALIES = [
+    "n_duplicates",
+    "n_bad_ohlc",
+    "n_zero_volume",
+    "n_non_positive",
+    "n_nulls",
+]
+
+
+def catalog_table(ohlcv_table_id: str) -> str:
+    return f"{ohlcv_table_id}_catalog"
+
+
+def _anomaly_exprs() -> dict[str, pl.Expr]:
+    """
+    Bars with each anomaly
+    """
+    return {
+        "n_duplicates": pl.col("timestamp").is_first_distinct().not_(),
+        "n_bad_ohlc": (
+            (pl.col("high") < pl.col("low"))
+            | (pl.col("high") < pl.max_horizontal("open", "close"))
+            | (pl.col("low") > pl.min_horizontal("open", "close"))
+        ),
+        "n_zero_volume": pl.col("volume") == 0,
+        "n_non_positive": pl.min_horizontal(_PRICE_COLS) <= 0,
+        "n_nulls": pl.any_horizontal(pl.col(*_PRICE_COLS, "volume").is_null()),
+    }
+
+
+def validate_ohlcv(data: pl.LazyFrame, recent_sessions: int) -> pl.LazyFrame:
+    """
+    Coverage & anomaly counts of every symbol in one pass over the bars.
+    Sessions are the dates any symbol has a bar on, a missing day is a
+    session between a symbol's first & last bar without one of its own.
+    Anomalies are counted over the whole history & over the last
+    recent_sessions sessions, the _recent columns.
+    """
+    bars = data.with_columns(pl.col("timestamp").dt.date().alias("date"))
+    sessions = bars.select(pl.col("date").unique().sort()).with_row_index("session")
+    bars = bars.join(sessions, on="date").with_columns(
+        (pl.col("session") > pl.col("session").max() - recent_sessions).alias("_recent")
+    )
+
+    coverage = bars.group_by("symbol").agg(
+        pl.col("date").min().alias("first_date"),
+        pl.col("date").max().alias("last_date"),
+        pl.len().alias("n_rows"),
+        pl.col("date").n_unique().alias("n_days"),
+        *[expr.sum().alias(name) for name, expr in _anomaly_exprs().items()],
+        *[
+            expr.filter(pl.col("_recent")).sum().alias(f"{name}_recent")
+            for name, expr in _anomaly_exprs().items()
+        ],
+    )
+
+    return (
+        coverage.join(
+            sessions.rename({"date": "first_date", "session": "_first"}),
+            on="first_date",
+        )
+        .join(
+            sessions.rename({"date": "last_date", "session": "_last"}), on="last_date"
+        )
+        .with_columns(
+            (pl.col("_last") - pl.col("_first") + 1 - pl.col("n_days"))
+            .cast(pl.Int64())
+            .alias("n_missing_days"),
+            (pl.col("_last").max() - pl.col("_last"))
+            .cast(pl.Int64())
+            .alias("sessions_stale"),
+        )
+        .select(
+            "symbol",
+            "first_date",
+            "last_date",
+            "n_rows",
+            "n_missing_days",
+            "sessions_stale",
+            *[pl.col(c).cast(pl.Int64()) for c in _ANOMALIES],
+            *[pl.col(f"{c}_recent").cast(pl.Int64()) for c in _ANOMALIES],
+        )
+        .sort("symbol")
+    )
+
+
+def read_catalog(conn: str, ohlcv_table_id: str) -> pl.DataFrame | None:
+    """
+    Coverage catalog of an OHLCV table, None if it was never validated
+    """
+    table_id = catalog_table(ohlcv_table_id)
+    if not has_table(conn=conn, table_id=table_id):
+        return None
+
+    query = f"""
+            select *
+            from {table_id}
+            """
+    return pl.read_database_uri(query=query, uri=conn).with_columns(
+        pl.col("first_date", "last_date").str.to_date(),
+        pl.col("validated_at").str.to_datetime(time_unit="us"),
+    )
+
+
+def _is_fresh(catalog: pl.DataFrame, watermark: dict) -> bool:
+    # max(timestamp) comes back as text or datetime with the column's type,
+    # a catalog written before the recent counts is validated again
+    return (
+        all(f"{c}_recent" in catalog.columns for c in _ANOMALIES)
+        and catalog.get_column("n_rows").sum() == watermark["n_rows"]
+        and str(catalog.get_column("last_date").max())
+        == str(watermark["max_timestamp"])[:10]
+    )
+
+
+def update_catalog(
+    db_path: Path, ohlcv_table_id: str, conf: dict, rebuild: bool = False
+) -> pl.DataFrame:
+    """
+    Validate an OHLCV table into its catalog unless the catalog still
+    matches the table's row count & last bar. rebuild validates anyway,
+    needed after bars were replaced in place.
+    """
+    conn = f"sqlite:///{db_path}"
+    catalog = read_catalog(conn=conn, ohlcv_table_id=ohlcv_table_id)
+    if (
+        not rebuild
+        and catalog is not None
+        and _is_fresh(
+            catalog=catalog,
+            watermark=sqlite_watermark(db_path=db_path, table_id=ohlcv_table_id),
+        )
+    ):
+        logger.info(f"Catalog of {ohlcv_table_id} up to date")
+        return catalog
+
+    query = f"""
+            select symbol, timestamp, open, high, low, close, volume
+            from {ohlcv_table_id}
+            """
+    catalog = (
+        validate_ohlcv(
+            data=pl.read_database_uri(query=query, uri=conn).lazy(),
+            recent_sessions=conf["anomaly_sessions"],
+        )
+        .collect()
+        .with_columns(pl.lit(datetime.now()).alias("validated_at"))
+    )
+    catalog.with_columns(
+        pl.col("first_date", "last_date", "validated_at").cast(pl.String())
+    ).write_database(
+        table_name=catalog_table(ohlcv_table_id),
+        connection=conn,
+        if_table_exists="replace",
+    )
+
+    totals = catalog.select(pl.col("n_missing_days", *_ANOMALIES).sum()).row(
+        0, named=True
+    )
+    logger.info(
+        f"Validated {catalog.get_column('n_rows').sum()} rows of {catalog.shape[0]} symbols in {ohlcv_table_id}: {totals}"
+    )
+
+    return catalog
+
+
+def flagged_symbols(catalog: pl.DataFrame, conf: dict) -> list[str]:
+    """
+    Symbols with an excluded anomaly within the last anomaly_sessions, the
+    bars the scans read, or stale for more than stale_sessions. A catalog
+    written before the recent counts falls back to the whole history.
+    """
+    anomalies = [
+        f"{c}_recent" if f"{c}_recent" in catalog.columns else c
+        for c in conf["exclude_anomalies"]
+    ]
+    return (
+        catalog.filter(
+            pl.any_horizontal(pl.col(anomalies) > 0)
+            | (pl.col("sessions_stale") > conf["stale_sessions"])
+        )
+        .get_column("symbol")
+        .to_list()
+    )
+
+
+def catalog_last_date(conn: str, ohlcv_table_id: str) -> date | None:
+    """
+    Last bar held of any symbol, from the catalog instead of the bars
+    """
+    if not has_table(conn=conn, table_id=catalog_table(ohlcv_table_id)):
+        return None
+
+    query = f"""
+            select max(last_date) as last_date
+            from {catalog_table(ohlcv_table_id)}
+            """
+    last_date = pl.read_database_uri(query=query, uri=conn).item(0, 0)
+    return None if last_date is None else date.fromisoformat(last_date)
@@ -0,0 +1,202 @@
+import logging
+from datetime import date, timedelta
+
+import polars as pl
+
+from src.pipeline.cache import drop_table, has_table
+from src.store.adjustments import adjust_ohlcv, read_adjustments
+
+logger = logging.getLogger(__name__)
+
+_RANGES_SCHEMA = {
+    "symbol": pl.String(),
+    "start_date": pl.Date(),
+    "end_date": pl.Date(),
+}
+
+
+def attempts_table(ohlcv_table_id: str) -> str:
+    return f"{ohlcv_table_id}_gap_attempts"
+
+
+def _read_attempts(conn: str, ohlcv_table_id: str) -> pl.DataFrame:
+    table_id = attempts_table(ohlcv_table_id)
+    if not has_table(conn=conn, table_id=table_id):
+        return pl.DataFrame(
+            schema={"symbol": pl.String(), "date": pl.Date(), "n_attempts": pl.Int64()}
+        )
+
+    query = f"""
+            select symbol, date, n_attempts
+            from {table_id}
+            """
+    return pl.read_database_uri(query=query, uri=conn).with_columns(
+        pl.col("date").str.to_date()
+    )
+
+
+def find_gaps(
+    conn: str,
+    ohlcv_table_id: str,
+    catalog: pl.DataFrame,
+    sessions: list[date],
+    conf: dict,
+) -> pl.DataFrame:
+    """
+    Sessions a symbol has no bar for. Each symbol is checked from its first
+    bar, & up to the last session held unless it is stale, so listings &
+    delistings are not gaps. Days given up on after backfill_attempts are
+    left out.
+    """
+    if not sessions:
+        return pl.DataFrame(schema={"symbol": pl.String(), "date": pl.Date()})
+
+    start, end = sessions[0], sessions[-1]
+    last_held = catalog.get_column("last_date").max()
+    windows = catalog.select(
+        "symbol",
+        pl.max_horizontal(pl.col("first_date"), pl.lit(start)).alias("lo"),
+        pl.min_horizontal(
+            pl.when(pl.col("sessions_stale") <= conf["stale_sessions"])
+            .then(pl.lit(last_held))
+            .otherwise(pl.col("last_date")),
+            pl.lit(end),
+        ).alias("hi"),
+    )
+
+    query = f"""
+            select symbol, timestamp
+            from {ohlcv_table_id}
+            where timestamp >= '{start:%Y-%m-%d}'
+            """
+    stored = pl.read_database_uri(query=query, uri=conn).select(
+        "symbol", pl.col("timestamp").dt.date().alias("date")
+    )
+    given_up = _read_attempts(conn=conn, ohlcv_table_id=ohlcv_table_id).filter(
+        pl.col("n_attempts") >= conf["backfill_attempts"]
+    )
+
+    return (
+        windows.join_where(
+            pl.DataFrame({"date": sessions}, schema={"date": pl.Date()}),
+            pl.col("date") >= pl.col("lo"),
+            pl.col("date") <= pl.col("hi"),
+        )
+        .select("symbol", "date")
+        .join(stored, on=["symbol", "date"], how="anti")
+        .join(given_up, on=["symbol", "date"], how="anti")
+        .sort("symbol", "date")
+    )
+
+
+def compact_gaps(
+    gaps: pl.DataFrame, sessions: list[date], limit_days: int | None
+) -> pl.DataFrame:
+    """
+    Fewest date ranges covering the gaps. Runs of consecutive sessions make
+    a range, & with a limit, runs of a symbol are packed into one range
+    while it spans at most limit_days, the most a fetcher request can cover.
+    Without one, as for per date fetchers, runs are kept apart.
+    """
+    runs = (
+        gaps.join(
+            pl.DataFrame({"date": sessions}, schema={"date": pl.Date()}).with_row_index(
+                "session"
+            ),
+            on="date",
+        )
+        .sort("symbol", "date")
+        .with_columns(
+            (pl.col("session").diff().over("symbol") != 1)
+            .fill_null(True)
+            .cum_sum()
+            .alias("run")
+        )
+        .group_by("symbol", "run")
+        .agg(
+            pl.col("date").min().alias("start_date"),
+            pl.col("date").max().alias("end_date"),
+        )
+        .sort("symbol", "start_date")
+    )
+
+    ranges = []
+    for symbol, start_date, end_date in runs.select(*_RANGES_SCHEMA).iter_rows():
+        # a run longer than the limit is split, a fetcher needs both ends
+        while limit_days is not None and (end_date - start_date).days > limit_days:
+            ranges.append([symbol, start_date, start_date + timedelta(days=limit_days)])
+            start_date += timedelta(days=limit_days + 1)
+
+        last = ranges[-1] if ranges else None
+        if (
+            limit_days is not None
+            and last is not None
+            and last[0] == symbol
+            and (end_date - last[1]).days <= limit_days
+        ):
+            last[2] = end_date
+        else:
+            ranges.append([symbol, start_date, end_date])
+
+    return pl.DataFrame(ranges, schema=_RANGES_SCHEMA, orient="row")
+
+
+def merge_backfill(
+    conn: str, ohlcv_table_id: str, staging_table_id: str, gaps: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Move the backfilled bars of the gaps from the staging table into the
+    OHLCV table, the rest of a range was held already. Bars come on the
+    broker's current scale & are put back on the stored one, the
+    adjustments apply at read time. Returns the gaps filled.
+    """
+    if not has_table(conn=conn, table_id=staging_table_id):
+        logger.info(f"Nothing fetched into {staging_table_id}")
+        return gaps.clear()
+
+    fetched = (
+        pl.read_database_uri(query=f"select * from {staging_table_id}", uri=conn)
+        .with_columns(pl.col("timestamp").dt.date().alias("date"))
+        .join(gaps, on=["symbol", "date"], how="semi")
+        .unique(["symbol", "date"], keep="last")
+    )
+    adjustments = read_adjustments(conn=conn, ohlcv_table_id=ohlcv_table_id)
+    fetched = adjust_ohlcv(
+        data=fetched.drop("date"),
+        adjustments=adjustments.with_columns(1 / pl.col("factor")),
+    ).with_columns(pl.col("timestamp").dt.date().alias("date"))
+
+    fetched.drop("date").write_database(
+        table_name=ohlcv_table_id, connection=conn, if_table_exists="append"
+    )
+    drop_table(conn=conn, table_id=staging_table_id)
+
+    filled = fetched.select("symbol", "date")
+    logger.info(
+        f"Backfilled {filled.shape[0]} of {gaps.shape[0]} missing bars into {ohlcv_table_id}"
+    )
+
+    return filled
+
+
+def record_attempts(conn: str, ohlcv_table_id: str, missing: pl.DataFrame) -> None:
+    """
+    Count one more backfill of the gaps still missing after it
+    """
+    attempts = (
+        pl.concat(
+            [
+                _read_attempts(conn=conn, ohlcv_table_id=ohlcv_table_id),
+                missing.select("symbol", "date", pl.lit(1).alias("n_attempts")),
+            ],
+            how="vertical_relaxed",
+        )
+        .group_by("symbol", "date")
+        .agg(pl.col("n_attempts").sum())
+        .sort("symbol", "date")
+    )
+    attempts.with_columns(pl.col("date").cast(pl.String())).write_database(
+        table_name=attempts_table(ohlcv_table_id),
+        connection=conn,
+        if_table_exists="replace",
+    )
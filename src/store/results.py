@@ -0,0 +1,368 @@
+import logging
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+
+from src.config.artifacts import ARTIFACT_SUFFIX
+from src.config.results_store import (RESULTS_STORE_DTYPES,
+                                      RESULTS_STORE_HIVE_SCHEMA,
+                                      RESULTS_STORE_ROW_GROUP_SIZE)
+from src.config.storage_layout import StorageLayout
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["filters", "analysis"]
+
+
+def _to_store_frame(
+    data: pl.DataFrame, exchange: str, stage: str, result: str
+) -> pl.DataFrame:
+    cols = data.columns
+    return data.select(
+        pl.lit(exchange, dtype=pl.String()).alias("exchange"),
+        pl.lit(stage, dtype=pl.String()).alias("stage"),
+        pl.lit(result, dtype=pl.String()).alias("result"),
+        *[
+            pl.col(col).cast(dtype, strict=False)
+            if col in cols
+            else pl.lit(None, dtype=dtype).alias(col)
+            for col, dtype in RESULTS_STORE_DTYPES.items()
+        ],
+    )
+
+
+def append_results(
+    run_date: str,
+    market: str,
+    exchange: str,
+    stage: str,
+    results: dict[str, pl.DataFrame],
+) -> Path:
+    """
+    Write one stage's results of a run into the store. There is one file per
+    exchange & stage inside the run_date/market partition, so re-running a
+    stage replaces its rows instead of duplicating them.
+    """
+    out_dir = StorageLayout.results_dir(run_date=run_date, market=market)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / (exchange + "-" + stage + ".parquet")
+
+    res = pl.concat(
+        [
+            _to_store_frame(data=df, exchange=exchange, stage=stage, result=name)
+            for name, df in results.items()
+        ],
+        how="vertical",
+    ).sort("symbol", "result")
+
+    tmp_path = path.with_suffix(".tmp")
+    res.write_parquet(
+        tmp_path, statistics=True, row_group_size=RESULTS_STORE_ROW_GROUP_SIZE
+    )
+    tmp_path.replace(path)
+    _record_run(
+        run_date=run_date,
+        market=market,
+        exchange=exchange,
+        stage=stage,
+        results=list(results),
+    )
+
+    logger.info(f"Results store: {res.shape[0]} rows of {stage} written to {path}")
+    return path
+
+
+def _record_run(
+    run_date: str, market: str, exchange: str, stage: str, results: list[str]
+) -> None:
+    """
+    Marker of the results a stage run produced, empty ones included, as an
+    empty result writes no rows to tell the run happened
+    """
+    out_dir = StorageLayout.result_runs_dir(run_date=run_date, market=market)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / (exchange + "-" + stage + ".parquet")
+
+    tmp_path = path.with_suffix(".tmp")
+    pl.DataFrame(
+        {"exchange": exchange, "stage": stage, "result": results},
+        schema={"exchange": pl.String(), "stage": pl.String(), "result": pl.String()},
+    ).write_parquet(tmp_path)
+    tmp_path.replace(path)
+
+
+def _read_stage_dir(stage_dir: Path) -> dict[str, pl.DataFrame]:
+    """
+    Artifacts of a run directory, CSV for runs older than the IPC artifacts
+    """
+    results = {}
+    for path in sorted(stage_dir.glob(f"*{ARTIFACT_SUFFIX}")):
+        results[path.stem] = pl.read_ipc(path, memory_map=False)
+    for path in sorted(stage_dir.glob("*.csv")):
+        if path.stem not in results:
+            results[path.stem] = pl.read_csv(path, infer_schema_length=None)
+    return results
+
+
+def append_stage_dir(
+    run_date: str, market: str, exchange: str, stage: str, stage_dir: Path
+) -> Path | None:
+    results = _read_stage_dir(stage_dir)
+    if not results:
+        logger.warning(f"Results store: nothing to append from {stage_dir}")
+        return None
+    return append_results(
+        run_date=run_date,
+        market=market,
+        exchange=exchange,
+        stage=stage,
+        results=results,
+    )
+
+
+def backfill_results() -> int:
+    """
+    Load every past run under runs/<date>/<market>/<exchange>/ into the store
+    """
+    n_files = 0
+    for stage in STAGES:
+        for stage_dir in sorted(StorageLayout.RUNS.glob(f"*/*/*/{stage}")):
+            exchange_dir = stage_dir.parent
+            if exchange_dir.name == "merged":
+                continue
+            if (
+                append_stage_dir(
+                    run_date=exchange_dir.parent.parent.name,
+                    market=exchange_dir.parent.name,
+                    exchange=exchange_dir.name,
+                    stage=stage,
+                    stage_dir=stage_dir,
+                )
+                is not None
+            ):
+                n_files += 1
+
+    logger.info(f"Results store: backfilled {n_files} stage runs")
+    return n_files
+
+
+def scan_results(
+    market: str | None = None,
+    result: str | None = None,
+    exchange: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazy scan of the store, partition & symbol filters are pushed down
+    """
+    if not any(StorageLayout.RESULTS.rglob("*.parquet")):
+        return pl.LazyFrame(
+            schema={
+                "exchange": pl.String(),
+                "stage": pl.String(),
+                "result": pl.String(),
+                **RESULTS_STORE_DTYPES,
+                **RESULTS_STORE_HIVE_SCHEMA,
+            }
+        )
+
+    res = pl.scan_parquet(
+        StorageLayout.RESULTS / "**" / "*.parquet",
+        hive_partitioning=True,
+        hive_schema=RESULTS_STORE_HIVE_SCHEMA,
+    )
+    if market is not None:
+        res = res.filter(pl.col("market") == market)
+    if result is not None:
+        res = res.filter(pl.col("result") == result)
+    if exchange is not None:
+        res = res.filter(pl.col("exchange") == exchange)
+    if start_date is not None:
+        res = res.filter(pl.col("run_date") >= start_date)
+    if end_date is not None:
+        res = res.filter(pl.col("run_date") <= end_date)
+    return res
+
+
+def symbol_history(symbol: str, market: str | None = None) -> pl.DataFrame:
+    return (
+        scan_results(market=market)
+        .filter(pl.col("symbol") == symbol)
+        .sort("run_date", "result")
+        .collect()
+    )
+
+
+def scan_runs(
+    market: str | None = None,
+    result: str | None = None,
+    end_date: date | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazy scan of the run markers, one row per exchange & result of a run
+    """
+    if not any(StorageLayout.RESULT_RUNS.rglob("*.parquet")):
+        return pl.LazyFrame(
+            schema={
+                "exchange": pl.String(),
+                "stage": pl.String(),
+                "result": pl.String(),
+                **RESULTS_STORE_HIVE_SCHEMA,
+            }
+        )
+
+    res = pl.scan_parquet(
+        StorageLayout.RESULT_RUNS / "**" / "*.parquet",
+        hive_partitioning=True,
+        hive_schema=RESULTS_STORE_HIVE_SCHEMA,
+    )
+    if market is not None:
+        res = res.filter(pl.col("market") == market)
+    if result is not None:
+        res = res.filter(pl.col("result") == result)
+    if end_date is not None:
+        res = res.filter(pl.col("run_date") <= end_date)
+    return res
+
+
+def _runs(market: str, result: str, end_date: date | None = None) -> pl.DataFrame:
+    """
+    Exchange & date of every run that produced the result, empty or not.
+    Dates with hits count too, for runs stored before the markers.
+    """
+    return (
+        pl.concat(
+            [
+                scan_runs(market=market, result=result, end_date=end_date),
+                scan_results(market=market, result=result, end_date=end_date),
+            ],
+            how="diagonal_relaxed",
+        )
+        .select("exchange", "run_date")
+        .unique()
+        .sort("exchange", "run_date")
+        .collect()
+    )
+
+
+def run_dates(market: str, result: str) -> pl.Series:
+    """
+    Dates on which the result was produced, the unit a streak is counted in
+    """
+    return _runs(market=market, result=result).get_column("run_date").unique().sort()
+
+
+def first_last_seen(market: str, result: str) -> pl.DataFrame:
+    return (
+        scan_results(market=market, result=result)
+        .group_by("symbol")
+        .agg(
+            pl.col("run_date").min().alias("first_seen"),
+            pl.col("run_date").max().alias("last_seen"),
+            pl.col("run_date").n_unique().alias("n_runs"),
+        )
+        .sort("first_seen", "symbol")
+        .collect()
+    )
+
+
+def streaks(
+    market: str, result: str, as_of: date | None = None, current_only: bool = True
+) -> pl.DataFrame:
+    """
+    Runs of consecutive scans a symbol stayed in a result, counted in the
+    runs of its own exchange as exchanges may run on different days. A
+    missing scan day (holiday, skipped run) does not break a streak, only a
+    scan without the symbol does, one with the result empty included.
+    current_only keeps the streaks still alive on the exchange's last run up
+    to as_of.
+    """
+    hits = (
+        scan_results(market=market, result=result, end_date=as_of)
+        .select("exchange", "run_date", "symbol")
+        .unique()
+        .collect()
+    )
+    if hits.is_empty():
+        return pl.DataFrame()
+
+    # every run, a run with the result empty breaks the streaks
+    dates_df = _runs(market=market, result=result, end_date=as_of).with_columns(
+        pl.int_range(pl.len()).over("exchange").alias("run_idx"),
+        (pl.len().over("exchange") - 1).alias("exchange_last_idx"),
+    )
+
+    res = (
+        hits.join(dates_df, on=["exchange", "run_date"], how="inner")
+        .sort("exchange", "symbol", "run_idx")
+        .with_columns(
+            (pl.col("run_idx").diff().fill_null(1) != 1)
+            .cum_sum()
+            .over("exchange", "symbol")
+            .alias("streak_id")
+        )
+        .group_by("exchange", "symbol", "streak_id")
+        .agg(
+            pl.col("run_date").min().alias("streak_start"),
+            pl.col("run_date").max().alias("streak_end"),
+            pl.len().alias("streak_runs"),
+            pl.col("run_idx").max().alias("last_idx"),
+            pl.col("exchange_last_idx").first(),
+        )
+    )
+    if current_only:
+        res = res.filter(pl.col("last_idx") == pl.col("exchange_last_idx"))
+
+    return res.drop("streak_id", "last_idx", "exchange_last_idx").sort(
+        ["streak_runs", "exchange", "symbol"], descending=[True, False, False]
+    )
+
+
+def changes(
+    market: str,
+    result: str,
+    run_date: date | None = None,
+    prev_run_date: date | None = None,
+) -> pl.DataFrame:
+    """
+    Symbols added to & removed from a result between two scans, by default the
+    latest scan against the one before it
+    """
+    dates = run_dates(market=market, result=result)
+    if run_date is None:
+        run_date = dates.max()
+    if prev_run_date is None:
+        prev_run_date = dates.filter(dates < run_date).max()
+
+    # a first run has nothing before it, every symbol is added
+    res = (
+        scan_results(market=market, result=result)
+        .filter(
+            pl.col("run_date").is_in(
+                [d for d in [run_date, prev_run_date] if d is not None]
+            )
+        )
+        .select("run_date", "symbol")
+        .unique()
+        .collect()
+    )
+    curr = res.filter(pl.col("run_date") == run_date).get_column("symbol")
+    prev = (
+        res.filter(pl.col("run_date") == prev_run_date).get_column("symbol")
+        if prev_run_date is not None
+        else res.get_column("symbol").clear()
+    )
+
+    added = pl.DataFrame(
+        {"symbol": curr.filter(~curr.is_in(prev.implode()))}
+    ).with_columns(pl.lit("added").alias("change"))
+    removed = pl.DataFrame(
+        {"symbol": prev.filter(~prev.is_in(curr.implode()))}
+    ).with_columns(pl.lit("removed").alias("change"))
+
+    logger.info(
+        f"{result} {prev_run_date} -> {run_date}: {added.height} added, {removed.height} removed"
+    )
+    return pl.concat([added, removed]).sort("change", "symbol")
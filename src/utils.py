@@ -6,6 +6,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from src.pipeline.metrics import stage
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,11 +38,16 @@ def format_duration(seconds: float) -> str:
 
 
 def timeit(func):
+    """
+    Log the duration & record it as a stage of the current run metrics
+    """
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start = time.perf_counter()
         try:
-            return func(*args, **kwargs)
+            with stage(func.__qualname__):
+                return func(*args, **kwargs)
         finally:
             end = time.perf_counter()
             duration = end - start
@@ -54,6 +61,14 @@ def timeit(func):
     return wrapper
 
 
+def bars_to_calendar_days(bars: int) -> int:
+    """
+    Calendar days that hold the given number of daily bars, with slack for
+    holidays
+    """
+    return int(bars * 7 / 5) + 30
+
+
 def read_ini_file(file_location: str) -> Optional[configparser.ConfigParser]:
     """
     Reads an ini file and returns a ConfigParser object.
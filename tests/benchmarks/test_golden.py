@@ -0,0 +1,48 @@
+import polars as pl
+
+from src.benchmarks.golden import diff_frames
+
+# BBB & CCC tie on the rank_by columns of adr, either may rank 2nd
+_REF = pl.DataFrame(
+    {
+        "rank": [1, 2, 3, 4],
+        "symbol": ["AAA", "BBB", "CCC", "DDD"],
+        "adr_pct_20": [6.12, 5.5, 5.5, 4.37],
+        "rvol_pct": [10.0, 20.0, 20.0, 30.0],
+    }
+)
+
+
+def _issues(cand: pl.DataFrame) -> list[tuple[str, str]]:
+    return [
+        (issue["column"], issue["issue"])
+        for issue in diff_frames(output="adr", ref=_REF, cand=cand)
+    ]
+
+
+def test_same_frame_in_another_order_is_equivalent():
+    assert _issues(_REF.reverse()) == []
+
+
+def test_tied_ranks_swapped_are_equivalent():
+    cand = _REF.with_columns(pl.Series("rank", [1, 3, 2, 4]))
+
+    assert _issues(cand) == []
+
+
+def test_perturbed_round_is_caught():
+    cand = _REF.with_columns(pl.col("adr_pct_20").round(1))
+
+    assert _issues(cand) == [("adr_pct_20", "values")]
+
+
+def test_swapped_rank_out_of_its_tie_is_caught():
+    cand = _REF.with_columns(pl.Series("rank", [2, 1, 3, 4]))
+
+    assert _issues(cand) == [("rank", "rank order")]
+
+
+def test_missing_row_is_caught():
+    cand = _REF.filter(pl.col("symbol") != "DDD")
+
+    assert _issues(cand) == [("symbol", "missing rows")]
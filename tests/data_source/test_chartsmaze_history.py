@@ -0,0 +1,65 @@
+import polars as pl
+import pytest
+
+from src.config.storage_layout import StorageLayout
+from src.data_source.chartsmaze import history
+
+_HEADER = (
+    "Stock Name,RS Rating,Basic Industry,Market Cap(Cr.),1 Month Returns(%),"
+    "3 Month Returns(%),% from 52W High"
+)
+
+
+@pytest.fixture
+def cmaze_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(StorageLayout, "DATA", tmp_path / "data")
+    out = history._cmaze_dir()
+    out.mkdir(parents=True)
+    return out
+
+
+def _write_csv(cmaze_dir, snapshot_date: str, rs_rating: int) -> None:
+    (cmaze_dir / f"{snapshot_date}.csv").write_text(
+        f"{_HEADER}\nAAA,{rs_rating},Banks,100.5,NA,2.0,-5.0\n"
+    )
+
+
+def _rs_rating(snapshot_date: str) -> int:
+    return pl.read_parquet(history._partition_path(snapshot_date=snapshot_date)).item(
+        0, "rs_rating"
+    )
+
+
+def test_replaced_csv_is_ingested_again(cmaze_dir):
+    _write_csv(cmaze_dir, "2025-03-31", rs_rating=80)
+    history.ingest_cmaze_file(snapshot_date="2025-03-31")
+    assert _rs_rating("2025-03-31") == 80
+
+    history.ingest_cmaze_file(snapshot_date="2025-03-31")
+    assert _rs_rating("2025-03-31") == 80
+
+    _write_csv(cmaze_dir, "2025-03-31", rs_rating=90)
+    history.ingest_cmaze_file(snapshot_date="2025-03-31")
+    assert _rs_rating("2025-03-31") == 90
+
+
+def test_ingest_new_files_picks_up_changed_csvs(cmaze_dir):
+    _write_csv(cmaze_dir, "2025-03-28", rs_rating=70)
+    _write_csv(cmaze_dir, "2025-03-31", rs_rating=80)
+    assert history.ingest_new_files() == ["2025-03-28", "2025-03-31"]
+    assert history.ingest_new_files() == []
+
+    _write_csv(cmaze_dir, "2025-03-28", rs_rating=75)
+    assert history.ingest_new_files() == ["2025-03-28"]
+    assert _rs_rating("2025-03-28") == 75
+    assert history.ingested_dates() == ["2025-03-28", "2025-03-31"]
+
+
+def test_partition_kept_when_csv_removed(cmaze_dir):
+    _write_csv(cmaze_dir, "2025-03-31", rs_rating=80)
+    history.ingest_cmaze_file(snapshot_date="2025-03-31")
+    (cmaze_dir / "2025-03-31.csv").unlink()
+
+    assert history.ingest_cmaze_file(snapshot_date="2025-03-31") is not None
+    assert history.ingested_dates() == ["2025-03-31"]
+    assert _rs_rating("2025-03-31") == 80
@@ -0,0 +1,53 @@
+import polars as pl
+import pytest
+
+from src.config.exchange import Exchange
+from src.config.exchange_tables import EXCHG_TABLES
+from src.config.market import Market
+from src.config.storage_layout import StorageLayout
+from src.jobs.nse_analysis import _rs_rating_watermark, _rs_ratings
+
+_TABLE = EXCHG_TABLES[Exchange.NSE]["equity_rs_rating_daily"]
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(StorageLayout, "DATA", tmp_path / "data")
+    out = StorageLayout.db_path(market=Market.INDIA_EQUITIES, exchange=Exchange.NSE)
+    out.parent.mkdir(parents=True)
+    return out
+
+
+def _write(db_path, table_id: str) -> None:
+    pl.DataFrame(
+        {
+            "timestamp": ["2025-03-28", "2025-03-31"],
+            "symbol": ["AAA", "AAA"],
+            "rs_score": [1.5, 2.5],
+            "rs_rating": [80, 90],
+        }
+    ).write_database(table_name=table_id, connection=f"sqlite:///{db_path}")
+
+
+def test_no_db_yet(db_path):
+    res = _rs_ratings(end_date="2025-03-31")
+
+    assert res.is_empty()
+    assert res.columns == ["timestamp", "symbol", "rs_score", "rs_rating"]
+    assert _rs_rating_watermark() is None
+
+
+def test_db_without_rs_table(db_path):
+    _write(db_path, table_id="equity_ohlcv_daily")
+
+    assert _rs_ratings(end_date="2025-03-31").is_empty()
+    assert _rs_rating_watermark() is None
+
+
+def test_rs_table_read(db_path):
+    _write(db_path, table_id=_TABLE)
+
+    res = _rs_ratings(end_date="2025-03-31")
+
+    assert res.select("symbol", "rs_rating").rows() == [("AAA", 90)]
+    assert _rs_rating_watermark()["n_rows"] == 2
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+import pytest
+
+from src.config.run_modes import RUN_MODES
+from src.config.storage_layout import StorageLayout
+from src.jobs.pipeline import _fetch_stages
+from src.pipeline.dag import RAN, Pipeline
+from src.store.results import append_results
+
+_MODE_CONF = RUN_MODES["3"]
+_END_DATE = "2025-03-31"
+_TABLE = "equity_ohlcv_daily"
+
+
+class _FakeBroker:
+    """
+    Writes a bar per symbol & records the order it was asked to fetch in
+    """
+
+    def __init__(self, symbols: list[str]):
+        self._symbols = symbols
+        self._data_dir = StorageLayout.data_dir(
+            market=_MODE_CONF["market"], exchange=_MODE_CONF["exchange"]
+        )
+        self.priority = None
+
+    def fetch_instruments(self) -> None:
+        pl.DataFrame({"symbol": self._symbols}).write_parquet(
+            self._data_dir / "instruments.parquet"
+        )
+
+    def fetch_ohlcv_stream(self, priority: list[str], on_symbol) -> None:
+        self.priority = priority
+        _bars({s: 1.0 for s in self._symbols}, days=1).write_database(
+            table_name=_TABLE,
+            connection=f"sqlite:///{self._data_dir / 'data.db'}",
+            if_table_exists="append",
+        )
+        for symbol in self._symbols:
+            on_symbol(symbol)
+
+
+def _bars(traded_value: dict[str, float], days: int) -> pl.DataFrame:
+    end = datetime.fromisoformat(_END_DATE) - timedelta(days=1)
+    return pl.DataFrame(
+        [
+            {
+                "symbol": symbol,
+                "timestamp": end - timedelta(days=d),
+                "open": 10.0,
+                "high": 11.0,
+                "low": 9.0,
+                "close": 10.0,
+                "volume": int(value * 100),
+            }
+            for symbol, value in traded_value.items()
+            for d in range(days)
+        ]
+    )
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    for name in ["DATA", "RUNS", "RESULTS"]:
+        monkeypatch.setattr(StorageLayout, name, tmp_path / name.lower())
+
+
+def test_full_fetch_ranks_on_the_bars_held_before(storage):
+    db_path = StorageLayout.db_path(
+        market=_MODE_CONF["market"], exchange=_MODE_CONF["exchange"]
+    )
+    db_path.parent.mkdir(parents=True)
+    _bars({"AAA": 1, "MMM": 50, "QQQ": 5, "ZZZ": 100}, days=5).write_database(
+        table_name=_TABLE, connection=f"sqlite:///{db_path}"
+    )
+    append_results(
+        run_date="2025-03-28",
+        market=_MODE_CONF["market"].value,
+        exchange=_MODE_CONF["exchange"].value,
+        stage="filters",
+        results={"vcp_filter": pl.DataFrame({"symbol": ["QQQ"]})},
+    )
+
+    broker = _FakeBroker(symbols=["AAA", "MMM", "QQQ", "ZZZ"])
+    pipeline = Pipeline(
+        stages=_fetch_stages(
+            mode_conf=_MODE_CONF,
+            end_date=_END_DATE,
+            frequency="day",
+            adr_cutoff=3.5,
+            incremental=False,
+            broker=lambda: broker,
+        ),
+        state_dir=StorageLayout.RUNS / "pipeline",
+        max_workers=1,
+    )
+
+    assert pipeline.run(targets=["ohlcv"])["ohlcv"] == RAN
+    # last run's hit, then by traded value, not alphabetical
+    assert broker.priority == ["QQQ", "ZZZ", "MMM", "AAA"]
@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.pipeline.metrics import api_call, bind_stage, stage
+
+
+@api_call("test.call")
+def _call() -> None:
+    pass
+
+
+def _calls(m) -> int:
+    return m.api_calls.get("test.call", {}).get("calls", 0)
+
+
+def test_concurrent_stages_count_only_their_own_calls():
+    barrier = threading.Barrier(2)
+    stages = {}
+
+    def run(name: str, n_calls: int) -> None:
+        with stage(name) as m:
+            barrier.wait()
+            for _ in range(n_calls):
+                _call()
+            barrier.wait()
+        stages[name] = m
+
+    threads = [
+        threading.Thread(target=run, args=("a", 2)),
+        threading.Thread(target=run, args=("b", 5)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert {name: _calls(m) for name, m in stages.items()} == {"a": 2, "b": 5}
+
+
+def test_calls_count_in_outer_stages_and_bound_threads():
+    with stage("outer") as outer:
+        _call()
+        with stage("inner") as inner:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for _ in range(3):
+                    executor.submit(bind_stage(_call)).result()
+                # not bound, counted in no stage
+                executor.submit(_call).result()
+
+    assert (_calls(outer), _calls(inner)) == (4, 3)
+    assert inner.peak_rss_growth_mb is None or inner.peak_rss_growth_mb >= 0
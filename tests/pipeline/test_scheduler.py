@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+
+import polars as pl
+
+from src.config.exchange import Exchange
+from src.config.schedule import SCHEDULER_CONF
+from src.pipeline.market_calendar import MarketCalendar
+from src.pipeline.scheduler import CloseScheduler, local_bars_available
+
+_TABLE = "equity_ohlcv_daily"
+_DAY = date(2025, 7, 3)
+
+
+class _Clock:
+    """
+    Simulated clock, sleep moves it forward & runs the events come due
+    """
+
+    def __init__(self, start: datetime):
+        self.t = start
+        self.events = []
+
+    def now(self) -> datetime:
+        return self.t
+
+    def sleep(self, seconds: float) -> None:
+        self.t += timedelta(seconds=seconds)
+        for at, event in list(self.events):
+            if self.t >= at:
+                event()
+                self.events.remove((at, event))
+
+
+def _write_bars(db_path, day: date) -> None:
+    pl.DataFrame(
+        {"symbol": ["SPY"], "timestamp": [datetime.combine(day, datetime.min.time())]}
+    ).write_database(
+        table_name=_TABLE, connection=f"sqlite:///{db_path}", if_table_exists="append"
+    )
+
+
+def _scheduler(calendar: MarketCalendar, clock: _Clock, db_path, log: list):
+    return CloseScheduler(
+        calendar=calendar,
+        warmup=lambda day: log.append(("warmup", day, clock.now())),
+        probe=lambda day: local_bars_available(
+            db_path=db_path, table_id=_TABLE, day=day
+        ),
+        run=lambda day: log.append(("run", day, clock.now())),
+        conf=SCHEDULER_CONF,
+        now=clock.now,
+        sleep=clock.sleep,
+    )
+
+
+def test_local_probe(tmp_path):
+    db_path = tmp_path / "data.db"
+    assert not local_bars_available(db_path=db_path, table_id=_TABLE, day=_DAY)
+
+    _write_bars(db_path, _DAY - timedelta(days=1))
+    assert not local_bars_available(db_path=db_path, table_id=_TABLE, day=_DAY)
+    assert not local_bars_available(db_path=db_path, table_id="missing", day=_DAY)
+
+    _write_bars(db_path, _DAY)
+    assert local_bars_available(db_path=db_path, table_id=_TABLE, day=_DAY)
+
+
+def test_warmup_before_close_then_polls_until_bars_are_out(tmp_path):
+    calendar = MarketCalendar(Exchange.NYSE)
+    close = calendar.session_close(_DAY)
+    clock = _Clock(start=close - timedelta(hours=2))
+    db_path = tmp_path / "data.db"
+    # bars posted well after close + settle, a few polls are needed
+    bars_at = close + calendar.settle + timedelta(minutes=7, seconds=30)
+    clock.events.append((bars_at, lambda: _write_bars(db_path, _DAY)))
+    log = []
+
+    assert _scheduler(calendar, clock, db_path, log).run_day(_DAY)
+
+    (_, warmup_day, warmup_at), (_, run_day, run_at) = log
+    assert warmup_day == run_day == _DAY
+    assert warmup_at == close - timedelta(minutes=SCHEDULER_CONF["warmup_minutes"])
+    assert (
+        bars_at <= run_at < bars_at + timedelta(seconds=SCHEDULER_CONF["poll_seconds"])
+    )
+
+
+def test_gives_up_at_the_deadline(tmp_path):
+    calendar = MarketCalendar(Exchange.NYSE)
+    close = calendar.session_close(_DAY)
+    clock = _Clock(start=close - timedelta(hours=1))
+    log = []
+
+    assert not _scheduler(calendar, clock, tmp_path / "data.db", log).run_day(_DAY)
+
+    assert [event for event, *_ in log] == ["warmup"]
+    deadline = close + timedelta(minutes=SCHEDULER_CONF["give_up_minutes"])
+    assert (
+        deadline
+        <= clock.now()
+        < deadline + timedelta(seconds=SCHEDULER_CONF["poll_seconds"])
+    )
+
+
+def test_holiday_is_skipped(tmp_path):
+    # 2025-07-04 is a NYSE holiday & a Friday, the next session is Monday
+    calendar = MarketCalendar(Exchange.NYSE)
+    clock = _Clock(start=datetime(2025, 7, 4, 9, 0, tzinfo=calendar.tz))
+    db_path = tmp_path / "data.db"
+    _write_bars(db_path, date(2025, 7, 7))
+    log = []
+
+    _scheduler(calendar, clock, db_path, log).serve(once=True)
+
+    assert [(event, day) for event, day, _ in log] == [
+        ("warmup", date(2025, 7, 7)),
+        ("run", date(2025, 7, 7)),
+    ]
+    assert log[-1][2] >= calendar.session_close(date(2025, 7, 7)) + calendar.settle
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+
+import polars as pl
+
+from src.scans.filter_scan import _inside_bar_contraction, inside_bars_filter
+
+_CONF = {"min_pivot_length": 3, "max_pivot_length": 10}
+_END_DATE = datetime(2025, 3, 31)
+
+
+def _bars(symbol: str, ranges: list[tuple[float, float]]) -> pl.DataFrame:
+    """
+    Daily bars ending on _END_DATE with the given (low, high) ranges
+    """
+    start = _END_DATE.date() - timedelta(days=len(ranges) - 1)
+    return pl.DataFrame(
+        {
+            "symbol": symbol,
+            "timestamp": [start + timedelta(days=i) for i in range(len(ranges))],
+            "open": [(low + high) / 2 for low, high in ranges],
+            "high": [float(high) for _, high in ranges],
+            "low": [float(low) for low, _ in ranges],
+            "close": [(low + high) / 2 for low, high in ranges],
+            "volume": 1000,
+        }
+    )
+
+
+def _base(n_inside: int) -> list[tuple[float, float]]:
+    """
+    Trend bars, a wide mother bar & n_inside bars inside it, alternately
+    narrow & wider so each is outside the bar before it
+    """
+    trend = [(90 + i * 0.1, 91 + i * 0.1) for i in range(30)]
+    inside = [(99, 101) if i % 2 else (98, 102) for i in range(n_inside)]
+    return trend + [(95, 105)] + inside
+
+
+def _sequential(df: pl.DataFrame) -> list[int]:
+    """
+    Contraction lengths as the bar by bar rule defines them
+    """
+    lengths = []
+    prev_symbol = mother = None
+    for symbol, high, low in df.select("symbol", "high", "low").iter_rows():
+        if symbol == prev_symbol and low >= mother[0] and high <= mother[1]:
+            lengths.append(lengths[-1] + 1)
+        else:
+            mother = (low, high)
+            lengths.append(1)
+        prev_symbol = symbol
+    return lengths
+
+
+def test_contraction_counts_bars_inside_the_mother():
+    df = _bars("AAA", _base(n_inside=5))
+    res = _inside_bar_contraction(df)
+
+    last = res.row(-1, named=True)
+    assert last["contraction_length"] == 6
+    assert (last["mother_low"], last["mother_high"]) == (95, 105)
+    assert (last["inside_low"], last["inside_high"]) == (98, 102)
+
+
+def test_contraction_matches_sequential_rule():
+    ranges = [
+        (10, 20), (12, 18), (11, 19), (13, 17), (9, 21), (10, 20),
+        (15, 16), (8, 22), (14, 15), (14.5, 14.8), (7, 30), (20, 25),
+    ]  # fmt: skip
+    df = pl.concat([_bars("AAA", ranges), _bars("BBB", ranges[::-1])])
+    res = _inside_bar_contraction(df)
+
+    assert res.get_column("contraction_length").to_list() == _sequential(df)
+
+
+def test_contraction_reports_the_true_length():
+    df = _bars("LONG", _base(n_inside=15))
+    res = _inside_bar_contraction(df)
+
+    assert res.get_column("contraction_length").max() == 16
+
+
+def test_base_longer_than_max_is_filtered_out():
+    data = pl.concat(
+        [
+            _bars("LONG", _base(n_inside=15)),
+            _bars("SHORT", _base(n_inside=4)),
+            _bars("NONE", _base(n_inside=1)),
+        ]
+    )
+    res = inside_bars_filter(data=data.lazy(), end_date=_END_DATE, conf=_CONF)
+
+    lengths = dict(res.select("symbol", "contraction_length").iter_rows())
+    assert lengths == {"SHORT": 5}
+    assert res.get_column("timestamp").unique().to_list() == [date(2025, 3, 31)]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from src.scans.rs_line import read_rs_line_bars, rs_line_filter
+
+_END_DATE = datetime(2025, 3, 31)
+_CONF = {"new_high_window": 20}
+
+
+def test_rs_line_covers_every_symbol_held(tmp_path):
+    db_path = tmp_path / "data.db"
+    days = [_END_DATE - timedelta(days=d) for d in range(400)]
+    pl.DataFrame(
+        [
+            {"symbol": s, "timestamp": t, "close": c, "high": c + 1, "volume": 100}
+            for s, c in [("AAA", 10.0), ("BBB", 20.0), ("SPY", 100.0)]
+            for t in days
+        ]
+    ).write_database(table_name="equity_ohlcv_daily", connection=f"sqlite:///{db_path}")
+
+    bars = read_rs_line_bars(
+        db_path=db_path, table_id="equity_ohlcv_daily", end_date=_END_DATE, conf=_CONF
+    )
+    benchmark = (
+        bars.filter(pl.col("symbol") == "SPY")
+        .select(
+            pl.col("timestamp").cast(pl.Date()),
+            pl.col("close").alias("benchmark_close"),
+        )
+        .sort("timestamp")
+    )
+    res = rs_line_filter(data=bars, benchmark=benchmark, end_date=_END_DATE, conf=_CONF)
+
+    # only the window is read
+    assert bars.get_column("timestamp").min() > days[-1]
+    assert res.select("symbol", "rs_line").rows() == [
+        ("AAA", 10.0),
+        ("BBB", 20.0),
+        ("SPY", 100.0),
+    ]
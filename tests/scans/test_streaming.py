@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from src.scans.streaming import export_ohlcv, read_bucketed
+
+_TABLE = "equity_ohlcv_daily"
+_CONF = {"memory_budget_mb": 1, "bytes_per_row": 200}
+
+
+def _write_ohlcv(db_path, symbols: list[str]) -> None:
+    days = [datetime(2025, 3, 31) - timedelta(days=d) for d in range(5)]
+    pl.DataFrame(
+        [
+            {
+                "symbol": s,
+                "timestamp": t,
+                "open": 10.0,
+                "high": 11.0,
+                "low": 9.0,
+                "close": 10.0,
+                "volume": 100,
+            }
+            for s in symbols
+            for t in days
+        ]
+    ).write_database(table_name=_TABLE, connection=f"sqlite:///{db_path}")
+
+
+def test_export_quotes_symbols(tmp_path):
+    db_path = tmp_path / "data.db"
+    _write_ohlcv(db_path, ["M&M", "O'NEIL", "AAA"])
+
+    out_dir = export_ohlcv(
+        conn=f"sqlite:///{db_path}",
+        table_id=_TABLE,
+        out_dir=tmp_path / "ohlcv",
+        n_buckets=2,
+    )
+
+    symbols = pl.read_parquet(out_dir / "*.parquet").get_column("symbol")
+    assert sorted(symbols.unique()) == ["AAA", "M&M", "O'NEIL"]
+
+
+def test_read_bucketed_reads_the_scan_list_only(tmp_path):
+    db_path = tmp_path / "data.db"
+    _write_ohlcv(db_path, ["AAA", "BBB", "CCC"])
+
+    # no buckets yet, they are exported first
+    res = read_bucketed(
+        conn=f"sqlite:///{db_path}",
+        table_id=_TABLE,
+        work_dir=tmp_path,
+        symbols=["AAA", "CCC"],
+        conf=_CONF,
+    )
+
+    assert any((tmp_path / "ohlcv").glob("*.parquet"))
+    assert sorted(res.get_column("symbol").unique()) == ["AAA", "CCC"]
+    assert res.height == 10
@@ -0,0 +1,85 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import polars as pl
+import pytest
+
+from src.service.hot_frame import HotFrame
+
+_TABLE = "equity_ohlcv_daily"
+_START = datetime(2025, 1, 1)
+
+
+def _bars(symbol: str, days: range, close: float = 100.0) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "symbol": symbol,
+            "timestamp": [_START + timedelta(days=d) for d in days],
+            "open": close,
+            "high": close + 1,
+            "low": close - 1,
+            "close": close,
+            "volume": 1000,
+        }
+    )
+
+
+def _append(db_path, data: pl.DataFrame) -> None:
+    data.write_database(
+        table_name=_TABLE, connection=f"sqlite:///{db_path}", if_table_exists="append"
+    )
+
+
+@pytest.fixture
+def hot_frame(tmp_path):
+    db_path = tmp_path / "data.db"
+    # a gap on day 10 for the backfill
+    _append(db_path, pl.concat([_bars("AAA", range(10)), _bars("AAA", range(11, 60))]))
+    return HotFrame(
+        db_path=db_path,
+        table_id=_TABLE,
+        scans_conf={"lookback_min_return_pct": {5: 10}},
+        filter_conf={},
+        filter_cache_size=4,
+    )
+
+
+def _close(hot_frame: HotFrame, day: int) -> float:
+    raw = hot_frame._frames[0]
+    return raw.filter(pl.col("timestamp") == _START + timedelta(days=day)).item(
+        0, "close"
+    )
+
+
+def test_new_bars_refresh_incrementally(hot_frame):
+    _append(hot_frame._db_path, _bars("AAA", range(60, 62)))
+
+    res = hot_frame.refresh()
+
+    assert res["new_rows"] == 2
+    assert "reloaded" not in res
+    assert hot_frame.refresh()["new_rows"] == 0
+
+
+def test_backfilled_bars_reload(hot_frame):
+    _append(hot_frame._db_path, _bars("AAA", range(10, 11), close=50.0))
+
+    res = hot_frame.refresh()
+
+    assert res["reloaded"]
+    assert _close(hot_frame, day=10) == 50.0
+    assert hot_frame._frames[0].shape[0] == 60
+
+
+def test_bars_rewritten_before_the_last_day_reload(hot_frame):
+    with sqlite3.connect(hot_frame._db_path) as conn:
+        conn.execute(
+            f"update {_TABLE} set close = 101 where timestamp like '2025-02-01%'"
+        )
+    _append(hot_frame._db_path, _bars("AAA", range(60, 61)))
+
+    res = hot_frame.refresh()
+
+    assert res["reloaded"]
+    assert _close(hot_frame, day=31) == 101
+    assert hot_frame._frames[0].shape[0] == 60
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from src.store.catalog import flagged_symbols, validate_ohlcv
+
+_CONF = {
+    "exclude_anomalies": ["n_bad_ohlc"],
+    "stale_sessions": 5,
+    "anomaly_sessions": 20,
+}
+
+
+def _bars(symbol: str, n_days: int, bad_day: int | None = None) -> pl.DataFrame:
+    """
+    Daily bars, the one of bad_day with its high under its low
+    """
+    return pl.DataFrame(
+        {
+            "symbol": symbol,
+            "timestamp": [
+                datetime(2025, 1, 1) + timedelta(days=d) for d in range(n_days)
+            ],
+            "open": 100.0,
+            "high": [90.0 if d == bad_day else 101.0 for d in range(n_days)],
+            "low": 99.0,
+            "close": 100.0,
+            "volume": 1000,
+        }
+    )
+
+
+def test_only_recent_anomalies_flag_a_symbol():
+    data = pl.concat(
+        [
+            _bars("OLD", n_days=100, bad_day=10),
+            _bars("NEW", n_days=100, bad_day=95),
+            _bars("CLEAN", n_days=100),
+        ]
+    )
+    catalog = validate_ohlcv(data=data.lazy(), recent_sessions=20).collect()
+
+    counts = catalog.select("symbol", "n_bad_ohlc", "n_bad_ohlc_recent").rows()
+    assert counts == [("CLEAN", 0, 0), ("NEW", 1, 1), ("OLD", 1, 0)]
+    assert flagged_symbols(catalog=catalog, conf=_CONF) == ["NEW"]
+
+
+def test_catalog_without_recent_counts_uses_the_whole_history():
+    data = _bars("OLD", n_days=100, bad_day=10)
+    catalog = (
+        validate_ohlcv(data=data.lazy(), recent_sessions=20)
+        .collect()
+        .drop("^.*_recent$")
+    )
+
+    assert flagged_symbols(catalog=catalog, conf=_CONF) == ["OLD"]
@@ -0,0 +1,85 @@
+from datetime import date
+
+import polars as pl
+import pytest
+
+from src.config.storage_layout import StorageLayout
+from src.store.results import append_results, changes, streaks
+
+
+@pytest.fixture
+def results_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(StorageLayout, "RESULTS", tmp_path / "results")
+    monkeypatch.setattr(StorageLayout, "RESULT_RUNS", tmp_path / "result_runs")
+
+
+def _append(run_date: str, exchange: str, symbols: list[str]) -> None:
+    append_results(
+        run_date=run_date,
+        market="US_EQ",
+        exchange=exchange,
+        stage="filters",
+        results={"vcp_filter": pl.DataFrame({"symbol": symbols})},
+    )
+
+
+def test_streaks_count_the_runs_of_the_symbols_exchange(results_store):
+    # XNAS runs daily, XNYS skips the 2nd & 4th
+    for day in ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"]:
+        _append(run_date=day, exchange="XNAS", symbols=["AAA"])
+    for day in ["2025-01-01", "2025-01-03"]:
+        _append(run_date=day, exchange="XNYS", symbols=["BBB"])
+
+    res = streaks(market="US_EQ", result="vcp_filter")
+
+    assert res.select("exchange", "symbol", "streak_start", "streak_runs").rows() == [
+        ("XNAS", "AAA", date(2025, 1, 1), 4),
+        ("XNYS", "BBB", date(2025, 1, 1), 2),
+    ]
+
+
+def test_streak_broken_by_a_run_without_the_symbol(results_store):
+    _append(run_date="2025-01-01", exchange="XNAS", symbols=["AAA", "CCC"])
+    _append(run_date="2025-01-02", exchange="XNAS", symbols=["CCC"])
+    _append(run_date="2025-01-03", exchange="XNAS", symbols=["AAA", "CCC"])
+    _append(run_date="2025-01-02", exchange="XNYS", symbols=["AAA"])
+
+    res = streaks(market="US_EQ", result="vcp_filter", current_only=False)
+
+    xnas = res.filter(pl.col("exchange") == "XNAS", pl.col("symbol") == "AAA")
+    assert xnas.get_column("streak_runs").sort().to_list() == [1, 1]
+    current = streaks(market="US_EQ", result="vcp_filter")
+    assert current.select("exchange", "symbol", "streak_runs").rows() == [
+        ("XNAS", "CCC", 3),
+        ("XNAS", "AAA", 1),
+        ("XNYS", "AAA", 1),
+    ]
+
+
+def test_empty_result_breaks_the_streak(results_store):
+    _append(run_date="2025-01-01", exchange="XNAS", symbols=["AAA"])
+    _append(run_date="2025-01-02", exchange="XNAS", symbols=[])
+    _append(run_date="2025-01-03", exchange="XNAS", symbols=["AAA"])
+
+    res = streaks(market="US_EQ", result="vcp_filter", current_only=False)
+
+    assert res.select("streak_start", "streak_runs").sort("streak_start").rows() == [
+        (date(2025, 1, 1), 1),
+        (date(2025, 1, 3), 1),
+    ]
+
+
+def test_changes_against_an_empty_run(results_store):
+    _append(run_date="2025-01-01", exchange="XNAS", symbols=["AAA", "BBB"])
+    _append(run_date="2025-01-02", exchange="XNAS", symbols=[])
+    _append(run_date="2025-01-03", exchange="XNAS", symbols=["AAA"])
+
+    res = changes(market="US_EQ", result="vcp_filter")
+
+    assert res.rows() == [("AAA", "added")]
+
+
+def test_changes_of_a_first_run(results_store):
+    _append(run_date="2025-01-01", exchange="XNAS", symbols=["AAA"])
+
+    assert changes(market="US_EQ", result="vcp_filter").rows() == [("AAA", "added")]